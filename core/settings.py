@@ -104,6 +104,21 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hand authorized downloads to the front web server: 'nginx' (X-Accel-Redirect),
+# 'apache' (X-Sendfile, mod_xsendfile) or empty to send files from Django.
+# For nginx, FILE_DELIVERY_ACCEL_PREFIX must be an internal location aliased to MEDIA_ROOT:
+#   location /protected-media/ { internal; alias /path/to/media/; }
+FILE_DELIVERY_BACKEND = os.getenv('FILE_DELIVERY_BACKEND', '')
+FILE_DELIVERY_ACCEL_PREFIX = os.getenv('FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/')
+
+# Plan PDFs are laid out by reportlab in a pool of worker processes (0 = min(4, CPUs)).
+# PLAN_PDF_FONT is a TTF file used for all PDF text, e.g. a Noto Sans Ethiopic for Amharic names.
+PLAN_PDF_WORKERS = int(os.getenv('PLAN_PDF_WORKERS', '0'))
+PLAN_PDF_FONT = os.getenv('PLAN_PDF_FONT', '')
+
+# Days after a reporting period ends during which its report can still be created (0 = no deadline)
+REPORTING_WINDOW_DAYS = int(os.getenv('REPORTING_WINDOW_DAYS', '0'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS settings
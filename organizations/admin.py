@@ -6,7 +6,7 @@ from .models import (
     ActivityBudget, ActivityCostingAssumption, InitiativeFeed,
     Location, LandTransport, AirTransport, PerDiem, Accommodation,
     ParticipantCost, SessionCost, PrintingCost, SupervisorCost,ProcurementItem,Plan,SubActivity,
-    Report, PerformanceAchievement, ActivityAchievement, SubActivityBudgetUtilization
+    Report, PerformanceAchievement, ActivityAchievement, SubActivityBudgetUtilization, BackgroundJob
 )
 admin.site.register(Plan)
 class OrganizationAdminForm(forms.ModelForm):
@@ -262,3 +262,11 @@ class SubActivityBudgetUtilizationAdmin(admin.ModelAdmin):
     search_fields = ('sub_activity__name',)
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'progress', 'total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('created_by__username',)
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at', 'updated_at', 'started_at', 'finished_at')
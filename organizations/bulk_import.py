@@ -3,6 +3,7 @@ import json
 from decimal import Decimal
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from .cost_lines import deferred_cost_lines
 from .models import SubActivity, MainActivity, Organization, ProcurementItem
 
 
@@ -262,7 +263,7 @@ class BulkSubActivityImporter:
                 return len(valid_sub_activities)
 
             # Bulk create
-            with transaction.atomic():
+            with transaction.atomic(), deferred_cost_lines():
                 created_count = 0
                 for data in valid_sub_activities:
                     try:
@@ -0,0 +1,117 @@
+"""
+Set-based helpers shared by the bulk API endpoints, importers and jobs.
+"""
+from django.db import connection
+from django.db.models import CharField, Q
+from django.db.models.functions import Cast
+
+from .models import (
+    ActivityAchievement, ActivityBudget, MainActivity, SubActivity,
+    SubActivityBudgetUtilization, SubActivityCostLine
+)
+from .report_aggregates import refresh_utilization
+
+# Rows per INSERT statement when the backend supports multi-row inserts
+BULK_BATCH_SIZE = 500
+
+
+def _consecutive_insert_ids():
+    """
+    True when a multi-row INSERT on this MySQL server gets consecutive
+    auto-increment ids: InnoDB's "traditional" (0) and "consecutive" (1) lock
+    modes reserve the whole range of a simple INSERT, with an increment of 1.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment')
+        lock_mode, increment = cursor.fetchone()
+    return int(lock_mode) in (0, 1) and int(increment) == 1
+
+
+def bulk_create_with_pks(model, objs, batch_size=BULK_BATCH_SIZE):
+    """
+    bulk_create() that guarantees primary keys are set on the returned objects.
+
+    MySQL cannot return ids from a multi-row INSERT. When the server hands out
+    consecutive ids per statement, each batch is still one INSERT and its ids
+    are LAST_INSERT_ID() (the first id of the statement) onwards. With
+    interleaved lock mode (MySQL 8's default) ids of one statement may have
+    gaps, so the rows are inserted one by one and MySQL gets no gain. Callers
+    are expected to wrap this in transaction.atomic() either way.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+
+    if connection.features.can_return_rows_from_bulk_insert or any(obj.pk is not None for obj in objs):
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+
+    if connection.vendor == 'mysql' and _consecutive_insert_ids():
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            model.objects.bulk_create(batch, batch_size=len(batch))
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT LAST_INSERT_ID()')
+                first_id = cursor.fetchone()[0]
+            for offset, obj in enumerate(batch):
+                obj.pk = first_id + offset
+        return objs
+
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+def _raw_delete(queryset):
+    """
+    Issue a single DELETE for the queryset without collecting related objects
+    in Python. Callers must delete dependent rows first.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_main_activities(main_activity_ids):
+    """
+    Delete main activities and all rows that depend on them.
+
+    Uses one DELETE ... WHERE ... IN (subquery) statement per table instead of
+    Django's cascade collector, which loads every related row into memory.
+    Must be called inside transaction.atomic(). Refreshes the utilization
+    aggregates of the reports that lose budget utilizations. Returns the
+    number of deleted rows per model.
+    """
+    # MySQL cannot delete from a table while selecting from it in a subquery
+    main_activity_ids = list(main_activity_ids)
+    if not main_activity_ids:
+        return {}
+
+    sub_activity_ids = SubActivity.objects.filter(main_activity_id__in=main_activity_ids).values('id')
+    # ActivityBudget only keeps the sub-activity id as text
+    sub_activity_refs = SubActivity.objects.filter(
+        main_activity_id__in=main_activity_ids
+    ).annotate(ref=Cast('id', CharField())).values('ref')
+
+    report_ids = set(SubActivityBudgetUtilization.objects.filter(
+        sub_activity_id__in=sub_activity_ids
+    ).values_list('report_id', flat=True))
+
+    deleted = {}
+    deleted['activity_budgets'] = _raw_delete(
+        ActivityBudget.objects.filter(Q(sub_activity_id__in=sub_activity_refs) | Q(activity_id__in=main_activity_ids))
+    )
+    deleted['budget_utilizations'] = _raw_delete(
+        SubActivityBudgetUtilization.objects.filter(sub_activity_id__in=sub_activity_ids)
+    )
+    deleted['cost_lines'] = _raw_delete(
+        SubActivityCostLine.objects.filter(sub_activity_id__in=sub_activity_ids)
+    )
+    deleted['activity_achievements'] = _raw_delete(
+        ActivityAchievement.objects.filter(main_activity_id__in=main_activity_ids)
+    )
+    deleted['sub_activities'] = _raw_delete(
+        SubActivity.objects.filter(main_activity_id__in=main_activity_ids)
+    )
+    deleted['main_activities'] = _raw_delete(
+        MainActivity.objects.filter(id__in=main_activity_ids)
+    )
+    refresh_utilization(report_ids)
+    return deleted
@@ -0,0 +1,198 @@
+"""
+Chunked, resumable narrative report uploads.
+
+A client starts an upload with the file's name and size, sends the file as
+raw parts in order (each with its byte offset and optionally its SHA-256),
+and completes it. Parts are copied from the request stream straight into a
+part file under MEDIA_ROOT, so memory per request is bounded by
+COPY_BLOCK_SIZE. After a dropped connection the client asks for the upload
+and continues from its received offset.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import NarrativeUpload
+
+# Under MEDIA_ROOT
+UPLOAD_DIR = os.path.join('uploads', 'narratives')
+
+# Upper bounds for a whole narrative file and for one part
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024
+MAX_PART_SIZE = 8 * 1024 * 1024
+
+# Part size suggested to clients
+DEFAULT_PART_SIZE = 1024 * 1024
+
+# Bytes copied per read from the request stream
+COPY_BLOCK_SIZE = 64 * 1024
+
+# Unfinished uploads idle this long are discarded
+STALE_AFTER = timedelta(days=2)
+
+
+class UploadError(ValueError):
+    """Raised for upload requests that cannot be applied; carries the HTTP status"""
+
+    def __init__(self, message, status=400, received=None):
+        super().__init__(message)
+        self.status = status
+        self.received = received
+
+
+def _absolute(relative_path):
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def _is_sha256(value):
+    return len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+def describe(upload):
+    return {
+        'id': str(upload.id),
+        'report': upload.report_id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'received': upload.received,
+        'status': upload.status,
+        'part_size': DEFAULT_PART_SIZE,
+        'max_part_size': MAX_PART_SIZE,
+    }
+
+
+def discard_stale_uploads():
+    """Delete unfinished uploads (and their part files) idle for longer than STALE_AFTER"""
+    stale = NarrativeUpload.objects.filter(status='UPLOADING', updated_at__lt=timezone.now() - STALE_AFTER)
+    for upload in stale:
+        try:
+            os.remove(_absolute(upload.temp_path))
+        except OSError:
+            pass
+        upload.delete()
+
+
+def start_upload(report, user, filename, size, sha256=''):
+    filename = os.path.basename(str(filename or '').replace('\\', '/')).strip()
+    if not filename:
+        raise UploadError('filename is required')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('size must be a number of bytes')
+    if size <= 0 or size > MAX_UPLOAD_SIZE:
+        raise UploadError(f'size must be between 1 and {MAX_UPLOAD_SIZE} bytes')
+    sha256 = str(sha256 or '').lower()
+    if sha256 and not _is_sha256(sha256):
+        raise UploadError('sha256 must be a hex SHA-256 digest')
+
+    discard_stale_uploads()
+
+    upload = NarrativeUpload(report=report, created_by=user, filename=filename[:255], size=size, sha256=sha256)
+    upload.temp_path = os.path.join(UPLOAD_DIR, f'{upload.id}.part').replace(os.sep, '/')
+    os.makedirs(_absolute(UPLOAD_DIR), exist_ok=True)
+    # Create the part file up front so every part can open it for update
+    open(_absolute(upload.temp_path), 'wb').close()
+    upload.save()
+    return upload
+
+
+def write_part(upload_id, offset, stream, length, part_sha256=''):
+    """
+    Append length bytes read from stream at offset. The offset must equal the
+    bytes already received; a repeated part is rejected with the current
+    offset so the client can skip ahead. Returns the updated upload.
+    """
+    if length is None or length <= 0:
+        raise UploadError('Content-Length is required', status=411)
+    if length > MAX_PART_SIZE:
+        raise UploadError(f'Parts are limited to {MAX_PART_SIZE} bytes', status=413)
+    part_sha256 = str(part_sha256 or '').lower()
+    if part_sha256 and not _is_sha256(part_sha256):
+        raise UploadError('Part checksum must be a hex SHA-256 digest')
+
+    with transaction.atomic():
+        # Serializes parts of the same upload; a second writer sees the new offset
+        upload = NarrativeUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status != 'UPLOADING':
+            raise UploadError(f'Upload is {upload.status.lower()}', status=409, received=upload.received)
+        if offset != upload.received:
+            raise UploadError(
+                f'Expected offset {upload.received}', status=409, received=upload.received
+            )
+        if offset + length > upload.size:
+            raise UploadError('Part extends past the declared size', received=upload.received)
+
+        digest = hashlib.sha256()
+        written = 0
+        with open(_absolute(upload.temp_path), 'r+b') as part_file:
+            part_file.seek(offset)
+            while written < length:
+                block = stream.read(min(COPY_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                part_file.write(block)
+                digest.update(block)
+                written += len(block)
+
+            if written != length or (part_sha256 and digest.hexdigest() != part_sha256):
+                # Drop the partial or corrupt part; the client resends it from the same offset
+                part_file.truncate(offset)
+                raise UploadError(
+                    'Part was incomplete' if written != length else 'Part checksum mismatch',
+                    received=upload.received
+                )
+
+        upload.received = offset + written
+        upload.save(update_fields=['received', 'updated_at'])
+    return upload
+
+
+def complete_upload(upload_id):
+    """Verify the whole file and attach it to the report's narrative_report"""
+    with transaction.atomic():
+        upload = NarrativeUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status != 'UPLOADING':
+            raise UploadError(f'Upload is {upload.status.lower()}', status=409, received=upload.received)
+        if upload.received != upload.size:
+            raise UploadError(
+                f'Received {upload.received} of {upload.size} bytes', status=409, received=upload.received
+            )
+
+        path = _absolute(upload.temp_path)
+        if upload.sha256:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as part_file:
+                for block in iter(lambda: part_file.read(COPY_BLOCK_SIZE), b''):
+                    digest.update(block)
+            if digest.hexdigest() != upload.sha256:
+                raise UploadError('File checksum mismatch; restart the upload', status=422, received=upload.received)
+
+        report = upload.report
+        with open(path, 'rb') as part_file:
+            report.narrative_report.save(upload.filename, File(part_file), save=False)
+        report.narrative_filename = upload.filename
+        report.save(update_fields=['narrative_report', 'narrative_filename', 'updated_at'])
+
+        upload.status = 'COMPLETED'
+        upload.save(update_fields=['status', 'updated_at'])
+
+    os.remove(path)
+    return upload
+
+
+def abort_upload(upload_id):
+    upload = NarrativeUpload.objects.get(pk=upload_id)
+    if upload.status == 'UPLOADING':
+        try:
+            os.remove(_absolute(upload.temp_path))
+        except OSError:
+            pass
+        upload.status = 'ABORTED'
+        upload.save(update_fields=['status', 'updated_at'])
+    return upload
@@ -0,0 +1,317 @@
+"""
+Ministry-wide consolidated workbook of approved plans.
+
+The workbook has a Summary sheet followed by one sheet per organization
+with the objectives, measures, activities and sub-activity budgets of its
+approved plans. Each organization's sheet XML is stored on disk under a
+fingerprint of the rows it was built from (counts, latest updated_at and
+budget sums), so a later run only re-reads organizations whose data
+changed and zips the stored sheets of the others as they are. Stored
+sheets are opened before stale ones are pruned, so a concurrent run that
+removes a sheet cannot pull it from under a workbook being written.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .exports import PLAN_COLUMNS, plan_rows, valid_sheet_name, write_xlsx, xlsx_sheet
+from .models import (
+    MainActivity, Organization, PerformanceMeasure, Plan, StrategicInitiative, StrategicObjective, SubActivity
+)
+
+# Under MEDIA_ROOT
+EXPORT_DIR = os.path.join('exports', 'consolidated')
+FRAGMENT_DIR = 'fragments'
+
+# Bump when the sheet layout changes so stored sheets are rebuilt
+LAYOUT_VERSION = 1
+
+# Finished workbooks kept on disk; older ones are removed after each run
+KEEP_WORKBOOKS = 3
+
+# Approved plans loaded per round trip
+PLAN_CHUNK_SIZE = 100
+
+# Bytes copied per read when zipping a stored sheet
+COPY_BLOCK_SIZE = 1024 * 1024
+
+CONSOLIDATED_COLUMNS = ['Plan ID', 'Fiscal Year', 'Plan Type', *PLAN_COLUMNS]
+
+SUMMARY_COLUMNS = [
+    'Organization', 'Sheet', 'Approved Plans', 'Rows', 'Sub-activities',
+    'Estimated Cost', 'Total Funding', 'Funding Gap',
+]
+
+_COST_INDEX = CONSOLIDATED_COLUMNS.index('Estimated Cost')
+_FUNDING_INDEX = CONSOLIDATED_COLUMNS.index('Total Funding')
+_GAP_INDEX = CONSOLIDATED_COLUMNS.index('Funding Gap')
+
+
+def _stamps(queryset, key, **extra):
+    """{key value: [count, latest updated_at, *extra aggregates]}"""
+    rows = queryset.values(key).annotate(count=Count('id'), latest=Max('updated_at'), **extra).order_by()
+    return {row[key]: [row['count'], row['latest'], *(row[name] for name in extra)] for row in rows}
+
+
+def organization_states(organization_ids):
+    """
+    {organization id: JSON-serializable state} of the objectives, initiatives,
+    measures, activities and sub-activities an organization's plans show.
+    Any change to those rows changes the state. Only the given organizations'
+    rows and the default (organization-less) rows are read.
+    """
+    organization_ids = list(organization_ids)
+    own_or_default = Q(organization_id__in=organization_ids) | Q(organization__isnull=True)
+    initiatives = _stamps(StrategicInitiative.objects.filter(own_or_default), 'organization_id')
+    measures = _stamps(PerformanceMeasure.objects.filter(own_or_default), 'organization_id')
+    activities = _stamps(MainActivity.objects.filter(own_or_default), 'organization_id')
+    sub_activities = _stamps(
+        SubActivity.objects.filter(
+            Q(main_activity__organization_id__in=organization_ids)
+            | Q(main_activity__initiative__organization_id__in=organization_ids)
+            | Q(main_activity__organization__isnull=True, main_activity__initiative__organization__isnull=True)
+        ).annotate(
+            owner_id=Coalesce('main_activity__organization_id', 'main_activity__initiative__organization_id')
+        ),
+        'owner_id', cost=Sum('effective_cost'), funding=Sum('funding_total')
+    )
+    objectives = StrategicObjective.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+
+    # Default (organization-less) rows appear in every organization's plans
+    shared = [
+        objectives['count'], objectives['latest'],
+        initiatives.get(None), measures.get(None), activities.get(None), sub_activities.get(None)
+    ]
+    return {
+        organization_id: shared + [
+            initiatives.get(organization_id), measures.get(organization_id),
+            activities.get(organization_id), sub_activities.get(organization_id),
+        ]
+        for organization_id in organization_ids
+    }
+
+
+def fingerprint(state):
+    return hashlib.sha1(json.dumps(state, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def organization_fingerprints(organization_ids):
+    """Fingerprint of everything an organization's sheet is built from"""
+    plans = {}
+    for plan_id, organization_id, updated_at in Plan.objects.filter(
+        status='APPROVED', organization_id__in=organization_ids
+    ).order_by('id').values_list('id', 'organization_id', 'updated_at'):
+        plans.setdefault(organization_id, []).append([plan_id, updated_at])
+
+    selections = dict(
+        Plan.selected_objectives.through.objects.filter(
+            plan__status='APPROVED', plan__organization_id__in=organization_ids
+        ).values('plan__organization_id').annotate(count=Count('id')).order_by().values_list(
+            'plan__organization_id', 'count'
+        )
+    )
+    return {
+        organization_id: fingerprint(
+            [LAYOUT_VERSION, plans.get(organization_id), selections.get(organization_id), state]
+        )
+        for organization_id, state in organization_states(organization_ids).items()
+    }
+
+
+def _organization_rows(organization_id):
+    """CONSOLIDATED_COLUMNS rows of an organization's approved plans, read in id-ordered chunks"""
+    plans = Plan.objects.filter(
+        status='APPROVED', organization_id=organization_id
+    ).select_related('organization').order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(plans.filter(id__gt=last_id)[:PLAN_CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for plan in chunk:
+            for row in plan_rows(plan):
+                yield [plan.id, plan.fiscal_year, plan.type, *row]
+
+
+def _add(total, value):
+    return total + float(value) if value not in (None, '') else total
+
+
+def _temp_file(path, mode):
+    """A uniquely named temporary file next to path, to be renamed over it"""
+    handle, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=os.path.dirname(path))
+    # mkstemp creates owner-only files; published files stay readable as before
+    os.chmod(temp_path, 0o644)
+    return os.fdopen(handle, mode), temp_path
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _build_fragment(organization_id, xml_path, meta_path):
+    """
+    Write an organization's sheet XML and its summary figures next to it.
+    Returns (the sheet XML opened for reading, summary figures).
+    """
+    meta = {'plans': set(), 'rows': 0, 'sub_activities': 0,
+            'estimated_cost': 0.0, 'funding': 0.0, 'gap': 0.0}
+
+    def rows():
+        for row in _organization_rows(organization_id):
+            meta['plans'].add(row[0])
+            meta['rows'] += 1
+            if len(row) > _GAP_INDEX:
+                meta['sub_activities'] += 1
+                meta['estimated_cost'] = _add(meta['estimated_cost'], row[_COST_INDEX])
+                meta['funding'] = _add(meta['funding'], row[_FUNDING_INDEX])
+                meta['gap'] = _add(meta['gap'], row[_GAP_INDEX])
+            yield row
+
+    fragment, xml_temp = _temp_file(xml_path, 'wb')
+    meta_file, meta_temp = _temp_file(meta_path, 'w')
+    try:
+        with fragment:
+            for piece in xlsx_sheet(CONSOLIDATED_COLUMNS, rows()):
+                fragment.write(piece)
+        meta['plans'] = len(meta['plans'])
+        with meta_file:
+            json.dump(meta, meta_file)
+        # Keep a handle on the XML; the published file may be pruned by a later run
+        opened = open(xml_temp, 'rb')
+    except Exception:
+        _discard(xml_temp)
+        _discard(meta_temp)
+        raise
+    # Publish the sheet only once both files are complete
+    os.replace(meta_temp, meta_path)
+    os.replace(xml_temp, xml_path)
+    return opened, meta
+
+
+def _open_fragment(xml_path, meta_path):
+    """(stored sheet XML opened for reading, summary figures), or None when it is missing"""
+    try:
+        fragment = open(xml_path, 'rb')
+    except FileNotFoundError:
+        return None
+    try:
+        with open(meta_path) as meta_file:
+            return fragment, json.load(meta_file)
+    except (OSError, ValueError):
+        fragment.close()
+        return None
+
+
+def _read_fragment(fragment):
+    with fragment:
+        while True:
+            block = fragment.read(COPY_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+
+def _remove_stale(directory, prefix, keep, suffixes=('.xml', '.json', '.xlsx')):
+    for filename in os.listdir(directory):
+        if filename.startswith(prefix) and filename.endswith(suffixes) and filename not in keep:
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+
+
+def build_consolidated_export(organization_ids=None, progress=None, label=None):
+    """
+    Write the consolidated workbook under MEDIA_ROOT/EXPORT_DIR.
+
+    organization_ids limits the workbook to those organizations (None means
+    every organization with an approved plan). Returns the workbook path
+    relative to MEDIA_ROOT with counts of rebuilt and reused sheets.
+    """
+    export_dir = os.path.join(settings.MEDIA_ROOT, EXPORT_DIR)
+    fragment_dir = os.path.join(export_dir, FRAGMENT_DIR)
+    os.makedirs(fragment_dir, exist_ok=True)
+
+    organizations = Organization.objects.filter(plans__status='APPROVED').distinct().order_by('name', 'id')
+    if organization_ids is not None:
+        organizations = organizations.filter(id__in=organization_ids)
+    organizations = list(organizations.values_list('id', 'name'))
+
+    total = len(organizations) + 1
+    if progress:
+        progress(0, total)
+
+    fingerprints = organization_fingerprints([org_id for org_id, _ in organizations])
+    sheets = []
+    summary = []
+    used_names = ['Summary']
+    rebuilt = reused = 0
+    fragments = []
+    for done, (organization_id, name) in enumerate(organizations, start=1):
+        stem = f'org-{organization_id}-{fingerprints[organization_id]}'
+        xml_path = os.path.join(fragment_dir, f'{stem}.xml')
+        meta_path = os.path.join(fragment_dir, f'{stem}.json')
+        stored = _open_fragment(xml_path, meta_path)
+        if stored is not None:
+            fragment, meta = stored
+            reused += 1
+        else:
+            fragment, meta = _build_fragment(organization_id, xml_path, meta_path)
+            rebuilt += 1
+        fragments.append(fragment)
+        _remove_stale(fragment_dir, f'org-{organization_id}-', {f'{stem}.xml', f'{stem}.json'})
+
+        title = valid_sheet_name(name, used_names)
+        used_names.append(title)
+        sheets.append((title, _read_fragment(fragment)))
+        summary.append([
+            name, title, meta['plans'], meta['rows'], meta['sub_activities'],
+            round(meta['estimated_cost'], 2), round(meta['funding'], 2), round(meta['gap'], 2)
+        ])
+        if progress:
+            progress(done, total)
+
+    filename = f'consolidated-{timezone.now():%Y%m%d-%H%M%S}{f"-{label}" if label else ""}.xlsx'
+    path = os.path.join(export_dir, filename)
+    workbook, temp_path = _temp_file(path, 'wb')
+    try:
+        with workbook:
+            write_xlsx(workbook, [('Summary', xlsx_sheet(SUMMARY_COLUMNS, summary))] + sheets)
+    except Exception:
+        _discard(temp_path)
+        raise
+    finally:
+        for fragment in fragments:
+            fragment.close()
+    os.replace(temp_path, path)
+
+    workbooks = sorted(
+        (entry for entry in os.listdir(export_dir) if entry.startswith('consolidated-') and entry.endswith('.xlsx')),
+        key=lambda entry: os.path.getmtime(os.path.join(export_dir, entry)),
+        reverse=True
+    )
+    _remove_stale(export_dir, 'consolidated-', set(workbooks[:KEEP_WORKBOOKS]))
+
+    if progress:
+        progress(total, total)
+
+    return {
+        'file': os.path.join(EXPORT_DIR, filename).replace(os.sep, '/'),
+        'size': os.path.getsize(path),
+        'organizations': len(organizations),
+        'rebuilt_sheets': rebuilt,
+        'reused_sheets': reused,
+        'plans': sum(row[2] for row in summary),
+        'rows': sum(row[3] for row in summary),
+    }
@@ -0,0 +1,183 @@
+"""
+Maintenance of SubActivityCostLine rows.
+
+Lines are derived from a sub-activity's stored tool details with the
+costing engine. Every WITH_TOOL sub-activity gets lines that add up to its
+estimated_cost_with_tool: any difference between the engine's estimate and
+the stored cost (e.g. inputs the tools do not record) is kept as one
+UNITEMIZED line, and details the engine cannot price become a single
+UNITEMIZED line for the whole cost.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+
+from .bulk_ops import BULK_BATCH_SIZE, _raw_delete
+from .costing import DETAILS_FIELDS, CostingError, estimate, get_rate_tables, spec_from_details
+from .models import SubActivity, SubActivityCostLine
+
+# Sub-activities rebuilt per round trip by rebuild_all_cost_lines()
+REBUILD_CHUNK_SIZE = 1000
+
+# SubActivity fields the lines are derived from. Saves that change none of
+# them keep the stored lines, so their amounts stay at the rates they were
+# priced with until recosting applies a rate change.
+COST_INPUT_FIELDS = (
+    'budget_calculation_type', 'activity_type', 'estimated_cost_with_tool', *dict.fromkeys(DETAILS_FIELDS.values())
+)
+
+_local = threading.local()
+
+logger = logging.getLogger(__name__)
+
+
+def build_cost_lines(sub_activity, tables=None):
+    """Unsaved SubActivityCostLine rows for one sub-activity"""
+    if sub_activity.budget_calculation_type != 'WITH_TOOL':
+        return []
+
+    stored_cost = sub_activity.estimated_cost_with_tool
+    lines = []
+    if sub_activity.activity_type in DETAILS_FIELDS:
+        tables = tables or get_rate_tables()
+        details = getattr(sub_activity, DETAILS_FIELDS[sub_activity.activity_type])
+        try:
+            result = estimate(spec_from_details(sub_activity.activity_type, details, tables), tables)
+        except CostingError:
+            result = None
+        except Exception:
+            # Malformed details must not break the save that derives the lines
+            logger.exception(f"Cannot itemize the tool details of sub-activity {sub_activity.id}")
+            result = None
+
+        if result is not None:
+            lines = [
+                SubActivityCostLine(
+                    sub_activity_id=sub_activity.id,
+                    category=line['category'],
+                    cost_type=line['cost_type'] or '',
+                    description=(line['description'] or '')[:255],
+                    rate_model=line['rate_model'] or '',
+                    rate_id=line['rate_id'],
+                    location_id=line['location'],
+                    quantity=line['quantity'],
+                    unit_price=line['unit_price'],
+                    amount=line['amount']
+                )
+                for line in result['lines']
+            ]
+            stored_cost -= result['total']
+
+    if stored_cost:
+        lines.append(SubActivityCostLine(
+            sub_activity_id=sub_activity.id,
+            category='UNITEMIZED',
+            description='Difference to the stored tool cost' if lines else 'Stored tool cost',
+            quantity=1,
+            unit_price=stored_cost,
+            amount=stored_cost
+        ))
+    return lines
+
+
+def rebuild_cost_lines(sub_activities, tables=None):
+    """
+    Replace the cost lines of the given saved sub-activities with one DELETE
+    and batched INSERTs. Returns the number of lines written.
+    """
+    sub_activities = [sub_activity for sub_activity in sub_activities if sub_activity.pk]
+    if not sub_activities:
+        return 0
+
+    tables = tables or get_rate_tables()
+    lines = []
+    for sub_activity in sub_activities:
+        lines.extend(build_cost_lines(sub_activity, tables))
+
+    with transaction.atomic():
+        _raw_delete(SubActivityCostLine.objects.filter(
+            sub_activity_id__in=[sub_activity.pk for sub_activity in sub_activities]
+        ))
+        SubActivityCostLine.objects.bulk_create(lines, batch_size=BULK_BATCH_SIZE)
+    return len(lines)
+
+
+def rebuild_all_cost_lines(queryset=None, progress=None):
+    """Rebuild cost lines for a SubActivity queryset (default all) in id-ordered chunks"""
+    if queryset is None:
+        queryset = SubActivity.objects.all()
+    queryset = queryset.order_by('id')
+
+    total = queryset.count()
+    if progress:
+        progress(0, total)
+
+    tables = get_rate_tables()
+    done = written = 0
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:REBUILD_CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        written += rebuild_cost_lines(chunk, tables)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return {'sub_activities': done, 'cost_lines': written}
+
+
+@contextmanager
+def deferred_cost_lines():
+    """
+    Collect sub-activity saves inside the block and rebuild their cost lines
+    in one pass when it exits. Nested blocks share the outer collection.
+    """
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+
+    _local.pending = {}
+    try:
+        yield
+        pending = list(_local.pending.values())
+    finally:
+        _local.pending = None
+    try:
+        rebuild_cost_lines(pending)
+    except Exception:
+        logger.exception("Error rebuilding deferred sub-activity cost lines")
+
+
+def cost_inputs_changed(sub_activity, update_fields=None):
+    """Whether saving sub_activity changes a field its cost lines are derived from"""
+    if sub_activity.pk is None:
+        return True
+    if update_fields is not None and not set(update_fields) & set(COST_INPUT_FIELDS):
+        return False
+    stored = SubActivity.objects.filter(pk=sub_activity.pk).values(*COST_INPUT_FIELDS).first()
+    if stored is None:
+        return True
+    for field in COST_INPUT_FIELDS:
+        value = getattr(sub_activity, field)
+        if field == 'estimated_cost_with_tool':
+            changed = Decimal(str(value or 0)) != (stored[field] or 0)
+        else:
+            changed = value != stored[field]
+        if changed:
+            return True
+    return False
+
+
+def queue_cost_lines(sub_activities):
+    """Rebuild lines now, or at the end of the enclosing deferred_cost_lines() block"""
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        rebuild_cost_lines(sub_activities)
+        return
+    for sub_activity in sub_activities:
+        if sub_activity.pk:
+            pending[sub_activity.pk] = sub_activity
@@ -0,0 +1,899 @@
+"""
+Server-side costing engine.
+
+Computes itemized cost estimates for training, meeting/workshop and
+supervision sub-activities from a compact input spec, using the same
+formulas as the costing tools in the frontend but against rate tables held
+in process memory.
+
+A spec looks like:
+
+    {
+        "activity_type": "Training",
+        "location": 5, "days": 3, "participants": 30, "sessions": 2,
+        "cost_mode": "perdiem",                      # or "accommodation"
+        "accommodation_types": ["FULL_BOARD"],
+        "additional_locations": [{"location": 7, "days": 2, "participants": 10}],
+        "participant_costs": ["FLASH_DISK"],
+        "session_costs": ["ALL"],
+        "land_routes": [{"transport": 12, "participants": 3},
+                        {"origin": 1, "destination": 5, "trip_type": "ROUND", "participants": 2}],
+        "air_routes": [{"transport": 4, "participants": 1}],
+        "other_costs": 0
+    }
+
+Supervision specs use "supervisors" instead of "participants" and may add
+"supervisor_costs" and "supervisors_with_additional_cost". Procurement specs
+list catalogue items: {"activity_type": "Procurement", "items": [{"item": 3,
+"quantity": 10}], "other_costs": 0}, and printing specs list documents:
+{"activity_type": "Printing", "documents": [{"document_type": "MANUAL",
+"pages": 40, "copies": 200}], "other_costs": 0}. Every estimate is
+returned as cost lines (category, rate reference, quantity, unit price,
+amount) whose amounts add up to the total.
+"""
+import hashlib
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Max
+
+from .models import (
+    Location, LandTransport, AirTransport, PerDiem, Accommodation,
+    ParticipantCost, SessionCost, SupervisorCost, PrintingCost, ProcurementItem,
+    ActivityCostingAssumption
+)
+from .search import TrigramIndex
+
+CENT = Decimal('0.01')
+
+# Fallback rates used by the frontend tools when a location has no rate row
+DEFAULT_PER_DIEM_ADDIS = Decimal('1200')
+DEFAULT_PER_DIEM = Decimal('1100')
+DEFAULT_HARDSHIP_ALLOWANCE = Decimal('200')
+DEFAULT_ACCOMMODATION = {
+    'BED': Decimal('1500'),
+    'LUNCH': Decimal('400'),
+    'DINNER': Decimal('500'),
+    'HALL_REFRESHMENT': Decimal('800'),
+    'FULL_BOARD': Decimal('2400'),
+}
+# Default accommodation rates go up by 10% in hardship areas
+HARDSHIP_ACCOMMODATION_UPLIFT = Decimal('1.1')
+DEFAULT_LAND_TRANSPORT = Decimal('1000')
+DEFAULT_AIR_TRANSPORT = Decimal('5000')
+# The training tool prices participant and session items at fixed amounts, not from the rate tables
+TRAINING_PARTICIPANT_COSTS = {
+    'ALL': Decimal('700'),
+    'FLASH_DISK': Decimal('500'),
+    'STATIONARY': Decimal('200'),
+}
+TRAINING_SESSION_COSTS = {
+    'ALL': Decimal('1000'),
+    'FLIP_CHART': Decimal('300'),
+    'MARKER': Decimal('150'),
+    'TONER_PAPER': Decimal('1000'),
+}
+DEFAULT_PRINTING_PER_PAGE = {
+    'MANUAL': Decimal('50'),
+    'BOOKLET': Decimal('40'),
+    'LEAFLET': Decimal('30'),
+    'BROCHURE': Decimal('35'),
+}
+
+EVENT_ACTIVITY_TYPES = ('Training', 'Meeting', 'Workshop')
+SUPERVISION_ACTIVITY_TYPES = ('Supervision',)
+PROCUREMENT_ACTIVITY_TYPES = ('Procurement',)
+PRINTING_ACTIVITY_TYPES = ('Printing',)
+
+# Models whose rows make up the rate tables; edits to any of them change the version
+RATE_MODELS = (
+    Location, LandTransport, AirTransport, PerDiem, Accommodation, ParticipantCost,
+    SessionCost, SupervisorCost, PrintingCost, ProcurementItem, ActivityCostingAssumption
+)
+
+# How long a process trusts its snapshot before re-checking the version against
+# the database. Edits made in this process invalidate it immediately.
+RATE_TABLES_CHECK_SECONDS = 30
+
+# Bundle layout: table name -> (RateTables attribute, serialized columns)
+BUNDLE_TABLES = (
+    ('locations', 'locations', ('id', 'name', 'region', 'is_hardship_area')),
+    ('land_transports', 'land_transports', ('id', 'origin_id', 'destination_id', 'trip_type', 'price')),
+    ('air_transports', 'air_transports', ('id', 'origin_id', 'destination_id', 'price')),
+    ('per_diems', 'per_diems', ('id', 'location_id', 'amount', 'hardship_allowance_amount')),
+    ('accommodations', 'accommodations', ('id', 'location_id', 'service_type', 'price')),
+    ('participant_costs', 'participant_costs', ('id', 'cost_type', 'price')),
+    ('session_costs', 'session_costs', ('id', 'cost_type', 'price')),
+    ('supervisor_costs', 'supervisor_costs', ('id', 'cost_type', 'amount')),
+    ('printing_costs', 'printing_costs', ('id', 'document_type', 'price_per_page')),
+    ('procurement_items', 'procurement_items', ('id', 'category', 'name', 'unit', 'unit_price')),
+    ('assumptions', 'assumptions', ('id', 'activity_type', 'location', 'cost_type', 'amount')),
+)
+
+
+class CostingError(ValueError):
+    """Raised for specs the engine cannot price"""
+
+
+class RateTables:
+    """
+    Immutable in-memory snapshot of the costing reference tables.
+
+    Built with one query per table; lookups are plain dict accesses.
+    version identifies the database state the snapshot was loaded from.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self._bundle = None
+        self._procurement_index = None
+        self._assumption_matrix = None
+
+        self.locations = {
+            loc.id: loc for loc in Location.objects.all()
+        }
+        self.per_diems = {
+            row.location_id: row for row in PerDiem.objects.all()
+        }
+        self.accommodations = {
+            (row.location_id, row.service_type): row for row in Accommodation.objects.all()
+        }
+        self.participant_costs = {
+            row.cost_type: row for row in ParticipantCost.objects.all()
+        }
+        self.session_costs = {
+            row.cost_type: row for row in SessionCost.objects.all()
+        }
+        self.supervisor_costs = {
+            row.cost_type: row for row in SupervisorCost.objects.all()
+        }
+        self.printing_costs = {
+            row.document_type: row for row in PrintingCost.objects.all()
+        }
+        self.land_transports = {
+            row.id: row for row in LandTransport.objects.all()
+        }
+        self.air_transports = {
+            row.id: row for row in AirTransport.objects.all()
+        }
+        self.procurement_items = {
+            row.id: row for row in ProcurementItem.objects.all()
+        }
+        # Stored tool details name route ends by location name
+        self.location_ids_by_name = {}
+        for loc in sorted(self.locations.values(), key=lambda loc: loc.id):
+            self.location_ids_by_name.setdefault(loc.name.strip().lower(), loc.id)
+        # Route indexes; duplicate routes resolve to the most recently updated row
+        self.land_routes = {}
+        for row in sorted(self.land_transports.values(), key=lambda row: row.updated_at):
+            self.land_routes[(row.origin_id, row.destination_id, row.trip_type)] = row
+        self.air_routes = {}
+        for row in sorted(self.air_transports.values(), key=lambda row: row.updated_at):
+            self.air_routes[(row.origin_id, row.destination_id)] = row
+        self.assumptions = {
+            (row.activity_type, row.location, row.cost_type): row
+            for row in ActivityCostingAssumption.objects.all()
+        }
+
+    def location_id(self, name):
+        if not name:
+            return None
+        return self.location_ids_by_name.get(str(name).strip().lower())
+
+    def land_route(self, origin_id, destination_id, trip_type='SINGLE'):
+        return self.land_routes.get((origin_id, destination_id, trip_type))
+
+    def air_route(self, origin_id, destination_id):
+        return self.air_routes.get((origin_id, destination_id))
+
+    def average_price(self, transports, default):
+        prices = [row.price for row in transports.values()]
+        if not prices:
+            return default
+        return (sum(prices, Decimal('0')) / len(prices)).quantize(CENT)
+
+    def procurement_index(self):
+        """Trigram index over procurement item names and categories, built on first use"""
+        if self._procurement_index is None:
+            self._procurement_index = TrigramIndex(
+                (row.id, row.name, f'{row.category} {row.get_category_display()}')
+                for row in self.procurement_items.values()
+            )
+        return self._procurement_index
+
+    def assumption_matrix(self):
+        """Dense ActivityCostingAssumption lookup, built on first use"""
+        if self._assumption_matrix is None:
+            self._assumption_matrix = AssumptionMatrix(self.assumptions, self.locations)
+        return self._assumption_matrix
+
+    def bundle(self):
+        """
+        Every table as {"fields": [...], "rows": [[...], ...]}, built once per
+        snapshot. Decimals are sent as strings like the rest of the API.
+        """
+        if self._bundle is None:
+            tables = {}
+            for name, attr, fields in BUNDLE_TABLES:
+                rows = sorted(getattr(self, attr).values(), key=lambda row: row.id)
+                tables[name] = {
+                    'fields': list(fields),
+                    'rows': [[_bundle_value(getattr(row, field)) for field in fields] for row in rows]
+                }
+            self._bundle = {'version': self.version, 'tables': tables}
+        return self._bundle
+
+
+def _bundle_value(value):
+    return str(value) if isinstance(value, Decimal) else value
+
+
+def rate_tables_version():
+    """
+    Fingerprint of the rate tables: row count and latest updated_at per
+    model. Any save or delete changes it.
+    """
+    parts = []
+    for model in RATE_MODELS:
+        stats = model.objects.aggregate(count=Count('pk'), changed=Max('updated_at'))
+        parts.append(f"{model._meta.label}:{stats['count']}:{stats['changed'].isoformat() if stats['changed'] else ''}")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def _assumption_key(text):
+    return ''.join(ch for ch in str(text or '').lower() if ch.isalnum())
+
+
+class AssumptionMatrix:
+    """
+    ActivityCostingAssumption amounts in a flat list indexed by
+    (activity_type, location, cost_type) positions, with Location rows
+    mapped to the assumption locations by name or region.
+    """
+
+    def __init__(self, assumptions, locations):
+        model = ActivityCostingAssumption
+        axes = [
+            [key for key, _ in model.ACTIVITY_TYPES],
+            [key for key, _ in model.LOCATIONS],
+            [key for key, _ in model.COST_TYPES],
+        ]
+        # Rows saved with values outside the current choices still resolve
+        for key in assumptions:
+            for axis, value in zip(axes, key):
+                if value not in axis:
+                    axis.append(value)
+        self.activity_types, self.assumption_locations, self.cost_types = (
+            {value: index for index, value in enumerate(axis)} for axis in axes
+        )
+        self.rows = [None] * (len(axes[0]) * len(axes[1]) * len(axes[2]))
+        for key, row in assumptions.items():
+            self.rows[self._offset(*key)] = row
+
+        labels = {_assumption_key(key): key for key in self.assumption_locations}
+        labels.update({_assumption_key(label): key for key, label in model.LOCATIONS})
+        self.location_keys = {}
+        for location in locations.values():
+            key = labels.get(_assumption_key(location.name)) or labels.get(_assumption_key(location.region))
+            if key:
+                self.location_keys[location.id] = key
+
+    def _offset(self, activity_type, location, cost_type):
+        return (
+            self.activity_types[activity_type] * len(self.assumption_locations) + self.assumption_locations[location]
+        ) * len(self.cost_types) + self.cost_types[cost_type]
+
+    def row(self, activity_type, location, cost_type):
+        """Assumption row or None; location may be an assumption location key or a Location id"""
+        if not isinstance(location, str):
+            location = self.location_keys.get(location)
+        if (activity_type not in self.activity_types or location not in self.assumption_locations
+                or cost_type not in self.cost_types):
+            return None
+        return self.rows[self._offset(activity_type, location, cost_type)]
+
+    def get(self, activity_type, location, cost_type):
+        """Assumed amount or None"""
+        row = self.row(activity_type, location, cost_type)
+        return row.amount if row is not None else None
+
+    def resolve(self, specs):
+        """
+        Amounts for many (activity_type, location, cost_type) tuples or
+        {"activity_type", "location", "cost_type"} dicts, in order
+        """
+        amounts = []
+        for spec in specs:
+            if isinstance(spec, dict):
+                spec = (spec.get('activity_type'), spec.get('location'), spec.get('cost_type'))
+            amounts.append(self.get(*spec))
+        return amounts
+
+
+def resolve_assumptions(specs, tables=None):
+    """Bulk assumption lookup against the process-wide rate tables"""
+    return (tables or get_rate_tables()).assumption_matrix().resolve(specs)
+
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def get_rate_tables():
+    """
+    Return the process-wide rate tables, loading them on first use and
+    reloading them when another process has changed the underlying rows.
+    """
+    global _tables
+    tables = _tables
+    if tables is not None and time.monotonic() - tables.checked_at < RATE_TABLES_CHECK_SECONDS:
+        return tables
+
+    with _tables_lock:
+        tables = _tables
+        if tables is not None and time.monotonic() - tables.checked_at < RATE_TABLES_CHECK_SECONDS:
+            return tables
+
+        # Read the version before the rows so a concurrent edit forces another reload
+        version = rate_tables_version()
+        if tables is None or tables.version != version:
+            tables = _tables = RateTables(version)
+        else:
+            tables.checked_at = time.monotonic()
+    return tables
+
+
+def invalidate_rate_tables():
+    """Drop the cached rate tables; the next lookup reloads them"""
+    global _tables
+    with _tables_lock:
+        _tables = None
+
+
+class Estimate:
+    """Accumulates cost lines for one spec"""
+
+    def __init__(self, activity_type):
+        self.activity_type = activity_type
+        self.lines = []
+        self.warnings = []
+
+    def add(self, category, quantity, unit_price, rate_model=None, rate_id=None,
+            location_id=None, description='', cost_type=''):
+        quantity = Decimal(quantity)
+        unit_price = Decimal(unit_price)
+        if quantity <= 0:
+            return
+        self.lines.append({
+            'category': category,
+            'cost_type': cost_type,
+            'description': description,
+            'rate_model': rate_model,
+            'rate_id': rate_id,
+            'location': location_id,
+            'quantity': quantity,
+            'unit_price': unit_price.quantize(CENT),
+            'amount': (quantity * unit_price).quantize(CENT),
+        })
+
+    @property
+    def total(self):
+        return sum((line['amount'] for line in self.lines), Decimal('0'))
+
+    def as_dict(self):
+        return {
+            'activity_type': self.activity_type,
+            'total': self.total,
+            'lines': self.lines,
+            'warnings': self.warnings,
+        }
+
+
+# Spec parsing helpers
+
+def _number(spec, key, default=0, minimum=0):
+    value = spec.get(key, default)
+    if value in (None, ''):
+        value = default
+    try:
+        value = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise CostingError(f'{key} must be a number')
+    if value < minimum:
+        raise CostingError(f'{key} must be at least {minimum}')
+    return value
+
+
+def _id(value, key, required=False):
+    if value in (None, ''):
+        if required:
+            raise CostingError(f'{key} is required')
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise CostingError(f'{key} must be an id')
+
+
+def _list(spec, key):
+    value = spec.get(key) or []
+    if not isinstance(value, list):
+        raise CostingError(f'{key} must be a list')
+    return value
+
+
+def _expand_all(selected, table):
+    """'ALL' stands for every concrete cost type in the table"""
+    if 'ALL' in selected:
+        return sorted(cost_type for cost_type in table if cost_type != 'ALL')
+    return list(dict.fromkeys(selected))
+
+
+# Rate lookups
+
+def _per_diem_rate(tables, location_id, estimate, training_main=False):
+    """
+    training_main applies the training tool's fallbacks for its main location:
+    a zero amount counts as the Addis rate and a hardship area without a
+    hardship allowance gets the default allowance.
+    """
+    row = tables.per_diems.get(location_id)
+    if row is not None:
+        if not training_main:
+            return row.amount + (row.hardship_allowance_amount or 0), 'PerDiem', row.id
+        hardship = row.hardship_allowance_amount or 0
+        location = tables.locations.get(location_id)
+        if not hardship and location is not None and location.is_hardship_area:
+            hardship = DEFAULT_HARDSHIP_ALLOWANCE
+        return (row.amount or DEFAULT_PER_DIEM_ADDIS) + hardship, 'PerDiem', row.id
+
+    location = tables.locations.get(location_id)
+    if location is None:
+        raise CostingError(f'Unknown location {location_id}')
+    assumption = tables.assumption_matrix().row(estimate.activity_type, location_id, 'per_diem')
+    if assumption is not None:
+        estimate.warnings.append(f'No per diem rate for {location.name}; costing assumption used')
+        return assumption.amount, 'ActivityCostingAssumption', assumption.id
+    rate = DEFAULT_PER_DIEM_ADDIS if location.region == 'Addis Ababa' else DEFAULT_PER_DIEM
+    if location.is_hardship_area:
+        rate += DEFAULT_HARDSHIP_ALLOWANCE
+    estimate.warnings.append(f'No per diem rate for {location.name}; default rate used')
+    return rate, None, None
+
+
+def _accommodation_rate(tables, location_id, service_type, estimate):
+    row = tables.accommodations.get((location_id, service_type))
+    if row is not None:
+        return row.price, 'Accommodation', row.id
+
+    location = tables.locations.get(location_id)
+    if location is None:
+        raise CostingError(f'Unknown location {location_id}')
+    # Assumptions carry a single accommodation amount, taken as full board
+    if service_type == 'FULL_BOARD':
+        assumption = tables.assumption_matrix().row(estimate.activity_type, location_id, 'accommodation')
+        if assumption is not None:
+            estimate.warnings.append(f'No {service_type} accommodation rate for location {location_id}; costing assumption used')
+            return assumption.amount, 'ActivityCostingAssumption', assumption.id
+    if service_type not in DEFAULT_ACCOMMODATION:
+        raise CostingError(f'No {service_type} accommodation rate for location {location_id}')
+    rate = DEFAULT_ACCOMMODATION[service_type]
+    if location.is_hardship_area:
+        rate *= HARDSHIP_ACCOMMODATION_UPLIFT
+    estimate.warnings.append(f'No {service_type} accommodation rate for location {location_id}; default rate used')
+    return rate, None, None
+
+
+def _item_rate(tables, table, rate_model, prefix, cost_type, location_id, estimate):
+    """Participant/session cost price, falling back to e.g. the participant_flash_disk assumption"""
+    row = table.get(cost_type)
+    if row is not None:
+        return row.price, rate_model, row.id
+
+    assumption = tables.assumption_matrix().row(estimate.activity_type, location_id, f'{prefix}_{cost_type.lower()}')
+    if assumption is None:
+        raise CostingError(f'Unknown {prefix} cost {cost_type}')
+    estimate.warnings.append(f'No {prefix} cost rate for {cost_type}; costing assumption used')
+    return assumption.amount, 'ActivityCostingAssumption', assumption.id
+
+
+def _route(tables, route, air):
+    """Resolve a route by transport id, or by origin/destination (and trip type)"""
+    kind = 'air' if air else 'land'
+    transport_id = _id(route.get('transport'), 'transport')
+    if transport_id is not None:
+        row = (tables.air_transports if air else tables.land_transports).get(transport_id)
+        if row is None:
+            raise CostingError(f'Unknown {kind} transport {transport_id}')
+        return row
+
+    origin_id = _id(route.get('origin'), 'origin', required=True)
+    destination_id = _id(route.get('destination'), 'destination', required=True)
+    if air:
+        row = tables.air_route(origin_id, destination_id)
+    else:
+        row = tables.land_route(origin_id, destination_id, route.get('trip_type') or 'SINGLE')
+    if row is None:
+        raise CostingError(f'No {kind} transport from location {origin_id} to {destination_id}')
+    return row
+
+
+def parse_route_pairs(value):
+    """
+    Parse "origin-destination[-TRIP_TYPE],..." into (origin_id, destination_id,
+    trip_type) tuples; trip type defaults to SINGLE.
+    """
+    pairs = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split('-')
+        if len(parts) not in (2, 3):
+            raise CostingError(f'Invalid route pair "{item}"; expected origin-destination[-TRIP_TYPE]')
+        trip_type = parts[2].upper() if len(parts) == 3 else 'SINGLE'
+        if trip_type not in ('SINGLE', 'ROUND'):
+            raise CostingError(f'Invalid trip type "{parts[2]}" in "{item}"')
+        pairs.append((_id(parts[0], 'origin', required=True), _id(parts[1], 'destination', required=True), trip_type))
+    return pairs
+
+
+def lookup_routes(pairs, air=False, tables=None):
+    """Prices for many legs at once; unknown legs come back with transport None"""
+    tables = tables or get_rate_tables()
+    results = []
+    for origin_id, destination_id, trip_type in pairs:
+        row = tables.air_route(origin_id, destination_id) if air else tables.land_route(origin_id, destination_id, trip_type)
+        result = {'origin': origin_id, 'destination': destination_id}
+        if not air:
+            result['trip_type'] = trip_type
+        result['transport'] = row.id if row is not None else None
+        result['price'] = row.price if row is not None else None
+        results.append(result)
+    return results
+
+
+# Estimators
+
+def _stays(spec, people_key):
+    """Main location plus additional locations as (location_id, people, days)"""
+    location_id = _id(spec.get('location'), 'location', required=True)
+    stays = [(location_id, _number(spec, people_key), _number(spec, 'days'))]
+    for extra in _list(spec, 'additional_locations'):
+        extra_location = _id(extra.get('location'), 'additional_locations.location')
+        if extra_location is None:
+            continue
+        stays.append((
+            extra_location,
+            _number(extra, people_key if people_key in extra else 'participants'),
+            _number(extra, 'days')
+        ))
+    return stays
+
+
+def _add_stays(estimate, tables, spec, stays, multiplier, accommodation_types):
+    if spec.get('cost_mode', 'perdiem') == 'perdiem':
+        for index, (location_id, people, days) in enumerate(stays):
+            training_main = index == 0 and estimate.activity_type == 'Training'
+            rate, rate_model, rate_id = _per_diem_rate(tables, location_id, estimate, training_main)
+            estimate.add('PER_DIEM', people * days * multiplier, rate, rate_model, rate_id,
+                         location_id=location_id, description='Per diem')
+    else:
+        for service_type in accommodation_types:
+            for location_id, people, days in stays:
+                rate, rate_model, rate_id = _accommodation_rate(tables, location_id, service_type, estimate)
+                estimate.add('ACCOMMODATION', people * days * multiplier, rate, rate_model, rate_id,
+                             location_id=location_id, description=service_type, cost_type=service_type)
+
+
+def _add_transport(estimate, tables, spec, multiplier, land_key, air_key):
+    for route in _list(spec, 'land_routes'):
+        row = _route(tables, route, air=False)
+        estimate.add('LAND_TRANSPORT', _number(route, 'participants', default=1) * multiplier, row.price,
+                     'LandTransport', row.id, location_id=row.destination_id, description='Land transport')
+    for route in _list(spec, 'air_routes'):
+        row = _route(tables, route, air=True)
+        estimate.add('AIR_TRANSPORT', _number(route, 'participants', default=1) * multiplier, row.price,
+                     'AirTransport', row.id, location_id=row.destination_id, description='Air transport')
+
+    # Head counts without routes are priced at the average route price
+    land_people = _number(spec, land_key)
+    air_people = _number(spec, air_key)
+    if land_people:
+        estimate.add('LAND_TRANSPORT', land_people * multiplier,
+                     tables.average_price(tables.land_transports, DEFAULT_LAND_TRANSPORT),
+                     description='Land transport (average route price)')
+    if air_people:
+        estimate.add('AIR_TRANSPORT', air_people * multiplier,
+                     tables.average_price(tables.air_transports, DEFAULT_AIR_TRANSPORT),
+                     description='Air transport (average route price)')
+
+
+def _estimate_event(spec, tables, estimate):
+    """Training, meeting and workshop: the whole subtotal repeats per session"""
+    sessions = _number(spec, 'sessions', default=1, minimum=1)
+    stays = _stays(spec, 'participants')
+    _add_stays(estimate, tables, spec, stays, sessions, spec.get('accommodation_types') or ['FULL_BOARD'])
+
+    if estimate.activity_type == 'Training':
+        _add_training_items(estimate, stays[0][1], sessions, spec)
+    else:
+        _add_event_items(estimate, tables, stays, sessions, spec)
+
+    if spec.get('transport_required', True):
+        _add_transport(estimate, tables, spec, sessions, 'land_participants', 'air_participants')
+
+    estimate.add('OTHER', sessions, _number(spec, 'other_costs'), description='Other costs')
+
+
+def _add_training_items(estimate, participants, sessions, spec):
+    """Fixed-amount items of the training tool; participant items count main-location participants only"""
+    for category, prices, key, quantity in (
+        ('PARTICIPANT', TRAINING_PARTICIPANT_COSTS, 'participant_costs', participants * sessions),
+        ('SESSION', TRAINING_SESSION_COSTS, 'session_costs', sessions * sessions),
+    ):
+        for cost_type in dict.fromkeys(_list(spec, key)):
+            if cost_type not in prices:
+                estimate.warnings.append(f'{cost_type} is not priced by the training tool; ignored')
+                continue
+            estimate.add(category, quantity, prices[cost_type], description=cost_type, cost_type=cost_type)
+
+
+def _add_event_items(estimate, tables, stays, sessions, spec):
+    """Meeting and workshop items at rate table prices, for participants at every location"""
+    people = sum((people for _, people, _ in stays), Decimal('0'))
+    main_location = stays[0][0]
+    for cost_type in _expand_all(_list(spec, 'participant_costs'), tables.participant_costs):
+        price, rate_model, rate_id = _item_rate(tables, tables.participant_costs, 'ParticipantCost', 'participant',
+                                                cost_type, main_location, estimate)
+        estimate.add('PARTICIPANT', people * sessions, price, rate_model, rate_id,
+                     description=cost_type, cost_type=cost_type)
+
+    for cost_type in _expand_all(_list(spec, 'session_costs'), tables.session_costs):
+        price, rate_model, rate_id = _item_rate(tables, tables.session_costs, 'SessionCost', 'session',
+                                                cost_type, main_location, estimate)
+        estimate.add('SESSION', sessions * sessions, price, rate_model, rate_id,
+                     description=cost_type, cost_type=cost_type)
+
+
+def _estimate_supervision(spec, tables, estimate):
+    """Supervision: costs are not repeated per session"""
+    stays = _stays(spec, 'supervisors')
+    accommodation_types = spec.get('accommodation_types') or [spec.get('accommodation_type') or 'FULL_BOARD']
+    _add_stays(estimate, tables, spec, stays, 1, accommodation_types)
+
+    # As in the tool, additional costs apply to no supervisor unless a head count is given
+    extra_supervisors = _number(spec, 'supervisors_with_additional_cost')
+    for cost_type in _expand_all(_list(spec, 'supervisor_costs'), tables.supervisor_costs):
+        row = tables.supervisor_costs.get(cost_type)
+        if row is None:
+            raise CostingError(f'Unknown supervisor cost {cost_type}')
+        estimate.add('SUPERVISOR', extra_supervisors, row.amount, 'SupervisorCost', row.id,
+                     description=cost_type, cost_type=cost_type)
+
+    _add_transport(estimate, tables, spec, 1, 'land_supervisors', 'air_supervisors')
+    estimate.add('OTHER', 1, _number(spec, 'other_costs'), description='Other costs')
+
+
+def _estimate_procurement(spec, tables, estimate):
+    """Procurement: catalogue items at their unit price"""
+    for item in _list(spec, 'items'):
+        item_id = _id(item.get('item'), 'items.item', required=True)
+        row = tables.procurement_items.get(item_id)
+        if row is None:
+            raise CostingError(f'Unknown procurement item {item_id}')
+        estimate.add('PROCUREMENT', _number(item, 'quantity'), row.unit_price, 'ProcurementItem', row.id,
+                     description=row.name, cost_type=row.category)
+    estimate.add('OTHER', 1, _number(spec, 'other_costs'), description='Other costs')
+
+
+def _document_type(value):
+    """Accept MANUAL as well as the tool's 'Manual' or a display label"""
+    text = str(value or '').strip()
+    if text.upper() in dict(PrintingCost.DOCUMENT_TYPES):
+        return text.upper()
+    for document_type, label in PrintingCost.DOCUMENT_TYPES:
+        if label.lower() == text.lower() or label.lower().startswith(f'{text.lower()}/'):
+            return document_type
+    raise CostingError(f'Unknown printing document type "{value}"')
+
+
+def _estimate_printing(spec, tables, estimate):
+    """Printing: pages x copies at the document type's price per page"""
+    for document in _list(spec, 'documents'):
+        document_type = _document_type(document.get('document_type'))
+        row = tables.printing_costs.get(document_type)
+        if row is not None:
+            price, rate_model, rate_id = row.price_per_page, 'PrintingCost', row.id
+        else:
+            price, rate_model, rate_id = DEFAULT_PRINTING_PER_PAGE[document_type], None, None
+            estimate.warnings.append(f'No printing rate for {document_type}; default rate used')
+        estimate.add('PRINTING', _number(document, 'pages') * _number(document, 'copies'), price,
+                     rate_model, rate_id, description=document.get('description') or document_type,
+                     cost_type=document_type)
+    estimate.add('OTHER', 1, _number(spec, 'other_costs'), description='Other costs')
+
+
+def estimate(spec, tables=None):
+    """Price one spec and return its itemized estimate as a dict"""
+    if not isinstance(spec, dict):
+        raise CostingError('Each estimate spec must be an object')
+    tables = tables or get_rate_tables()
+
+    activity_type = spec.get('activity_type')
+    result = Estimate(activity_type)
+    if activity_type in EVENT_ACTIVITY_TYPES:
+        _estimate_event(spec, tables, result)
+    elif activity_type in SUPERVISION_ACTIVITY_TYPES:
+        _estimate_supervision(spec, tables, result)
+    elif activity_type in PROCUREMENT_ACTIVITY_TYPES:
+        _estimate_procurement(spec, tables, result)
+    elif activity_type in PRINTING_ACTIVITY_TYPES:
+        _estimate_printing(spec, tables, result)
+    else:
+        raise CostingError(f'Cannot estimate costs for activity type "{activity_type}"')
+    return result.as_dict()
+
+
+# Adapters from the tool details stored on SubActivity to estimate specs
+
+# Sub-activity types the engine can price, and the details field each tool fills
+DETAILS_FIELDS = {
+    'Training': 'training_details',
+    'Meeting': 'meeting_workshop_details',
+    'Workshop': 'meeting_workshop_details',
+    'Supervision': 'supervision_details',
+    'Procurement': 'procurement_details',
+    'Printing': 'printing_details',
+}
+
+
+def _cost_types(selected):
+    """Cost type selections are stored as strings or as {"costType": ...} rows"""
+    cost_types = []
+    for item in selected or []:
+        cost_type = item.get('costType') if isinstance(item, dict) else item
+        if cost_type:
+            cost_types.append(cost_type)
+    return cost_types
+
+
+def _route_spec(route, tables, air):
+    """
+    Stored routes carry a transportId (meeting and supervision tools) or only
+    the origin and destination names (training tool).
+    """
+    if not isinstance(route, dict):
+        raise CostingError('Transport routes must be objects')
+    spec = {'participants': route.get('participants') or 1}
+    if route.get('transportId'):
+        spec['transport'] = route['transportId']
+        return spec
+
+    origin_name = route.get('originName') or route.get('origin')
+    destination_name = route.get('destinationName') or route.get('destination')
+    origin_id = tables.location_id(origin_name)
+    destination_id = tables.location_id(destination_name)
+    if origin_id is None or destination_id is None:
+        raise CostingError(f'Cannot resolve route "{origin_name}" to "{destination_name}"')
+    spec.update(origin=origin_id, destination=destination_id)
+    if not air:
+        trip_type = route.get('tripType')
+        if not trip_type:
+            # The training tool does not record the trip type; prefer a single trip
+            trip_type = 'SINGLE' if tables.land_route(origin_id, destination_id, 'SINGLE') else 'ROUND'
+        spec['trip_type'] = trip_type
+    return spec
+
+
+def _require_supervision_inputs(details, spec):
+    """
+    Supervision details saved before the tool stored every priced input
+    cannot be itemized: raise CostingError rather than guess the head counts
+    or the accommodation type.
+    """
+    missing = []
+    if spec['supervisor_costs'] and 'numberOfSupervisorsWithAdditionalCost' not in details:
+        missing.append('numberOfSupervisorsWithAdditionalCost')
+    if details.get('costMode') == 'accommodation' and 'accommodationType' not in details:
+        missing.append('accommodationType')
+    if 'transportRequired' not in details:
+        missing.append('transportRequired')
+    elif details['transportRequired']:
+        missing.extend(
+            field for field in ('landTransportSupervisors', 'airTransportSupervisors') if field not in details
+        )
+    if missing:
+        raise CostingError(f"Supervision details do not record {', '.join(missing)}")
+
+
+def spec_from_details(activity_type, details, tables=None):
+    """
+    Build an estimate spec from a sub-activity's stored tool details.
+
+    Raises CostingError when the details cannot be priced.
+    """
+    if activity_type not in DETAILS_FIELDS:
+        raise CostingError(f'Cannot estimate costs for activity type "{activity_type}"')
+    if not isinstance(details, dict) or not details:
+        raise CostingError(f'No {DETAILS_FIELDS[activity_type]} recorded')
+    tables = tables or get_rate_tables()
+
+    if activity_type in PROCUREMENT_ACTIVITY_TYPES:
+        return {
+            'activity_type': activity_type,
+            'items': [
+                {'item': item.get('itemId'), 'quantity': item.get('quantity')}
+                for item in details.get('items') or []
+                if isinstance(item, dict) and item.get('itemId')
+            ],
+            'other_costs': details.get('otherCosts'),
+        }
+
+    if activity_type in PRINTING_ACTIVITY_TYPES:
+        # The tool prices one document; batch quotes may store several
+        documents = details.get('documents') or [details]
+        return {
+            'activity_type': activity_type,
+            'documents': [
+                {
+                    'document_type': document.get('documentType') or document.get('document_type'),
+                    'pages': document.get('numberOfPages', document.get('pages')),
+                    'copies': document.get('numberOfCopies', document.get('copies')),
+                    'description': document.get('description'),
+                }
+                for document in documents
+                if isinstance(document, dict)
+            ],
+            'other_costs': details.get('otherCosts'),
+        }
+
+    supervision = activity_type in SUPERVISION_ACTIVITY_TYPES
+    people_key = 'supervisors' if supervision else 'participants'
+    people_field = 'numberOfSupervisors' if supervision else 'numberOfParticipants'
+
+    spec = {
+        'activity_type': activity_type,
+        'days': details.get('numberOfDays'),
+        people_key: details.get(people_field),
+        'cost_mode': details.get('costMode') or 'perdiem',
+        'other_costs': details.get('otherCosts'),
+        'additional_locations': [
+            {
+                'location': extra.get('locationId'),
+                'days': extra.get('days'),
+                people_key: extra.get(people_key, extra.get('participants')),
+            }
+            for extra in details.get('additionalLocations') or []
+            if isinstance(extra, dict)
+        ],
+        'land_routes': [_route_spec(route, tables, air=False) for route in details.get('landTransportRoutes') or []],
+        'air_routes': [_route_spec(route, tables, air=True) for route in details.get('airTransportRoutes') or []],
+    }
+
+    if activity_type == 'Training':
+        spec['location'] = details.get('trainingLocationId')
+        # The training tool prices one accommodation type, BED unless another is picked
+        spec['accommodation_types'] = [details.get('selectedAccommodationType') or 'BED']
+    elif supervision:
+        spec['location'] = details.get('location')
+        spec['supervisor_costs'] = _cost_types(details.get('additionalSupervisorCosts'))
+        _require_supervision_inputs(details, spec)
+        spec['supervisors_with_additional_cost'] = details.get('numberOfSupervisorsWithAdditionalCost') or 0
+        spec['accommodation_types'] = [details.get('accommodationType') or 'FULL_BOARD']
+        if details.get('transportRequired'):
+            spec['land_supervisors'] = details.get('landTransportSupervisors') or 0
+            spec['air_supervisors'] = details.get('airTransportSupervisors') or 0
+    else:
+        spec['location'] = details.get('trainingLocation')
+        spec['accommodation_types'] = details.get('selectedAccommodationTypes') or []
+
+    if not supervision:
+        spec['sessions'] = details.get('numberOfSessions') or 1
+        spec['participant_costs'] = _cost_types(details.get('additionalParticipantCosts'))
+        spec['session_costs'] = _cost_types(details.get('additionalSessionCosts'))
+        spec['transport_required'] = bool(details.get('transportRequired', True))
+
+    return spec
@@ -0,0 +1,412 @@
+"""
+Streaming plan and M&E report exports.
+
+Rows are produced one initiative at a time, so at most one initiative's
+measures, activities and sub-activities are held in memory, and they are
+encoded as they are produced: the response starts before the plan has been
+fully read. CSV is written through the csv module; XLSX is a write-only
+SpreadsheetML workbook zipped on the fly (inline strings, no shared string
+table), so nothing needs to be seeked back to once written.
+"""
+import csv
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db.models import Q
+
+from .models import (
+    ActivityAchievement, MainActivity, PerformanceAchievement, PerformanceMeasure, StrategicInitiative,
+    SubActivity, SubActivityBudgetUtilization
+)
+
+EXPORT_FORMATS = ('xlsx', 'csv')
+
+CONTENT_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Rows fetched per database round trip when iterating a queryset
+EXPORT_CHUNK_SIZE = 2000
+
+# Encoded bytes buffered before a chunk is handed to the response
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+PLAN_COLUMNS = [
+    'Strategic Objective', 'Objective Weight', 'Strategic Initiative', 'Initiative Weight',
+    'Row Type', 'Name', 'Weight', 'Baseline', 'Target Type',
+    'Q1 Target', 'Q2 Target', 'Q3 Target', 'Q4 Target', 'Annual Target',
+    'Sub-activity', 'Activity Type', 'Budget Type', 'Estimated Cost',
+    'Government Treasury', 'SDG Funding', 'Partners Funding', 'Other Funding',
+    'Total Funding', 'Funding Gap',
+]
+
+REPORT_COLUMNS = [
+    'Strategic Objective', 'Objective Weight', 'Strategic Initiative', 'Initiative Weight',
+    'Row Type', 'Name', 'Weight', 'Target', 'Achievement', 'Achievement %', 'Justification',
+    'Sub-activity', 'Activity Type', 'Total Budget',
+    'Government Treasury Utilized', 'SDG Funding Utilized', 'Partners Funding Utilized',
+    'Other Funding Utilized', 'Total Utilized', 'Remaining Budget',
+]
+
+TARGET_FIELDS = ('q1_target', 'q2_target', 'q3_target', 'q4_target', 'annual_target')
+
+
+def _initiatives(plan):
+    """(objective, objective weight, initiative) in plan order, each initiative once"""
+    weights = plan.selected_objectives_weights or {}
+    seen = set()
+    for objective in plan.selected_objectives.all().order_by('id'):
+        objective_weight = weights.get(str(objective.id), objective.weight)
+        initiatives = StrategicInitiative.objects.filter(
+            Q(organization=plan.organization) | Q(organization__isnull=True),
+            strategic_objective=objective
+        ).order_by('id')
+        for initiative in initiatives:
+            if initiative.id in seen:
+                continue
+            seen.add(initiative.id)
+            yield objective, objective_weight, initiative
+
+
+def _scoped(queryset, plan, initiative):
+    return queryset.filter(
+        Q(organization=plan.organization) | Q(organization__isnull=True),
+        initiative=initiative
+    ).order_by('id')
+
+
+def plan_rows(plan):
+    """PLAN_COLUMNS rows: every measure, then every activity with one row per sub-activity"""
+    for objective, objective_weight, initiative in _initiatives(plan):
+        prefix = [objective.title, objective_weight, initiative.name, initiative.weight]
+
+        measures = _scoped(PerformanceMeasure.objects, plan, initiative).values_list(
+            'name', 'weight', 'baseline', 'target_type', *TARGET_FIELDS
+        )
+        for name, weight, baseline, target_type, *targets in measures.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield prefix + ['Performance Measure', name, weight, baseline, target_type, *targets]
+
+        activities = _scoped(MainActivity.objects, plan, initiative).values_list(
+            'id', 'name', 'weight', 'baseline', 'target_type', *TARGET_FIELDS
+        )
+        for activity_id, name, weight, baseline, target_type, *targets in activities.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            activity_row = prefix + ['Main Activity', name, weight, baseline, target_type, *targets]
+            sub_activities = SubActivity.objects.filter(main_activity_id=activity_id).order_by('id').values_list(
+                'name', 'activity_type', 'budget_calculation_type', 'effective_cost',
+                'government_treasury', 'sdg_funding', 'partners_funding', 'other_funding',
+                'funding_total', 'funding_gap_amount'
+            )
+            empty = True
+            for sub_activity in sub_activities.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                empty = False
+                yield activity_row + list(sub_activity)
+            if empty:
+                yield activity_row
+
+
+def _percent(achievement, target):
+    if not target:
+        return None
+    return round(Decimal(achievement) / Decimal(target) * 100, 2)
+
+
+def report_rows(report, target_for_period):
+    """
+    REPORT_COLUMNS rows for the measures and activities planned in the
+    report's period, with achievements and budget utilization.
+
+    target_for_period(obj, report_type) returns the period target or None
+    for items outside the period, as in the M&E report view.
+    """
+    plan = report.plan
+    seen_activities = set()
+    for objective, objective_weight, initiative in _initiatives(plan):
+        prefix = [objective.title, objective_weight, initiative.name, initiative.weight]
+
+        measure_achievements = {
+            measure_id: (achievement, justification)
+            for measure_id, achievement, justification in PerformanceAchievement.objects.filter(
+                report=report, performance_measure__initiative=initiative
+            ).values_list('performance_measure_id', 'achievement', 'justification')
+        }
+        measures = _scoped(PerformanceMeasure.objects, plan, initiative).only(
+            'id', 'name', 'weight', 'selected_quarters', 'selected_months', *TARGET_FIELDS
+        )
+        for measure in measures.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            target = target_for_period(measure, report.report_type)
+            if not target or target <= 0:
+                continue
+            achievement, justification = measure_achievements.get(measure.id, (0, ''))
+            yield prefix + [
+                'Performance Measure', measure.name, measure.weight, target, achievement,
+                _percent(achievement, target), justification
+            ]
+
+        activity_achievements = {
+            activity_id: (achievement, justification)
+            for activity_id, achievement, justification in ActivityAchievement.objects.filter(
+                report=report, main_activity__initiative=initiative
+            ).values_list('main_activity_id', 'achievement', 'justification')
+        }
+        # Only sub-activities with a utilization row for this report were planned in its period
+        utilizations = {}
+        for row in SubActivityBudgetUtilization.objects.filter(
+            report=report, sub_activity__main_activity__initiative=initiative
+        ).order_by('sub_activity_id').values_list(
+            'sub_activity__main_activity_id', 'sub_activity__name', 'sub_activity__activity_type',
+            'sub_activity__funding_total', 'government_treasury_utilized', 'sdg_funding_utilized',
+            'partners_funding_utilized', 'other_funding_utilized'
+        ):
+            utilizations.setdefault(row[0], []).append(row[1:])
+
+        activities = _scoped(MainActivity.objects, plan, initiative).only(
+            'id', 'name', 'weight', 'selected_quarters', 'selected_months', *TARGET_FIELDS
+        )
+        for activity in activities.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            if activity.id in seen_activities:
+                continue
+            target = target_for_period(activity, report.report_type)
+            if not target or target <= 0:
+                continue
+            seen_activities.add(activity.id)
+            achievement, justification = activity_achievements.get(activity.id, (0, ''))
+            activity_row = prefix + [
+                'Main Activity', activity.name, activity.weight, target, achievement,
+                _percent(achievement, target), justification
+            ]
+            sub_activities = utilizations.get(activity.id)
+            if not sub_activities:
+                yield activity_row
+                continue
+            for name, activity_type, total_budget, *utilized in sub_activities:
+                total_utilized = sum(utilized, Decimal('0'))
+                yield activity_row + [
+                    name, activity_type, total_budget, *utilized, total_utilized, total_budget - total_utilized
+                ]
+
+
+# --- Encoders ---
+
+class _Buffer:
+    """Write-only byte sink that hands its contents out in chunks"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    """Yield UTF-8 CSV bytes (with BOM so Excel detects the encoding)"""
+    writer = csv.writer(_Echo())
+    pending = ['\ufeff', writer.writerow(columns)]
+    size = 0
+    for row in rows:
+        line = writer.writerow(['' if value is None else value for value in row])
+        pending.append(line)
+        size += len(line)
+        if size >= EXPORT_FLUSH_BYTES:
+            yield ''.join(pending).encode('utf-8')
+            pending = []
+            size = 0
+    yield ''.join(pending).encode('utf-8')
+
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def _xlsx_content_types(sheet_count):
+    sheets = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, sheet_count + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        f'{sheets}'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    )
+
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_workbook_rels(sheet_count):
+    sheets = ''.join(
+        f'<Relationship Id="rId{i}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, sheet_count + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'{sheets}'
+        f'<Relationship Id="rId{sheet_count + 1}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    )
+
+
+def _xlsx_workbook(sheet_names):
+    sheets = ''.join(
+        f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+        for i, name in enumerate(sheet_names, start=1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets>{sheets}</sheets>'
+        '</workbook>'
+    )
+
+
+# Style 0 is the default, style 1 the bold header
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+    '<cellXfs count="2"><xf fontId="0"/><xf fontId="1" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(number, values, letters, style=0):
+    cells = []
+    style_attr = f' s="{style}"' if style else ''
+    for letter, value in zip(letters, values):
+        if value is None or value == '':
+            continue
+        ref = f'{letter}{number}'
+        if isinstance(value, bool):
+            cells.append(f'<c r="{ref}" t="b"{style_attr}><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float, Decimal)):
+            cells.append(f'<c r="{ref}"{style_attr}><v>{value}</v></c>')
+        else:
+            text = escape(_INVALID_XML.sub('', str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def valid_sheet_name(name, used=()):
+    """name made valid as a worksheet name (31 characters, no []:*?/\\) and unique among used"""
+    base = re.sub(r'[\[\]:*?/\\]', ' ', str(name)).strip().strip("'")[:31] or 'Sheet'
+    candidate = base
+    suffix = 2
+    lowered = {existing.lower() for existing in used}
+    while candidate.lower() in lowered:
+        tail = f' ({suffix})'
+        candidate = base[:31 - len(tail)] + tail
+        suffix += 1
+    return candidate
+
+
+def xlsx_sheet(columns, rows):
+    """Yield the XML of one worksheet in pieces: header, one piece per row, footer"""
+    letters = [_column_letter(i) for i in range(len(columns))]
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetViews><sheetView workbookViewId="0">'
+        '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+        '</sheetView></sheetViews>'
+        '<sheetData>' + _xlsx_row(1, columns, letters, style=1)
+    ).encode('utf-8')
+    for number, row in enumerate(rows, start=2):
+        yield _xlsx_row(number, row, letters).encode('utf-8')
+    yield b'</sheetData></worksheet>'
+
+
+def _write_workbook(archive, sheets, flush=None):
+    """Write (name, sheet XML pieces) pairs into an open ZipFile, calling flush() between pieces"""
+    names = [name for name, _ in sheets]
+    archive.writestr('[Content_Types].xml', _xlsx_content_types(len(names)))
+    archive.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+    archive.writestr('xl/_rels/workbook.xml.rels', _xlsx_workbook_rels(len(names)))
+    archive.writestr('xl/styles.xml', _XLSX_STYLES)
+    archive.writestr('xl/workbook.xml', _xlsx_workbook(names))
+    for index, (_, pieces) in enumerate(sheets, start=1):
+        with archive.open(f'xl/worksheets/sheet{index}.xml', 'w') as sheet:
+            for piece in pieces:
+                sheet.write(piece)
+                if flush:
+                    yield from flush()
+
+
+def write_xlsx(fileobj, sheets):
+    """Write a workbook of (name, sheet XML pieces) pairs to a seekable file"""
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for _ in _write_workbook(archive, sheets):
+            pass
+
+
+def stream_xlsx(columns, rows, sheet_name='Export'):
+    """Yield the bytes of a single-sheet XLSX workbook while rows are produced"""
+    buffer = _Buffer()
+
+    def flush():
+        if buffer.size >= EXPORT_FLUSH_BYTES:
+            yield buffer.drain()
+
+    # An unseekable sink makes zipfile write data descriptors instead of seeking back
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        yield from _write_workbook(archive, [(valid_sheet_name(sheet_name), xlsx_sheet(columns, rows))], flush)
+    yield buffer.drain()
+
+
+def stream_export(file_format, columns, rows, sheet_name='Export'):
+    """Byte chunks of rows encoded as file_format (one of EXPORT_FORMATS)"""
+    if file_format == 'csv':
+        return stream_csv(columns, rows)
+    return stream_xlsx(columns, rows, sheet_name)
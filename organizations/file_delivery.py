@@ -0,0 +1,133 @@
+"""
+Delivery of stored files (narrative reports, exports).
+
+With FILE_DELIVERY_BACKEND set, Django only authorizes the download and
+hands the transfer to the front web server: 'nginx' answers with
+X-Accel-Redirect to FILE_DELIVERY_ACCEL_PREFIX (an internal location
+aliased to MEDIA_ROOT), 'apache' with X-Sendfile. Otherwise the file is
+sent from Django with ETag/Last-Modified validation and single-range
+support, so interrupted downloads can resume.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+# Bytes read per chunk when sending a range from Django
+CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _media_relative(path):
+    """path relative to MEDIA_ROOT, or None for files outside it"""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(path)
+    if os.path.commonpath([media_root, path]) != media_root:
+        return None
+    return os.path.relpath(path, media_root).replace(os.sep, '/')
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive for a single satisfiable range, None to send everything, False if unsatisfiable"""
+    match = _RANGE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        # Multiple or malformed ranges: a full response is always acceptable
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def send_file(request, path, filename=None, content_type=None, as_attachment=True):
+    """Response delivering the file at path; raises FileNotFoundError if it is missing"""
+    stat = os.stat(path)
+    etag = _file_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+    filename = filename or os.path.basename(path)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        not_modified['Last-Modified'] = last_modified
+        return not_modified
+
+    backend = getattr(settings, 'FILE_DELIVERY_BACKEND', '')
+    relative = _media_relative(path)
+    if backend == 'nginx' and relative is not None:
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/').rstrip('/')
+        response['X-Accel-Redirect'] = quote(f'{prefix}/{relative}')
+    elif backend == 'apache' and relative is not None:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = os.path.realpath(path)
+    else:
+        byte_range = None
+        if request.method == 'GET' and 'Range' in request.headers and _if_range_matches(request, etag, stat.st_mtime):
+            byte_range = _byte_range(request.headers['Range'], stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(path, start, end - start + 1), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            # FileResponse lets the WSGI server use its file wrapper (sendfile) when it has one
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            response['Content-Length'] = str(stat.st_size)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    # Downloads are authorized per user; keep shared caches out of it
+    response['Cache-Control'] = 'private, no-cache'
+    return response
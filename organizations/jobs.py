@@ -0,0 +1,59 @@
+"""
+Minimal background job runner.
+
+Jobs are recorded as BackgroundJob rows so their status can be polled from
+any worker process, and executed in a daemon thread once the transaction
+that created them commits. The job function receives the BackgroundJob
+instance, may report progress with job.set_progress(), and returns a
+JSON-serializable result.
+"""
+import logging
+import threading
+
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+
+def start_job(kind, func, user=None, params=None):
+    """Create a BackgroundJob and run func(job) in a background thread"""
+    job = BackgroundJob.objects.create(
+        kind=kind,
+        created_by=user if user is not None and user.is_authenticated else None,
+        params=params or {}
+    )
+    transaction.on_commit(
+        lambda: threading.Thread(target=run_job, args=(job.id, func), daemon=True).start()
+    )
+    return job
+
+
+def run_job(job_id, func):
+    """Execute func for the given job, recording status, result and errors"""
+    close_old_connections()
+    try:
+        job = BackgroundJob.objects.get(pk=job_id)
+        job.status = 'RUNNING'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'updated_at'])
+
+        try:
+            result = func(job)
+        except Exception as e:
+            logger.exception(f"Background job {job.kind} #{job.id} failed")
+            job.status = 'FAILED'
+            job.error = str(e)
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+            return
+
+        job.status = 'COMPLETED'
+        job.result = result
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'finished_at', 'updated_at'])
+    finally:
+        # Threads do not get Django's request_finished cleanup
+        connection.close()
@@ -0,0 +1,130 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from organizations.models import ContentBlob, Report
+from organizations.storage import NARRATIVE_BLOB_PREFIX, narrative_storage
+
+
+class Command(BaseCommand):
+    help = 'Recount references to content-addressed narrative blobs and delete the unreferenced ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=24,
+            help='Keep unreferenced blobs younger than this (uploads in flight), default 24'
+        )
+        parser.add_argument(
+            '--adopt-legacy',
+            action='store_true',
+            help='First move narratives stored under their upload name into content-addressed storage'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be deleted without deleting anything'
+        )
+
+    def handle(self, *args, **options):
+        storage = narrative_storage()
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        if options['adopt_legacy']:
+            adopted = self.adopt_legacy(storage, dry_run)
+            self.stdout.write(f'  {adopted} legacy narratives moved to content-addressed storage')
+
+        references = Counter(
+            name for name in Report.objects.exclude(narrative_report='').exclude(
+                narrative_report__isnull=True
+            ).values_list('narrative_report', flat=True)
+        )
+
+        # Reference counts are maintained by signals; queryset updates bypass them, so recount
+        corrected = 0
+        known = set()
+        for blob in ContentBlob.objects.all().iterator():
+            known.add(blob.name)
+            count = references.get(blob.name, 0)
+            if blob.ref_count != count:
+                corrected += 1
+                if not dry_run:
+                    ContentBlob.objects.filter(pk=blob.pk).update(ref_count=count, updated_at=timezone.now())
+        missing = [name for name in references if name not in known]
+        if missing and not dry_run:
+            ContentBlob.objects.bulk_create([
+                ContentBlob(
+                    name=name,
+                    sha256=os.path.splitext(os.path.basename(name))[0] if name.startswith(NARRATIVE_BLOB_PREFIX) else '',
+                    size=storage.size(name) if storage.exists(name) else 0,
+                    ref_count=references[name]
+                )
+                for name in missing
+            ], ignore_conflicts=True)
+
+        deleted = freed = 0
+        for blob in ContentBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).iterator():
+            if references.get(blob.name):
+                continue
+            if blob.name.startswith(f'{NARRATIVE_BLOB_PREFIX}/') and storage.exists(blob.name):
+                if self.is_recent(storage.path(blob.name), cutoff):
+                    # Re-uploaded since it was released; the new reference is about to be counted
+                    continue
+                freed += storage.size(blob.name)
+                if not dry_run:
+                    storage.delete(blob.name)
+            deleted += 1
+            if not dry_run:
+                blob.delete()
+
+        # Blob files without a row (crashed saves) and abandoned staging files
+        orphans = 0
+        root = storage.path(NARRATIVE_BLOB_PREFIX)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                if name in known or name in references:
+                    continue
+                if self.is_recent(path, cutoff):
+                    continue
+                orphans += 1
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Blob GC finished! {corrected} reference counts corrected, {len(missing)} blobs registered, '
+            f'{deleted} unreferenced blobs and {orphans} orphaned files removed, {freed} bytes freed.'
+        ))
+
+    def is_recent(self, path, cutoff):
+        return datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc) >= cutoff
+
+    def adopt_legacy(self, storage, dry_run):
+        """Re-store narratives saved under narrative_reports/<upload name> by content hash"""
+        adopted = 0
+        legacy = Report.objects.exclude(narrative_report='').exclude(narrative_report__isnull=True).exclude(
+            narrative_report__startswith=f'{NARRATIVE_BLOB_PREFIX}/'
+        ).values_list('id', 'narrative_report', 'narrative_filename')
+        for report_id, name, filename in list(legacy):
+            if not storage.exists(name):
+                self.stdout.write(self.style.WARNING(f'  Report {report_id}: {name} is missing'))
+                continue
+            adopted += 1
+            if dry_run:
+                continue
+            with storage.open(name, 'rb') as legacy_file:
+                blob_name = storage.save(name, legacy_file)
+            Report.objects.filter(pk=report_id).update(
+                narrative_report=blob_name,
+                narrative_filename=filename or os.path.basename(name)[:255]
+            )
+            if not Report.objects.filter(narrative_report=name).exists():
+                storage.delete(name)
+        return adopted
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from organizations.cost_lines import rebuild_all_cost_lines
+from organizations.models import SubActivity
+
+
+class Command(BaseCommand):
+    help = 'Backfill the normalized cost lines of tool-costed sub-activities'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization-id',
+            type=int,
+            action='append',
+            help='Only rebuild sub-activities of this organization (repeatable)',
+            required=False
+        )
+
+    def handle(self, *args, **options):
+        queryset = SubActivity.objects.filter(budget_calculation_type='WITH_TOOL')
+        organization_ids = options.get('organization_id')
+        if organization_ids:
+            queryset = queryset.filter(main_activity__organization_id__in=organization_ids) | queryset.filter(
+                main_activity__initiative__organization_id__in=organization_ids
+            )
+
+        def progress(done, total):
+            if done and done % 5000 == 0:
+                self.stdout.write(f'  {done}/{total} sub-activities')
+
+        result = rebuild_all_cost_lines(queryset, progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Cost lines rebuilt! {result['cost_lines']} lines for {result['sub_activities']} sub-activities."
+        ))
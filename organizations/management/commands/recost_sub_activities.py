@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from organizations.recosting import recost_sub_activities
+
+
+class Command(BaseCommand):
+    help = 'Re-price tool-costed sub-activities against the current rate tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Re-cost sub-activities using rates saved after this ISO datetime',
+            required=True
+        )
+        parser.add_argument(
+            '--organization-id',
+            type=int,
+            action='append',
+            help='Only re-cost sub-activities of this organization (repeatable)',
+            required=False
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the cost changes without saving them',
+        )
+
+    def handle(self, *args, **options):
+        since = parse_datetime(options['since'])
+        if since is None:
+            raise CommandError('--since must be an ISO datetime')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be saved'))
+
+        result = recost_sub_activities(
+            since=since,
+            organization_ids=options.get('organization_id'),
+            dry_run=options['dry_run']
+        )
+
+        for plan in result['plans']:
+            self.stdout.write(
+                f"  Plan {plan['plan']} (organization {plan['organization']}): {plan['sub_activities']} sub-activities, "
+                f"{plan['old_total']} -> {plan['new_total']} ({plan['delta']})"
+            )
+        for item in result['skipped_sub_activities']:
+            self.stdout.write(self.style.WARNING(f"  Sub-activity {item['sub_activity']}: {item['reason']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-costing completed! {result['checked']} checked, {result['updated']} "
+            f"{'would be ' if result['dry_run'] else ''}updated, {result['skipped']} skipped."
+        ))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from organizations.plan_rollover import roll_forward_plans, select_source_plans
+
+
+class Command(BaseCommand):
+    help = 'Carry plans over into a new fiscal year'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source-fiscal-year',
+            type=str,
+            help='Fiscal year of the plans to roll forward',
+            required=True
+        )
+        parser.add_argument(
+            '--target-fiscal-year',
+            type=str,
+            help='Fiscal year of the new plans (defaults to the next year)',
+            required=False
+        )
+        parser.add_argument(
+            '--organization-id',
+            type=int,
+            action='append',
+            help='Only roll forward plans of this organization (repeatable)',
+            required=False
+        )
+        parser.add_argument(
+            '--status',
+            action='append',
+            help='Source plan status to include (repeatable, default APPROVED)',
+            required=False
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the plans that would be rolled forward without saving',
+        )
+
+    def handle(self, *args, **options):
+        source_plans = select_source_plans(
+            options['source_fiscal_year'],
+            organization_ids=options.get('organization_id'),
+            statuses=options.get('status') or ['APPROVED']
+        )
+
+        if not source_plans:
+            self.stdout.write(self.style.WARNING('No plans found to roll forward.'))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be saved'))
+            for plan in source_plans:
+                self.stdout.write(f'  Plan {plan.id} ({plan.organization_id}) {plan.fiscal_year}')
+            self.stdout.write(self.style.SUCCESS(f'Dry run completed. {len(source_plans)} plans ready to roll forward.'))
+            return
+
+        try:
+            result = roll_forward_plans(
+                source_plans,
+                target_fiscal_year=options.get('target_fiscal_year')
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for item in result['plans']:
+            if item['status'] == 'skipped':
+                self.stdout.write(self.style.WARNING(f"  Plan {item['source_plan']}: {item['reason']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Roll forward completed! {result['created']} plans created, {result['skipped']} skipped."
+        ))
@@ -0,0 +1,21 @@
+# Generated migration for transport route indexes
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0026_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='landtransport',
+            index=models.Index(fields=['origin', 'destination', 'trip_type'], name='land_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airtransport',
+            index=models.Index(fields=['origin', 'destination'], name='air_route_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated migration for normalized sub-activity cost lines
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0027_transport_route_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubActivityCostLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('PER_DIEM', 'Per Diem'), ('ACCOMMODATION', 'Accommodation'), ('PARTICIPANT', 'Participant Cost'), ('SESSION', 'Session Cost'), ('LAND_TRANSPORT', 'Land Transport'), ('AIR_TRANSPORT', 'Air Transport'), ('SUPERVISOR', 'Supervisor Cost'), ('PRINTING', 'Printing'), ('PROCUREMENT', 'Procurement'), ('OTHER', 'Other'), ('UNITEMIZED', 'Unitemized')], max_length=20)),
+                ('cost_type', models.CharField(blank=True, default='', help_text='Rate-specific type, e.g. FULL_BOARD, FLASH_DISK or a procurement category', max_length=50)),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('rate_model', models.CharField(blank=True, default='', help_text='Rate table the unit price came from', max_length=30)),
+                ('rate_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unit_price', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cost_lines', to='organizations.location')),
+                ('sub_activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_lines', to='organizations.subactivity')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='subactivitycostline',
+            index=models.Index(fields=['category', 'location'], name='costline_cat_loc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subactivitycostline',
+            index=models.Index(fields=['category', 'cost_type'], name='costline_cat_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subactivitycostline',
+            index=models.Index(fields=['rate_model', 'rate_id'], name='costline_rate_idx'),
+        ),
+    ]
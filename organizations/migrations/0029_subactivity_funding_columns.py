@@ -0,0 +1,56 @@
+# Generated migration for stored sub-activity cost, funding and gap columns
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+
+
+def backfill_funding_columns(apps, schema_editor):
+    SubActivity = apps.get_model('organizations', 'SubActivity')
+    cost = Case(
+        When(budget_calculation_type='WITH_TOOL', then=F('estimated_cost_with_tool')),
+        default=F('estimated_cost_without_tool'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2)
+    )
+    funding = F('government_treasury') + F('sdg_funding') + F('partners_funding') + F('other_funding')
+    SubActivity.objects.update(
+        effective_cost=cost,
+        funding_total=funding,
+        funding_gap_amount=Greatest(cost - funding, Value(Decimal('0')))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0028_subactivitycostline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subactivity',
+            name='effective_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='subactivity',
+            name='funding_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='subactivity',
+            name='funding_gap_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_funding_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='subactivity',
+            index=models.Index(fields=['-funding_gap_amount'], name='subact_gap_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subactivity',
+            index=models.Index(fields=['main_activity', 'funding_gap_amount'], name='subact_mainact_gap_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated migration for chunked narrative report uploads
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('organizations', '0029_subactivity_funding_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NarrativeUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(help_text='Declared size of the whole file in bytes')),
+                ('sha256', models.CharField(blank=True, default='', help_text='Optional checksum of the whole file', max_length=64)),
+                ('received', models.PositiveBigIntegerField(default=0, help_text='Bytes written so far; the next part starts here')),
+                ('temp_path', models.CharField(help_text='Part file, relative to MEDIA_ROOT', max_length=500)),
+                ('status', models.CharField(choices=[('UPLOADING', 'Uploading'), ('COMPLETED', 'Completed'), ('ABORTED', 'Aborted')], default='UPLOADING', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='narrative_uploads', to=settings.AUTH_USER_MODEL)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='narrative_uploads', to='organizations.report')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='narrativeupload',
+            index=models.Index(fields=['status', 'updated_at'], name='narrupload_status_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated migration for content-addressed narrative storage
+
+from django.db import migrations, models
+import organizations.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0030_narrativeupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Storage name, relative to MEDIA_ROOT', max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='contentblob',
+            index=models.Index(fields=['ref_count', 'updated_at'], name='blob_refcount_idx'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='narrative_filename',
+            field=models.CharField(blank=True, default='', help_text='Original name of the narrative file', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='narrative_report',
+            field=models.FileField(blank=True, null=True, storage=organizations.storage.narrative_storage, upload_to='narrative_reports/'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated migration for precomputed plan reporting windows
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0031_content_addressed_narratives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportingWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('Q1', 'Quarter 1 Report'), ('Q2', 'Quarter 2 Report'), ('6M', '6 Month Report'), ('Q3', 'Quarter 3 Report'), ('9M', '9 Month Report'), ('Q4', 'Quarter 4 Report'), ('YEARLY', 'Yearly Report')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('opens_on', models.DateField(help_text='First day the report can be created')),
+                ('closes_on', models.DateField(blank=True, help_text='Last day the report can be created; empty for no deadline', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reporting_windows', to='organizations.plan')),
+            ],
+            options={
+                'ordering': ['plan', 'opens_on'],
+                'unique_together': {('plan', 'report_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated migration for precomputed report M&E aggregates
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0032_reportingwindow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportAggregate',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='aggregate', serialize=False, to='organizations.report')),
+                ('achievement_percent_sum', models.DecimalField(decimal_places=4, default=0, help_text='Sum of achievement/target percentages of the measures planned for the period', max_digits=20)),
+                ('measure_count', models.PositiveIntegerField(default=0)),
+                ('objective_achievements', models.JSONField(blank=True, default=dict, help_text="{objective id: [percentage sum, measure count]} over the organization's own measures")),
+                ('government_treasury_utilized', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('sdg_funding_utilized', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('partners_funding_utilized', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('other_funding_utilized', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('government_treasury_budget', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('sdg_funding_budget', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('partners_funding_budget', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('other_funding_budget', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
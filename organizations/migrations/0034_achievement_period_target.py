@@ -0,0 +1,23 @@
+# Generated migration for storing the period target with each achievement
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0033_reportaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performanceachievement',
+            name='period_target',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Target for the report period, stored when the achievement is saved', max_digits=15, null=True),
+        ),
+        migrations.AddField(
+            model_name='activityachievement',
+            name='period_target',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Target for the report period, stored when the achievement is saved', max_digits=15, null=True),
+        ),
+    ]
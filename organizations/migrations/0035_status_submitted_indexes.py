@@ -0,0 +1,30 @@
+# Generated migration for the (status, submitted_at) indexes of the review work queue
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_submitted_at(apps, schema_editor):
+    # The work queue pages by submitted_at; submissions made before it was set use their last update
+    for model_name in ('Plan', 'Report'):
+        model = apps.get_model('organizations', model_name)
+        model.objects.filter(status='SUBMITTED', submitted_at__isnull=True).update(submitted_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0034_achievement_period_target'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['status', 'submitted_at'], name='plan_status_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', 'submitted_at'], name='report_status_submitted_idx'),
+        ),
+        migrations.RunPython(backfill_submitted_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated migration for reading report budgets live instead of from ReportAggregate
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0035_status_submitted_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reportaggregate',
+            name='government_treasury_budget',
+        ),
+        migrations.RemoveField(
+            model_name='reportaggregate',
+            name='sdg_funding_budget',
+        ),
+        migrations.RemoveField(
+            model_name='reportaggregate',
+            name='partners_funding_budget',
+        ),
+        migrations.RemoveField(
+            model_name='reportaggregate',
+            name='other_funding_budget',
+        ),
+    ]
@@ -1,7 +1,13 @@
+import os
+import uuid
+
 from django.db import models
+from django.db.models import Sum
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from django.utils import timezone
+from .storage import narrative_storage
+from .weights import WeightBudget
 
 def validate_positive_weight(value):
     if value <= 0:
@@ -222,36 +228,9 @@ class StrategicInitiative(models.Model):
             raise ValidationError('Organization is required for custom initiatives')
         
         # Check if parent is a default strategic objective with planner_weight
-        if self.strategic_objective:
-            # Get the effective weight (planner_weight if available, otherwise weight)
-            effective_weight = self.strategic_objective.get_effective_weight()
-            
-            # When parent has planner_weight, ensure initiatives' total weight equals effective_weight
-            initiatives = StrategicInitiative.objects.filter(strategic_objective=self.strategic_objective)
-            
-            # Exclude self if already saved
-            if self.pk:
-                initiatives = initiatives.exclude(pk=self.pk)
-            
-            # Calculate total weight of existing initiatives
-            total_weight = initiatives.aggregate(models.Sum('weight'))['weight__sum'] or 0
-            
-            # Add the current initiative's weight
-            total_weight += self.weight
-            
-            # Validate that total weight does not exceed parent's effective weight
-            if total_weight > effective_weight:
-                raise ValidationError(
-                    f"Total initiative weight ({total_weight}) exceeds parent objective's effective weight "
-                    f"({effective_weight})"
-                )
-            
-            # For objectives, total weight must equal parent weight exactly
-            if abs(total_weight - effective_weight) > 0.01:
-                raise ValidationError(
-                    f"Total initiative weight ({total_weight}) must equal parent objective's effective weight "
-                    f"({effective_weight}) exactly"
-                )
+        if self.strategic_objective_id:
+            # Total weight of sibling initiatives must equal the effective weight exactly
+            WeightBudget.for_row().check(self)
     
     def __str__(self):
         return self.name
@@ -383,14 +362,7 @@ class PerformanceMeasure(models.Model):
         
         
         # Validate measure weight against total for initiative (total should be 35%)
-        total_weight = PerformanceMeasure.objects.filter(
-            initiative=self.initiative
-        ).exclude(id=self.id).aggregate(
-            total=models.Sum('weight')
-        )['total'] or Decimal('0')
-        
-        if total_weight + self.weight > 35:
-            raise ValidationError(f'Total weight of performance measures ({total_weight + self.weight}%) cannot exceed 35%')
+        WeightBudget.for_row().check(self)
 
         # For custom performance measures, inherit the organization from the initiative if not set
         if not self.organization and self.initiative and self.initiative.organization:
@@ -469,19 +441,31 @@ class MainActivity(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    def _sub_activity_totals(self):
+        """(cost, funding) of all sub-activities; one aggregate unless they are prefetched"""
+        if 'sub_activities' in getattr(self, '_prefetched_objects_cache', {}):
+            sub_activities = self.sub_activities.all()
+            return (
+                sum(sub.estimated_cost for sub in sub_activities),
+                sum(sub.total_funding for sub in sub_activities)
+            )
+        totals = self.sub_activities.aggregate(cost=Sum('effective_cost'), funding=Sum('funding_total'))
+        return totals['cost'] or 0, totals['funding'] or 0
+
     @property
     def total_budget(self):
         """Calculate total budget from all sub-activities"""
-        return sum(sub.estimated_cost for sub in self.sub_activities.all())
+        return self._sub_activity_totals()[0]
     
     @property 
     def total_funding(self):
         """Calculate total funding from all sub-activities"""
-        return sum(sub.total_funding for sub in self.sub_activities.all())
+        return self._sub_activity_totals()[1]
     @property
     def funding_gap(self):
         """Calculate total funding gap from all sub-activities"""
-        return max(0, self.total_budget - self.total_funding)
+        total_budget, total_funding = self._sub_activity_totals()
+        return max(0, total_budget - total_funding)
     
     def clean(self):
         super().clean()
@@ -543,32 +527,9 @@ class MainActivity(models.Model):
                 raise ValidationError('For constant targets, all quarterly targets must equal annual target')
         
         
-        # FIXED: Validate activity weight against total for initiative (65% of initiative weight)
+        # Validate activity weight against total for initiative (65% of initiative weight)
         if self.initiative_id:
-            # Get other activities (exclude self if editing)
-            other_activities = MainActivity.objects.filter(
-                initiative=self.initiative_id
-            )
-            if self.pk:  # If editing, exclude current activity
-                other_activities = other_activities.exclude(pk=self.pk)
-            
-            other_activities_weight = other_activities.aggregate(
-                total=models.Sum('weight')
-            )['total'] or Decimal('0')
-            
-            # Calculate weight limits
-            initiative_weight = float(self.initiative.weight) if self.initiative else 100.0
-            max_allowed_weight = round(initiative_weight * 0.65, 2)
-            current_weight = float(self.weight)
-            total_weight_after = float(other_activities_weight) + current_weight
-            
-            if total_weight_after > max_allowed_weight:
-                raise ValidationError([
-                    f'Total weight of activities ({total_weight_after:.2f}%) cannot exceed {max_allowed_weight}% '
-                    f'(65% of initiative weight {initiative_weight}%). '
-                    f'Current other activities: {float(other_activities_weight):.2f}%, '
-                    f'Your activity: {current_weight:.2f}%'
-                ])
+            WeightBudget.for_row().check(self)
         
         # For custom activities, inherit the organization from the initiative if not set
         if not self.organization and self.initiative and self.initiative.organization:
@@ -663,9 +624,17 @@ class SubActivity(models.Model):
     printing_details = models.JSONField(null=True, blank=True)
     supervision_details = models.JSONField(null=True, blank=True)
     partners_details = models.JSONField(null=True, blank=True)
+
+    # Stored copies of estimated_cost, total_funding and funding_gap for
+    # sorting and filtering in SQL; kept in sync by save() and bulk paths
+    effective_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    funding_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    funding_gap_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    FUNDING_COLUMNS = ['effective_cost', 'funding_total', 'funding_gap_amount']
     
     @property
     def estimated_cost(self):
@@ -698,8 +667,22 @@ class SubActivity(models.Model):
             models.Index(fields=['main_activity'], name='subact_mainact_idx'),
             models.Index(fields=['activity_type'], name='subact_type_idx'),
             models.Index(fields=['budget_calculation_type'], name='subact_budgtype_idx'),
+            models.Index(fields=['-funding_gap_amount'], name='subact_gap_idx'),
+            models.Index(fields=['main_activity', 'funding_gap_amount'], name='subact_mainact_gap_idx'),
         ]
 
+    def refresh_funding_columns(self):
+        """Copy the computed cost, funding and gap into their stored columns"""
+        self.effective_cost = self.estimated_cost
+        self.funding_total = self.total_funding
+        self.funding_gap_amount = self.funding_gap
+
+    def save(self, *args, **kwargs):
+        self.refresh_funding_columns()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | set(self.FUNDING_COLUMNS)
+        super().save(*args, **kwargs)
+
     def clean(self):
         super().clean()
 
@@ -950,6 +933,11 @@ class LandTransport(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['origin', 'destination', 'trip_type'], name='land_route_idx'),
+        ]
     
     def __str__(self):
         trip = "Round Trip" if self.trip_type == 'ROUND' else "Single Trip"
@@ -964,6 +952,11 @@ class AirTransport(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['origin', 'destination'], name='air_route_idx'),
+        ]
     
     def __str__(self):
         return f"{self.origin} to {self.destination}: {self.price}"
@@ -1187,6 +1180,7 @@ class Plan(models.Model):
             models.Index(fields=['status'], name='plan_status_idx'),
             models.Index(fields=['organization', 'status'], name='plan_org_status_idx'),
             models.Index(fields=['strategic_objective'], name='plan_obj_idx'),
+            models.Index(fields=['status', 'submitted_at'], name='plan_status_submitted_idx'),
         ]
 
     def __str__(self):
@@ -1331,7 +1325,8 @@ class Report(models.Model):
     )
     report_type = models.CharField(max_length=10, choices=REPORT_TYPES)
     report_date = models.DateField(default=timezone.localdate)
-    narrative_report = models.FileField(upload_to='narrative_reports/', null=True, blank=True)
+    narrative_report = models.FileField(upload_to='narrative_reports/', storage=narrative_storage, null=True, blank=True)
+    narrative_filename = models.CharField(max_length=255, blank=True, default='', help_text="Original name of the narrative file")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
     evaluator_feedback = models.TextField(blank=True, null=True)
     evaluated_at = models.DateTimeField(null=True, blank=True)
@@ -1342,10 +1337,22 @@ class Report(models.Model):
     class Meta:
         unique_together = ('plan', 'report_type')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'submitted_at'], name='report_status_submitted_idx'),
+        ]
 
     def __str__(self):
         return f"{self.organization.name} - {self.get_report_type_display()} - {self.report_date}"
 
+    def save(self, *args, **kwargs):
+        # Stored names are content hashes; keep the uploaded name for downloads
+        if self.narrative_report and not self.narrative_report._committed:
+            self.narrative_filename = os.path.basename(self.narrative_report.name)[:255]
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'narrative_report' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'narrative_filename'}
+        super().save(*args, **kwargs)
+
     def clean(self):
         super().clean()
 
@@ -1375,6 +1382,13 @@ class PerformanceAchievement(models.Model):
     justification = models.TextField(
         help_text="Justification or explanation for the achievement"
     )
+    period_target = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Target for the report period, stored when the achievement is saved"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1409,6 +1423,13 @@ class ActivityAchievement(models.Model):
     justification = models.TextField(
         help_text="Justification or explanation for the achievement"
     )
+    period_target = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Target for the report period, stored when the achievement is saved"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1476,4 +1497,238 @@ class SubActivityBudgetUtilization(models.Model):
             self.sdg_funding_utilized +
             self.partners_funding_utilized +
             self.other_funding_utilized
-        )
\ No newline at end of file
+        )
+
+class BackgroundJob(models.Model):
+    """
+    Model for long-running operations (roll forward, exports, re-costing)
+    executed outside the request cycle
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed')
+    ]
+
+    kind = models.CharField(max_length=50, help_text="Type of job, e.g. plan_roll_forward")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs'
+    )
+    params = models.JSONField(default=dict, blank=True, help_text="Parameters the job was started with")
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', 'status'], name='job_kind_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+    def set_progress(self, progress, total=None):
+        """Record progress without touching the rest of the row"""
+        self.progress = progress
+        update = {'progress': progress, 'updated_at': timezone.now()}
+        if total is not None:
+            self.total = total
+            update['total'] = total
+        BackgroundJob.objects.filter(pk=self.pk).update(**update)
+
+
+class SubActivityCostLine(models.Model):
+    """
+    Itemized cost of a tool-costed sub-activity, derived from its stored tool
+    details so cost analytics can run as indexed GROUP BY queries.
+    """
+    CATEGORY_CHOICES = [
+        ('PER_DIEM', 'Per Diem'),
+        ('ACCOMMODATION', 'Accommodation'),
+        ('PARTICIPANT', 'Participant Cost'),
+        ('SESSION', 'Session Cost'),
+        ('LAND_TRANSPORT', 'Land Transport'),
+        ('AIR_TRANSPORT', 'Air Transport'),
+        ('SUPERVISOR', 'Supervisor Cost'),
+        ('PRINTING', 'Printing'),
+        ('PROCUREMENT', 'Procurement'),
+        ('OTHER', 'Other'),
+        ('UNITEMIZED', 'Unitemized')
+    ]
+
+    sub_activity = models.ForeignKey(
+        SubActivity,
+        on_delete=models.CASCADE,
+        related_name='cost_lines'
+    )
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    cost_type = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        help_text="Rate-specific type, e.g. FULL_BOARD, FLASH_DISK or a procurement category"
+    )
+    description = models.CharField(max_length=255, blank=True, default='')
+    rate_model = models.CharField(max_length=30, blank=True, default='', help_text="Rate table the unit price came from")
+    rate_id = models.PositiveIntegerField(null=True, blank=True)
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cost_lines'
+    )
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'location'], name='costline_cat_loc_idx'),
+            models.Index(fields=['category', 'cost_type'], name='costline_cat_type_idx'),
+            models.Index(fields=['rate_model', 'rate_id'], name='costline_rate_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sub_activity_id} {self.category}: {self.amount}"
+
+
+class NarrativeUpload(models.Model):
+    """
+    A narrative report file being uploaded in parts. Parts are appended to
+    temp_path in order; completing the upload moves the file onto the report.
+    """
+    STATUS_CHOICES = [
+        ('UPLOADING', 'Uploading'),
+        ('COMPLETED', 'Completed'),
+        ('ABORTED', 'Aborted')
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.ForeignKey(
+        Report,
+        on_delete=models.CASCADE,
+        related_name='narrative_uploads'
+    )
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.CASCADE,
+        related_name='narrative_uploads'
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Declared size of the whole file in bytes")
+    sha256 = models.CharField(max_length=64, blank=True, default='', help_text="Optional checksum of the whole file")
+    received = models.PositiveBigIntegerField(default=0, help_text="Bytes written so far; the next part starts here")
+    temp_path = models.CharField(max_length=500, help_text="Part file, relative to MEDIA_ROOT")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='UPLOADING')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='narrupload_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} for report {self.report_id} ({self.received}/{self.size})"
+
+
+class ContentBlob(models.Model):
+    """
+    A file kept once in content-addressed storage, with the number of model
+    fields that point at it. Blobs at zero references are collected by the
+    gc_content_blobs command.
+    """
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name, relative to MEDIA_ROOT")
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at'], name='blob_refcount_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
+class ReportingWindow(models.Model):
+    """
+    When a report type can be filed for an approved plan. Computed once when
+    the plan is approved (reporting_windows.build_reporting_windows); report
+    creation checks it with a (plan, report_type) lookup.
+    """
+    plan = models.ForeignKey(
+        Plan,
+        on_delete=models.CASCADE,
+        related_name='reporting_windows'
+    )
+    report_type = models.CharField(max_length=10, choices=Report.REPORT_TYPES)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    opens_on = models.DateField(help_text="First day the report can be created")
+    closes_on = models.DateField(null=True, blank=True, help_text="Last day the report can be created; empty for no deadline")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('plan', 'report_type')
+        ordering = ['plan', 'opens_on']
+
+    def __str__(self):
+        return f"Plan {self.plan_id} {self.report_type}: {self.opens_on} - {self.closes_on or 'open'}"
+
+    def is_open(self, on_date):
+        return self.opens_on <= on_date and (self.closes_on is None or on_date <= self.closes_on)
+
+
+class ReportAggregate(models.Model):
+    """
+    Precomputed M&E numbers of one report, kept up to date by the
+    performance achievement and budget utilization endpoints
+    (report_aggregates.refresh_report_aggregate) so statistics and
+    dashboards do not recompute them from the achievement rows.
+    """
+    report = models.OneToOneField(
+        Report,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='aggregate'
+    )
+    achievement_percent_sum = models.DecimalField(
+        max_digits=20, decimal_places=4, default=0,
+        help_text="Sum of achievement/target percentages of the measures planned for the period"
+    )
+    measure_count = models.PositiveIntegerField(default=0)
+    objective_achievements = models.JSONField(
+        default=dict, blank=True,
+        help_text="{objective id: [percentage sum, measure count]} over the organization's own measures"
+    )
+    government_treasury_utilized = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    sdg_funding_utilized = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    partners_funding_utilized = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    other_funding_utilized = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Aggregate of report {self.report_id}: {self.overall_achievement:.2f}%"
+
+    @property
+    def overall_achievement(self):
+        if not self.measure_count:
+            return 0
+        return float(self.achievement_percent_sum / self.measure_count)
@@ -0,0 +1,140 @@
+"""
+Plan PDF layout.
+
+Runs inside the PDF worker processes, so it only depends on reportlab and
+receives plain data: header lines and rows shaped like
+exports.PLAN_COLUMNS. It must not import Django or the app's models.
+"""
+import os
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate, Spacer, TableStyle
+
+# Columns shown in the PDF table, by their PLAN_COLUMNS name, with relative widths
+TABLE_COLUMNS = [
+    ('Row Type', 'Type', 1.1),
+    ('Name', 'Measure / Activity', 3.2),
+    ('Weight', 'Weight', 0.7),
+    ('Baseline', 'Baseline', 1.0),
+    ('Q1 Target', 'Q1', 0.7),
+    ('Q2 Target', 'Q2', 0.7),
+    ('Q3 Target', 'Q3', 0.7),
+    ('Q4 Target', 'Q4', 0.7),
+    ('Annual Target', 'Annual', 0.8),
+    ('Sub-activity', 'Sub-activity', 2.6),
+    ('Budget Type', 'Budget', 0.9),
+    ('Estimated Cost', 'Cost', 1.2),
+    ('Total Funding', 'Funding', 1.2),
+    ('Funding Gap', 'Gap', 1.1),
+]
+
+MONEY_COLUMNS = {'Estimated Cost', 'Total Funding', 'Funding Gap'}
+
+_fonts = {}
+
+
+def _font(font_path):
+    """Name of the font to use; a TTF file is needed for Amharic text"""
+    if not font_path:
+        return 'Helvetica'
+    if font_path not in _fonts:
+        name = f'PlanFont{len(_fonts)}'
+        pdfmetrics.registerFont(TTFont(name, font_path))
+        _fonts[font_path] = name
+    return _fonts[font_path]
+
+
+def _number(value, money=False):
+    if value is None or value == '':
+        return ''
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if money:
+        return f'{number:,.2f}'
+    return f'{number:,.2f}'.rstrip('0').rstrip('.')
+
+
+def render_plan_pdf(path, title, header_lines, columns, rows, font_path=''):
+    """Write the plan PDF to path (atomically) and return its size in bytes"""
+    font = _font(font_path)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('PlanTitle', parent=styles['Title'], fontName=font, fontSize=15)
+    text_style = ParagraphStyle('PlanText', parent=styles['Normal'], fontName=font, fontSize=9, leading=11)
+    cell_style = ParagraphStyle('PlanCell', parent=styles['Normal'], fontName=font, fontSize=7, leading=8.5)
+    objective_style = ParagraphStyle('PlanObjective', parent=styles['Heading2'], fontName=font, fontSize=11)
+    initiative_style = ParagraphStyle('PlanInitiative', parent=styles['Heading3'], fontName=font, fontSize=9.5)
+
+    index = {name: position for position, name in enumerate(columns)}
+    objective_at = index['Strategic Objective']
+    initiative_at = index['Strategic Initiative']
+
+    page = landscape(A4)
+    margin = 10 * mm
+    total_weight = sum(weight for *_, weight in TABLE_COLUMNS)
+    widths = [(page[0] - 2 * margin) * weight / total_weight for *_, weight in TABLE_COLUMNS]
+    table_style = TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), font),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#b0b7c3')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f3f6fa')]),
+    ])
+
+    def cell(text):
+        return Paragraph(escape(str(text)), cell_style)
+
+    story = [Paragraph(escape(title), title_style)]
+    story.extend(Paragraph(escape(line), text_style) for line in header_lines)
+    story.append(Spacer(1, 4 * mm))
+
+    def flush(table_rows):
+        if len(table_rows) > 1:
+            table = LongTable(table_rows, colWidths=widths, repeatRows=1)
+            table.setStyle(table_style)
+            story.append(table)
+            story.append(Spacer(1, 3 * mm))
+
+    header_row = [cell(label) for _, label, _ in TABLE_COLUMNS]
+    current = (None, None)
+    table_rows = [header_row]
+    for row in rows:
+        key = (row[objective_at], row[initiative_at])
+        if key != current:
+            flush(table_rows)
+            table_rows = [header_row]
+            if key[0] != current[0]:
+                weight = _number(row[index['Objective Weight']])
+                story.append(Paragraph(escape(f'{key[0]} ({weight}%)'), objective_style))
+            weight = _number(row[index['Initiative Weight']])
+            story.append(Paragraph(escape(f'{key[1]} ({weight}%)'), initiative_style))
+            current = key
+
+        values = []
+        for name, _, _ in TABLE_COLUMNS:
+            value = row[index[name]] if index[name] < len(row) else ''
+            if name in MONEY_COLUMNS or name.endswith('Target') or name == 'Weight':
+                value = _number(value, money=name in MONEY_COLUMNS)
+            values.append(cell('' if value is None else value))
+        table_rows.append(values)
+    flush(table_rows)
+
+    if not rows:
+        story.append(Paragraph('This plan has no objectives, measures or activities.', text_style))
+
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    document = SimpleDocTemplate(
+        temp_path, pagesize=page, leftMargin=margin, rightMargin=margin,
+        topMargin=margin, bottomMargin=margin, title=title
+    )
+    document.build(story)
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
@@ -0,0 +1,171 @@
+"""
+Server-side PDF rendering of approved plans.
+
+Rows are read in the calling thread (the only place with database access)
+and the CPU-heavy layout runs in a pool of worker processes (pdf_render).
+PDFs are cached on disk under the plan id and a version fingerprint of
+everything the plan shows, so any edit to the plan or its organization's
+rows produces a new version and the old file is pruned on the next render.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .consolidated_export import fingerprint, organization_states
+from .exports import PLAN_COLUMNS, plan_rows
+from .models import Plan
+
+logger = logging.getLogger(__name__)
+
+# Under MEDIA_ROOT
+PDF_DIR = os.path.join('exports', 'plan_pdfs')
+
+# Bump when the PDF layout changes so cached files are re-rendered
+LAYOUT_VERSION = 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _workers():
+    return getattr(settings, 'PLAN_PDF_WORKERS', None) or min(4, os.cpu_count() or 1)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: workers must not inherit the parent's database connections
+            _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def plan_versions(plans):
+    """{plan id: version} for Plan instances"""
+    states = organization_states({plan.organization_id for plan in plans})
+    versions = {}
+    for plan in plans:
+        selected = sorted(plan.selected_objectives.values_list('id', flat=True))
+        versions[plan.id] = fingerprint([
+            LAYOUT_VERSION, plan.updated_at, plan.status, selected,
+            plan.selected_objectives_weights, states[plan.organization_id]
+        ])
+    return versions
+
+
+def _pdf_dir():
+    return os.path.join(settings.MEDIA_ROOT, PDF_DIR)
+
+
+def pdf_path(plan_id, version):
+    return os.path.join(_pdf_dir(), f'plan-{plan_id}-{version}.pdf')
+
+
+def cached_pdf(plan):
+    """Path of the current PDF of plan, or None if it has to be rendered"""
+    path = pdf_path(plan.id, plan_versions([plan])[plan.id])
+    return path if os.path.exists(path) else None
+
+
+def _prune(plan_id, keep):
+    prefix = f'plan-{plan_id}-'
+    for filename in os.listdir(_pdf_dir()):
+        if filename.startswith(prefix) and filename.endswith('.pdf') and filename != keep:
+            try:
+                os.remove(os.path.join(_pdf_dir(), filename))
+            except OSError:
+                pass
+
+
+def _render_args(plan, path):
+    """Plain, picklable arguments for pdf_render.render_plan_pdf"""
+    title = f'{plan.organization.name} - {plan.get_type_display()} Plan {plan.fiscal_year}'
+    header_lines = [
+        f'Planner: {plan.planner_name}',
+        f'Executive: {plan.executive_name or "-"}',
+        f'Period: {plan.from_date:%d %b %Y} - {plan.to_date:%d %b %Y}',
+        f'Status: {plan.get_status_display()}',
+    ]
+    # Decimals become strings so the rows pickle without Django types
+    rows = [
+        [str(value) if value is not None and not isinstance(value, (str, int, float)) else value for value in row]
+        for row in plan_rows(plan)
+    ]
+    return path, title, header_lines, PLAN_COLUMNS, rows, getattr(settings, 'PLAN_PDF_FONT', '')
+
+
+def render_plans(plan_ids, force=False, progress=None):
+    """
+    Render the PDFs of the given approved plans that are not cached (all of
+    them with force). At most two renders per worker are queued at a time,
+    so only that many plans' rows are held in memory.
+    """
+    from .pdf_render import render_plan_pdf
+
+    os.makedirs(_pdf_dir(), exist_ok=True)
+    plans = list(
+        Plan.objects.filter(id__in=plan_ids, status='APPROVED').select_related('organization').order_by('id')
+    )
+    versions = plan_versions(plans)
+    total = len(plans)
+    if progress:
+        progress(0, total)
+
+    rendered, cached, failed = [], [], []
+    pending = {}
+    max_pending = _workers() * 2
+
+    def collect(done):
+        for future in done:
+            plan_id, path = pending.pop(future)
+            try:
+                future.result()
+            except BrokenProcessPool:
+                _reset_pool()
+                raise
+            except Exception as e:
+                logger.exception(f"Rendering the PDF of plan {plan_id} failed")
+                failed.append({'plan': plan_id, 'error': str(e)})
+                continue
+            _prune(plan_id, os.path.basename(path))
+            rendered.append(plan_id)
+
+    pool = _get_pool()
+    for plan in plans:
+        path = pdf_path(plan.id, versions[plan.id])
+        if os.path.exists(path) and not force:
+            cached.append(plan.id)
+        else:
+            while len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[pool.submit(render_plan_pdf, *_render_args(plan, path))] = (plan.id, path)
+        if progress:
+            progress(len(rendered) + len(cached) + len(failed), total)
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        collect(done)
+        if progress:
+            progress(len(rendered) + len(cached) + len(failed), total)
+
+    return {
+        'plans': total,
+        'rendered': len(rendered),
+        'cached': len(cached),
+        'failed': failed,
+        'skipped_not_approved': len(set(plan_ids)) - total,
+    }
@@ -0,0 +1,142 @@
+"""
+Fiscal-year roll forward of plans.
+
+Objectives are shared, and initiatives, measures, main activities and
+sub-activities are scoped to an organization rather than to a plan or a
+fiscal year: the plan of any year shows the organization's current rows.
+Rolling a plan forward therefore creates the new year's Plan with the same
+objective selection and weights. Copying the hierarchy itself would show
+every row twice in both years and break the sibling weight budgets, and
+for the same reason costs are not uplifted: the sub-activity rows are the
+ones earlier approved plans display.
+"""
+import re
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Q
+
+from .bulk_ops import bulk_create_with_pks
+from .models import Plan
+
+
+def _year(fiscal_year):
+    """Leading calendar year of a fiscal year ('2017', '2017/18'), or None"""
+    match = re.match(r'\s*(\d{4})', str(fiscal_year or ''))
+    return int(match.group(1)) if match else None
+
+
+def next_fiscal_year(fiscal_year):
+    """'2017' -> '2018'; non-numeric years cannot be derived"""
+    try:
+        return str(int(fiscal_year) + 1)
+    except (TypeError, ValueError):
+        raise ValueError(f'Cannot derive the next fiscal year from "{fiscal_year}"; pass target_fiscal_year')
+
+
+def year_offset(source_fiscal_year, target_fiscal_year):
+    """Years between two fiscal years, used to shift the plan dates"""
+    source, target = _year(source_fiscal_year), _year(target_fiscal_year)
+    if source is None or target is None:
+        raise ValueError(
+            f'Cannot derive plan dates from fiscal years "{source_fiscal_year}" and "{target_fiscal_year}"'
+        )
+    if target <= source:
+        raise ValueError('target_fiscal_year must be after the source fiscal year')
+    return target - source
+
+
+def select_source_plans(source_fiscal_year, organization_ids=None, plan_ids=None, statuses=('APPROVED',)):
+    """Plans to roll forward, latest plan per organization"""
+    plans = Plan.objects.filter(fiscal_year=source_fiscal_year, status__in=statuses)
+    if organization_ids is not None:
+        plans = plans.filter(organization_id__in=organization_ids)
+    if plan_ids:
+        plans = plans.filter(id__in=plan_ids)
+
+    latest = {}
+    for plan in plans.order_by('organization_id', '-updated_at'):
+        latest.setdefault(plan.organization_id, plan)
+    return list(latest.values())
+
+
+def roll_forward_plans(source_plans, target_fiscal_year=None, progress=None):
+    """
+    Create DRAFT plans for the target fiscal year from source_plans.
+
+    Organizations that already have a plan for the target year are skipped.
+    Returns a summary dict suitable for a BackgroundJob result.
+    """
+    source_plans = list(source_plans)
+    total = len(source_plans)
+    if progress:
+        progress(0, total)
+
+    results = []
+    to_create = []
+    sources = []
+
+    target_years = {
+        plan.id: target_fiscal_year or next_fiscal_year(plan.fiscal_year)
+        for plan in source_plans
+    }
+
+    # One query for organizations that already have a plan in their target year
+    existing = set()
+    if source_plans:
+        existing_filter = Q()
+        for plan in source_plans:
+            existing_filter |= Q(organization_id=plan.organization_id, fiscal_year=target_years[plan.id])
+        existing = set(Plan.objects.filter(existing_filter).values_list('organization_id', 'fiscal_year'))
+
+    for plan in source_plans:
+        target_year = target_years[plan.id]
+        offset = year_offset(plan.fiscal_year, target_year)
+        if (plan.organization_id, target_year) in existing:
+            results.append({'source_plan': plan.id, 'organization': plan.organization_id,
+                            'status': 'skipped', 'reason': f'A plan for fiscal year {target_year} already exists'})
+            continue
+
+        to_create.append(Plan(
+            organization_id=plan.organization_id,
+            planner_name=plan.planner_name,
+            type=plan.type,
+            executive_name=plan.executive_name,
+            strategic_objective_id=plan.strategic_objective_id,
+            program_id=plan.program_id,
+            selected_objectives_weights=plan.selected_objectives_weights,
+            fiscal_year=target_year,
+            from_date=plan.from_date + relativedelta(years=offset),
+            to_date=plan.to_date + relativedelta(years=offset),
+            status='DRAFT'
+        ))
+        sources.append(plan)
+
+    through = Plan.selected_objectives.through
+    selected = {}
+    for plan_id, objective_id in through.objects.filter(
+        plan_id__in=[plan.id for plan in sources]
+    ).values_list('plan_id', 'strategicobjective_id'):
+        selected.setdefault(plan_id, []).append(objective_id)
+
+    with transaction.atomic():
+        created = bulk_create_with_pks(Plan, to_create)
+
+        through.objects.bulk_create([
+            through(plan_id=new_plan.id, strategicobjective_id=objective_id)
+            for source, new_plan in zip(sources, created)
+            for objective_id in selected.get(source.id, [])
+        ])
+
+    for source, new_plan in zip(sources, created):
+        results.append({'source_plan': source.id, 'organization': source.organization_id,
+                        'status': 'created', 'plan': new_plan.id, 'fiscal_year': new_plan.fiscal_year})
+
+    if progress:
+        progress(total, total)
+
+    return {
+        'created': len(created),
+        'skipped': len(source_plans) - len(created),
+        'plans': results
+    }
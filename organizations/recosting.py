@@ -0,0 +1,246 @@
+"""
+Re-costing of tool-costed sub-activities after rate changes.
+
+Costs computed by the costing tools are stored as a single number, so they
+go stale when an admin edits a rate. This module finds the sub-activities
+whose stored cost lines use a rate saved since a given time, re-prices
+those lines with the server-side costing engine and moves the stored total
+by the difference. Lines on unchanged rates, and any part of the cost the
+engine does not itemize, keep their stored amounts. The tool details'
+totalBudget and the sub-activity's ActivityBudget rows are moved with the
+stored total so they do not disagree with it.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cost_lines import rebuild_cost_lines
+from .costing import (
+    DETAILS_FIELDS, CostingError, estimate, get_rate_tables, invalidate_rate_tables,
+    spec_from_details
+)
+from .models import (
+    ActivityBudget, ActivityCostingAssumption, AirTransport, Accommodation, LandTransport, ParticipantCost, PerDiem, Plan,
+    PrintingCost, ProcurementItem, SessionCost, SubActivity, SubActivityCostLine, SupervisorCost
+)
+
+# Sub-activities loaded and written per round trip
+RECOST_CHUNK_SIZE = 1000
+
+# Changed sub-activities listed per plan in the report; totals cover all of them
+REPORT_CHANGES_PER_PLAN = 200
+
+# Rate models the engine references from cost lines
+RECOST_RATE_MODELS = (
+    PerDiem, Accommodation, LandTransport, AirTransport, ParticipantCost, SessionCost, SupervisorCost,
+    PrintingCost, ProcurementItem, ActivityCostingAssumption
+)
+
+
+def changed_rate_refs(since):
+    """(rate model name, id) of every rate row saved at or after since"""
+    refs = set()
+    for model in RECOST_RATE_MODELS:
+        refs.update(
+            (model.__name__, pk)
+            for pk in model.objects.filter(updated_at__gte=since).values_list('id', flat=True)
+        )
+    return refs
+
+
+def _latest_plans(organization_ids):
+    latest = {}
+    for plan in Plan.objects.filter(organization_id__in=organization_ids).order_by('organization_id', '-updated_at'):
+        latest.setdefault(plan.organization_id, plan)
+    return latest
+
+
+def _changed_lines(changed_refs):
+    """Q matching cost lines priced from one of the changed rate rows"""
+    ids_by_model = defaultdict(list)
+    for model_name, pk in changed_refs:
+        ids_by_model[model_name].append(pk)
+    condition = Q(pk__in=[])
+    for model_name, ids in ids_by_model.items():
+        condition |= Q(rate_model=model_name, rate_id__in=ids)
+    return condition
+
+
+def _with_total(details, total):
+    """Copy of tool details carrying a new totalBudget"""
+    if not isinstance(details, dict) or 'totalBudget' not in details:
+        return details
+    return {**details, 'totalBudget': float(total)}
+
+
+def _sync_activity_budgets(sub_activities, now):
+    """Move the WITH_TOOL ActivityBudget rows of re-costed sub-activities to their new cost"""
+    by_ref = {str(sub_activity.id): sub_activity for sub_activity in sub_activities}
+    budgets = list(ActivityBudget.objects.filter(sub_activity_id__in=list(by_ref), budget_calculation_type='WITH_TOOL'))
+    for budget in budgets:
+        sub_activity = by_ref[budget.sub_activity_id]
+        budget.estimated_cost_with_tool = sub_activity.estimated_cost_with_tool
+        details_field = DETAILS_FIELDS[sub_activity.activity_type]
+        setattr(budget, details_field, _with_total(getattr(budget, details_field), budget.estimated_cost_with_tool))
+        budget.updated_at = now
+    if budgets:
+        ActivityBudget.objects.bulk_update(
+            budgets, ['estimated_cost_with_tool', 'updated_at', *set(DETAILS_FIELDS.values())],
+            batch_size=RECOST_CHUNK_SIZE
+        )
+
+
+def recost_sub_activities(since, organization_ids=None, dry_run=False, progress=None):
+    """
+    Re-price the WITH_TOOL sub-activities whose cost lines use a rate saved
+    at or after since.
+
+    Only the lines on changed rates are re-priced: the stored cost moves by
+    the difference between the engine's amounts for those rates and the
+    amounts stored on the sub-activity's cost lines. Sub-activities are
+    read in id-ordered chunks and written back with one bulk_update per
+    chunk. Returns a report grouped by each organization's latest plan,
+    suitable for a BackgroundJob result.
+    """
+    if since is None:
+        raise ValueError('since is required: only sub-activities using changed rates are re-costed')
+
+    # Always price against the current rows, not a snapshot from before the edit
+    invalidate_rate_tables()
+    tables = get_rate_tables()
+    changed_refs = changed_rate_refs(since)
+    changed_lines = _changed_lines(changed_refs)
+
+    queryset = SubActivity.objects.filter(
+        budget_calculation_type='WITH_TOOL',
+        activity_type__in=list(DETAILS_FIELDS),
+        id__in=SubActivityCostLine.objects.filter(changed_lines).values('sub_activity_id')
+    ).annotate(
+        organization_id=Coalesce('main_activity__organization_id', 'main_activity__initiative__organization_id')
+    ).only(
+        'id', 'name', 'activity_type', 'budget_calculation_type', 'estimated_cost_with_tool',
+        'estimated_cost_without_tool', 'government_treasury',
+        'sdg_funding', 'partners_funding', 'other_funding', *set(DETAILS_FIELDS.values())
+    ).order_by('id')
+    if organization_ids is not None:
+        queryset = queryset.filter(organization_id__in=organization_ids)
+
+    total = queryset.count() if changed_refs else 0
+    if progress:
+        progress(0, total)
+
+    checked = updated = unchanged = 0
+    skipped = []
+    by_organization = {}
+    last_id = 0
+
+    while changed_refs:
+        chunk = list(queryset.filter(id__gt=last_id)[:RECOST_CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        # Stored amounts of the lines on changed rates, per sub-activity
+        stored = defaultdict(Decimal)
+        for sub_activity_id, amount in SubActivityCostLine.objects.filter(
+            changed_lines, sub_activity_id__in=[sub_activity.id for sub_activity in chunk]
+        ).values_list('sub_activity_id', 'amount'):
+            stored[sub_activity_id] += amount
+
+        to_update = []
+        now = timezone.now()
+        for sub_activity in chunk:
+            checked += 1
+            details = getattr(sub_activity, DETAILS_FIELDS[sub_activity.activity_type])
+            try:
+                result = estimate(spec_from_details(sub_activity.activity_type, details, tables), tables)
+            except CostingError as e:
+                skipped.append({'sub_activity': sub_activity.id, 'reason': str(e)})
+                continue
+
+            repriced = sum(
+                (line['amount'] for line in result['lines'] if (line['rate_model'], line['rate_id']) in changed_refs),
+                Decimal('0')
+            )
+            delta = repriced - stored[sub_activity.id]
+            if not delta:
+                unchanged += 1
+                continue
+
+            old_cost = sub_activity.estimated_cost_with_tool
+            new_cost = old_cost + delta
+            if new_cost < 0:
+                skipped.append({'sub_activity': sub_activity.id,
+                                'reason': 'Stored cost lines do not match the stored cost'})
+                continue
+
+            sub_activity.estimated_cost_with_tool = new_cost
+            details_field = DETAILS_FIELDS[sub_activity.activity_type]
+            setattr(sub_activity, details_field, _with_total(details, new_cost))
+            sub_activity.refresh_funding_columns()
+            sub_activity.updated_at = now
+            to_update.append(sub_activity)
+
+            entry = by_organization.setdefault(sub_activity.organization_id, {
+                'count': 0, 'old_total': Decimal('0'), 'new_total': Decimal('0'), 'changes': []
+            })
+            entry['count'] += 1
+            entry['old_total'] += old_cost
+            entry['new_total'] += new_cost
+            if len(entry['changes']) < REPORT_CHANGES_PER_PLAN:
+                entry['changes'].append({
+                    'sub_activity': sub_activity.id,
+                    'name': sub_activity.name,
+                    'activity_type': sub_activity.activity_type,
+                    'old_cost': str(old_cost),
+                    'new_cost': str(new_cost),
+                    # Funding is left untouched; flag rows that now exceed their cost
+                    'funding_exceeds_cost': sub_activity.total_funding > new_cost,
+                })
+
+        if to_update and not dry_run:
+            with transaction.atomic():
+                SubActivity.objects.bulk_update(
+                    to_update,
+                    ['estimated_cost_with_tool', 'updated_at', *set(DETAILS_FIELDS.values()), *SubActivity.FUNDING_COLUMNS],
+                    batch_size=RECOST_CHUNK_SIZE
+                )
+                _sync_activity_budgets(to_update, now)
+                rebuild_cost_lines(to_update, tables)
+        updated += len(to_update)
+
+        if progress:
+            progress(checked, total)
+
+    latest_plans = _latest_plans([org_id for org_id in by_organization if org_id is not None])
+    plans = []
+    for organization_id, entry in by_organization.items():
+        plan = latest_plans.get(organization_id)
+        plans.append({
+            'plan': plan.id if plan else None,
+            'fiscal_year': plan.fiscal_year if plan else None,
+            'plan_status': plan.status if plan else None,
+            'organization': organization_id,
+            'sub_activities': entry['count'],
+            'old_total': str(entry['old_total']),
+            'new_total': str(entry['new_total']),
+            'delta': str(entry['new_total'] - entry['old_total']),
+            'changes': entry['changes'],
+        })
+
+    return {
+        'dry_run': dry_run,
+        'since': since.isoformat(),
+        'changed_rates': len(changed_refs),
+        'rates_version': tables.version,
+        'checked': checked,
+        'updated': updated,
+        'unchanged': unchanged,
+        'skipped': len(skipped),
+        'skipped_sub_activities': skipped[:REPORT_CHANGES_PER_PLAN],
+        'plans': plans,
+    }
@@ -0,0 +1,126 @@
+"""
+Per-report M&E aggregates.
+
+The performance achievement and budget utilization endpoints, single-row
+and bulk, call refresh_report_aggregate in the transaction that saves the
+rows, so report_statistics reads one ReportAggregate row per report instead
+of recomputing every achievement percentage and utilization total.
+target_for_period is ReportViewSet._get_target_for_period, passed in as in
+exports.report_rows.
+
+The planned budget of a report is not stored: it follows every sub-activity
+and activity edit, so report_budget computes it when it is read.
+"""
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+
+from .models import (
+    MainActivity, PerformanceAchievement, ReportAggregate, StrategicInitiative, SubActivity,
+    SubActivityBudgetUtilization
+)
+
+FUNDING_SOURCES = ('government_treasury', 'sdg_funding', 'partners_funding', 'other_funding')
+
+# Parts of an aggregate, refreshed by the endpoint that changes their inputs
+AGGREGATE_PARTS = ('performance', 'utilization')
+
+
+def _performance(report, target_for_period):
+    """Achievement percentages of the report's measures, overall and per objective"""
+    total = Decimal('0')
+    count = 0
+    objectives = {}
+    achievements = PerformanceAchievement.objects.filter(report_id=report.id).select_related(
+        'performance_measure__initiative'
+    )
+    for achievement in achievements:
+        measure = achievement.performance_measure
+        target = target_for_period(measure, report.report_type)
+        if not target or target <= 0:
+            continue
+        percent = (Decimal(str(achievement.achievement)) / Decimal(str(target))) * 100
+        total += percent
+        count += 1
+
+        # Objective figures only count the organization's own measures
+        objective_id = measure.initiative.strategic_objective_id if measure.initiative_id else None
+        if objective_id and measure.organization_id == report.organization_id:
+            entry = objectives.setdefault(str(objective_id), [0.0, 0])
+            entry[0] += float(percent)
+            entry[1] += 1
+    return {'achievement_percent_sum': total, 'measure_count': count, 'objective_achievements': objectives}
+
+
+def _utilization(report_id):
+    totals = SubActivityBudgetUtilization.objects.filter(report_id=report_id).aggregate(
+        **{f'{source}_utilized': Sum(f'{source}_utilized') for source in FUNDING_SOURCES}
+    )
+    return {name: value or Decimal('0') for name, value in totals.items()}
+
+
+def report_budget(report, target_for_period):
+    """Budget per source of the sub-activities whose activity is planned for the report period"""
+    budget = {f'{source}_budget': Decimal('0') for source in FUNDING_SOURCES}
+    selected_objective_ids = list(report.plan.selected_objectives.values_list('id', flat=True))
+    if not selected_objective_ids:
+        return budget
+
+    own_or_default = Q(organization_id=report.organization_id) | Q(organization__isnull=True)
+    initiatives = StrategicInitiative.objects.filter(strategic_objective_id__in=selected_objective_ids).filter(
+        own_or_default
+    )
+    activity_ids = [
+        activity.id for activity in MainActivity.objects.filter(initiative__in=initiatives).filter(own_or_default)
+        if (target_for_period(activity, report.report_type) or 0) > 0
+    ]
+    if activity_ids:
+        totals = SubActivity.objects.filter(main_activity_id__in=activity_ids).aggregate(
+            **{f'{source}_budget': Sum(source) for source in FUNDING_SOURCES}
+        )
+        budget.update({name: value or Decimal('0') for name, value in totals.items()})
+    return budget
+
+
+def refresh_report_aggregate(report, target_for_period, parts=AGGREGATE_PARTS):
+    """
+    Recompute the given parts of the report's aggregate. A report without an
+    aggregate gets all parts computed. Returns the ReportAggregate.
+    """
+    aggregate = ReportAggregate.objects.filter(report_id=report.id).first()
+    if aggregate is None:
+        aggregate = ReportAggregate(report_id=report.id)
+        parts = AGGREGATE_PARTS
+
+    values = {}
+    if 'performance' in parts:
+        values.update(_performance(report, target_for_period))
+    if 'utilization' in parts:
+        values.update(_utilization(report.id))
+
+    for name, value in values.items():
+        setattr(aggregate, name, value)
+    aggregate.save()
+    return aggregate
+
+
+def refresh_utilization(report_ids):
+    """Recompute the utilization part of the existing aggregates of the given reports"""
+    for aggregate in ReportAggregate.objects.filter(report_id__in=list(report_ids)):
+        for name, value in _utilization(aggregate.report_id).items():
+            setattr(aggregate, name, value)
+        aggregate.save()
+
+
+def report_aggregates(reports, target_for_period):
+    """{report id: ReportAggregate} of the given reports, building any that are missing"""
+    reports = list(reports)
+    aggregates = {
+        aggregate.report_id: aggregate
+        for aggregate in ReportAggregate.objects.filter(report_id__in=[report.id for report in reports])
+    }
+    for report in reports:
+        if report.id not in aggregates:
+            # Reports saved before aggregates were stored
+            aggregates[report.id] = refresh_report_aggregate(report, target_for_period)
+    return aggregates
@@ -0,0 +1,179 @@
+"""
+Achievement trends of an organization across its reports.
+
+A trend lists the organization's submitted and approved reports of a fiscal
+year in period order (Q1 ... YEARLY) with their budget utilization, and one
+series per measure and activity (or per strategic objective) with the
+achievement, target and achievement % in each report. Targets are the
+period_target stored with each achievement, so a series comes from one
+query. Trends are cached per (organization, fiscal year) under a stamp of
+the reports, their aggregates and the sub-activities budgets are read
+from, so any save produces a fresh trend.
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum
+
+from .consolidated_export import fingerprint
+from .models import (
+    ActivityAchievement, PerformanceAchievement, Report, ReportAggregate, StrategicObjective, SubActivity
+)
+from .report_aggregates import FUNDING_SOURCES, report_aggregates, report_budget
+
+TREND_LEVELS = ('objective', 'measure')
+
+TREND_CACHE_TIMEOUT = 600
+
+REPORT_TYPE_ORDER = {report_type: position for position, (report_type, _) in enumerate(Report.REPORT_TYPES)}
+
+
+def _percent(achievement, target):
+    return round(float(achievement) * 100 / float(target), 2) if target else None
+
+
+def _fill_period_targets(model, item_field, reports, target_for_period):
+    """Store the period target of achievements saved before targets were stored"""
+    report_types = {report.id: report.report_type for report in reports}
+    missing = list(
+        model.objects.filter(report_id__in=report_types, period_target__isnull=True).select_related(item_field)
+    )
+    for achievement in missing:
+        achievement.period_target = target_for_period(
+            getattr(achievement, item_field), report_types[achievement.report_id]
+        ) or 0
+    if missing:
+        model.objects.bulk_update(missing, ['period_target'], batch_size=500)
+
+
+def _item_series(model, kind, item_field, name_field, report_ids):
+    series = {}
+    rows = model.objects.filter(report_id__in=report_ids, period_target__gt=0).values(
+        'report_id', f'{item_field}_id', name_field, 'achievement', 'period_target'
+    )
+    for row in rows:
+        item_id = row[f'{item_field}_id']
+        entry = series.setdefault(item_id, {'kind': kind, 'id': item_id, 'name': row[name_field], 'points': {}})
+        entry['points'][row['report_id']] = {
+            'achievement': float(row['achievement']),
+            'target': float(row['period_target']),
+            'achievement_percent': _percent(row['achievement'], row['period_target']),
+        }
+    return list(series.values())
+
+
+def _objective_series(organization_id, report_ids):
+    """Average achievement % of the organization's own measures per objective, as report_statistics"""
+    percent = ExpressionWrapper(
+        F('achievement') * 100 / F('period_target'), output_field=DecimalField(max_digits=20, decimal_places=4)
+    )
+    rows = PerformanceAchievement.objects.filter(
+        report_id__in=report_ids, period_target__gt=0, performance_measure__organization_id=organization_id,
+        performance_measure__initiative__strategic_objective__isnull=False
+    ).values('report_id', objective_id=F('performance_measure__initiative__strategic_objective_id')).annotate(
+        achievement_percent=Avg(percent),
+        achievement=Sum('achievement'),
+        target=Sum('period_target'),
+        measures=Count('id')
+    ).order_by()
+
+    titles = dict(StrategicObjective.objects.values_list('id', 'title'))
+    series = {}
+    for row in rows:
+        entry = series.setdefault(row['objective_id'], {
+            'kind': 'objective', 'id': row['objective_id'], 'name': titles.get(row['objective_id'], ''), 'points': {}
+        })
+        entry['points'][row['report_id']] = {
+            'achievement': float(row['achievement']),
+            'target': float(row['target']),
+            'achievement_percent': round(float(row['achievement_percent']), 2),
+            'measures': row['measures'],
+        }
+    return list(series.values())
+
+
+def build_trend(organization_id, fiscal_year, target_for_period):
+    reports = sorted(
+        Report.objects.filter(
+            organization_id=organization_id, plan__fiscal_year=fiscal_year, status__in=['SUBMITTED', 'APPROVED']
+        ),
+        key=lambda report: REPORT_TYPE_ORDER.get(report.report_type, len(REPORT_TYPE_ORDER))
+    )
+    report_ids = [report.id for report in reports]
+    _fill_period_targets(PerformanceAchievement, 'performance_measure', reports, target_for_period)
+    _fill_period_targets(ActivityAchievement, 'main_activity', reports, target_for_period)
+    aggregates = report_aggregates(reports, target_for_period)
+
+    periods = []
+    for report in reports:
+        aggregate = aggregates[report.id]
+        utilized = sum(float(getattr(aggregate, f'{source}_utilized')) for source in FUNDING_SOURCES)
+        budget = sum(float(value) for value in report_budget(report, target_for_period).values())
+        periods.append({
+            'report_id': report.id,
+            'fiscal_year': fiscal_year,
+            'report_type': report.report_type,
+            'report_date': report.report_date.isoformat(),
+            'status': report.status,
+            'overall_achievement': round(aggregate.overall_achievement, 2),
+            'utilized': round(utilized, 2),
+            'budget': round(budget, 2),
+            'utilization_percent': _percent(utilized, budget),
+        })
+
+    return {
+        'periods': periods,
+        'objective': _objective_series(organization_id, report_ids),
+        'measure': (
+            _item_series(PerformanceAchievement, 'measure', 'performance_measure', 'performance_measure__name', report_ids)
+            + _item_series(ActivityAchievement, 'activity', 'main_activity', 'main_activity__name', report_ids)
+        ),
+    }
+
+
+def _trend_stamp(organization_id, fiscal_year):
+    reports = Report.objects.filter(organization_id=organization_id, plan__fiscal_year=fiscal_year)
+    state = reports.aggregate(count=Count('id'), latest=Max('updated_at'))
+    state['aggregates'] = ReportAggregate.objects.filter(report__in=reports).aggregate(latest=Max('updated_at'))['latest']
+    # Planned budgets are read live from the organization's and the default activities
+    state['sub_activities'] = SubActivity.objects.filter(
+        Q(main_activity__organization_id=organization_id) | Q(main_activity__organization__isnull=True)
+    ).aggregate(count=Count('id'), latest=Max('updated_at'))
+    return fingerprint(state)
+
+
+def get_trend(organization_id, fiscal_year, target_for_period):
+    """Cached trend of one organization and fiscal year"""
+    cache_key = f'report_trend_{organization_id}_{fiscal_year}_{_trend_stamp(organization_id, fiscal_year)}'
+    trend = cache.get(cache_key)
+    if trend is None:
+        trend = build_trend(organization_id, fiscal_year, target_for_period)
+        cache.set(cache_key, trend, TREND_CACHE_TIMEOUT)
+    return trend
+
+
+def organization_trend(organization_id, fiscal_years, level, target_for_period):
+    """Trends of several fiscal years joined into one time series per measure or objective"""
+    periods = []
+    series = {}
+    for fiscal_year in fiscal_years:
+        trend = get_trend(organization_id, fiscal_year, target_for_period)
+        periods.extend(trend['periods'])
+        for entry in trend[level]:
+            merged = series.setdefault((entry['kind'], entry['id']), {**entry, 'points': {}})
+            merged['points'].update(entry['points'])
+
+    return {
+        'organization': organization_id,
+        'fiscal_years': list(fiscal_years),
+        'level': level,
+        'periods': periods,
+        'series': [
+            {
+                **entry,
+                'points': [
+                    {'report_id': period['report_id'], **entry['points'][period['report_id']]}
+                    for period in periods if period['report_id'] in entry['points']
+                ]
+            }
+            for entry in series.values()
+        ],
+    }
@@ -0,0 +1,62 @@
+"""
+Reporting calendar of approved plans.
+
+Each report type covers a span of months from the plan's start date and can
+be filed once that span has ended. The windows are computed when a plan is
+approved and stored as ReportingWindow rows, so report creation and the
+frontend read them instead of recomputing dates.
+"""
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import transaction
+
+from .models import Plan, ReportingWindow
+
+# report type: (first month, months after the plan start the period ends); None = plan end date
+REPORT_PERIODS = {
+    'Q1': (0, 3),
+    'Q2': (3, 6),
+    '6M': (0, 6),
+    'Q3': (6, 9),
+    '9M': (0, 9),
+    'Q4': (9, 12),
+    'YEARLY': (0, None),
+}
+
+
+def _windows(plan):
+    days = getattr(settings, 'REPORTING_WINDOW_DAYS', 0)
+    for report_type, (start_month, end_month) in REPORT_PERIODS.items():
+        period_start = plan.from_date + relativedelta(months=start_month)
+        if end_month is None:
+            period_end = opens_on = plan.to_date
+        else:
+            opens_on = plan.from_date + relativedelta(months=end_month)
+            period_end = opens_on - timedelta(days=1)
+        yield ReportingWindow(
+            plan_id=plan.id,
+            report_type=report_type,
+            period_start=period_start,
+            period_end=period_end,
+            opens_on=opens_on,
+            closes_on=opens_on + timedelta(days=days) if days else None,
+        )
+
+
+def build_reporting_windows(plan_ids):
+    """(Re)compute the reporting windows of the given plans"""
+    plans = list(Plan.objects.filter(id__in=plan_ids).only('id', 'from_date', 'to_date'))
+    with transaction.atomic():
+        ReportingWindow.objects.filter(plan_id__in=[plan.id for plan in plans]).delete()
+        ReportingWindow.objects.bulk_create([window for plan in plans for window in _windows(plan)])
+
+
+def get_reporting_window(plan, report_type):
+    """The window of one report type; plans approved before windows existed get theirs now"""
+    window = ReportingWindow.objects.filter(plan_id=plan.id, report_type=report_type).first()
+    if window is None and report_type in REPORT_PERIODS:
+        build_reporting_windows([plan.id])
+        window = ReportingWindow.objects.filter(plan_id=plan.id, report_type=report_type).first()
+    return window
@@ -0,0 +1,168 @@
+"""
+What-if budget scenarios.
+
+Loads the cost inputs of a scope (sub-activity costs and funding, plus the
+normalized cost lines of tool-costed sub-activities) into NumPy arrays once,
+then applies per-category rate changes as vector operations. Only itemized
+costs move: WITHOUT_TOOL costs and sub-activities without cost lines keep
+their stored cost, and funding never changes.
+"""
+import numpy as np
+from django.db.models.functions import Coalesce
+
+from .models import Organization, SubActivity, SubActivityCostLine
+
+FUNDING_FIELDS = ['government_treasury', 'sdg_funding', 'partners_funding', 'other_funding']
+
+
+class ScenarioError(ValueError):
+    """Raised for scenario requests that cannot be evaluated"""
+
+
+def organization_subtree(organization_id):
+    """organization_id and all of its descendants"""
+    children = {}
+    for org_id, parent_id in Organization.objects.values_list('id', 'parent_id'):
+        children.setdefault(parent_id, []).append(org_id)
+
+    subtree = []
+    stack = [organization_id]
+    while stack:
+        org_id = stack.pop()
+        subtree.append(org_id)
+        stack.extend(children.get(org_id, []))
+    return subtree
+
+
+def _money(value):
+    return round(float(value), 2)
+
+
+class ScenarioInputs:
+    """Cost inputs of a scope as arrays; None for organization_ids means the whole ministry"""
+
+    def __init__(self, organization_ids=None):
+        sub_activities = SubActivity.objects.annotate(
+            organization_id=Coalesce('main_activity__organization_id', 'main_activity__initiative__organization_id')
+        )
+        if organization_ids is not None:
+            sub_activities = sub_activities.filter(organization_id__in=organization_ids)
+
+        rows = list(sub_activities.order_by('id').values_list(
+            'id', 'organization_id', 'activity_type', 'budget_calculation_type',
+            'estimated_cost_with_tool', 'estimated_cost_without_tool', *FUNDING_FIELDS
+        ))
+        count = len(rows)
+
+        self.sub_activity_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.organizations, self.organization_index = np.unique(
+            np.array([row[1] or 0 for row in rows], dtype=np.int64), return_inverse=True
+        )
+        self.activity_types, self.activity_type_index = np.unique(
+            np.array([row[2] or 'Other' for row in rows], dtype=str), return_inverse=True
+        )
+        self.cost = np.array(
+            [float(row[4] if row[3] == 'WITH_TOOL' else row[5]) for row in rows], dtype=np.float64
+        )
+        self.funding = np.array(
+            [[float(value) for value in row[6:]] for row in rows], dtype=np.float64
+        ).reshape(count, len(FUNDING_FIELDS))
+
+        lines = SubActivityCostLine.objects.filter(
+            sub_activity__budget_calculation_type='WITH_TOOL'
+        )
+        if organization_ids is not None:
+            lines = lines.filter(sub_activity_id__in=sub_activities.values('id'))
+        line_rows = list(lines.values_list('sub_activity_id', 'category', 'amount'))
+
+        line_sub_activity_ids = np.array([row[0] for row in line_rows], dtype=np.int64)
+        # Sub-activities are ordered by id, so positions come from a binary search
+        self.line_position = np.searchsorted(self.sub_activity_ids, line_sub_activity_ids)
+        self.categories, self.line_category_index = np.unique(
+            np.array([row[1] for row in line_rows], dtype=str), return_inverse=True
+        )
+        self.line_amount = np.array([float(row[2]) for row in line_rows], dtype=np.float64)
+
+    def factors(self, changes):
+        """Per-category multipliers from {"CATEGORY": percent change}"""
+        factors = np.ones(len(self.categories), dtype=np.float64)
+        for category, percent in (changes or {}).items():
+            try:
+                percent = float(percent)
+            except (TypeError, ValueError):
+                raise ScenarioError(f'Change for {category} must be a percentage')
+            if percent < -100:
+                raise ScenarioError(f'Change for {category} cannot be below -100%')
+            index = np.searchsorted(self.categories, category)
+            if index < len(self.categories) and self.categories[index] == category:
+                factors[index] = 1 + percent / 100
+        return factors
+
+    def evaluate(self, changes):
+        """Baseline and scenario totals by organization, activity type, cost category and funding source"""
+        factors = self.factors(changes)
+        scenario_lines = self.line_amount * factors[self.line_category_index]
+        delta = np.bincount(
+            self.line_position, weights=scenario_lines - self.line_amount, minlength=len(self.cost)
+        )
+        scenario_cost = self.cost + delta
+
+        funding_total = self.funding.sum(axis=1)
+        baseline_gap = np.maximum(self.cost - funding_total, 0)
+        scenario_gap = np.maximum(scenario_cost - funding_total, 0)
+
+        def group(index, size):
+            return [
+                np.bincount(index, weights=values, minlength=size)
+                for values in (self.cost, scenario_cost, funding_total, baseline_gap, scenario_gap)
+            ]
+
+        def rows(labels, sums, key):
+            return [
+                {
+                    key: label,
+                    'baseline_cost': _money(sums[0][i]),
+                    'scenario_cost': _money(sums[1][i]),
+                    'change': _money(sums[1][i] - sums[0][i]),
+                    'funding': _money(sums[2][i]),
+                    'baseline_gap': _money(sums[3][i]),
+                    'scenario_gap': _money(sums[4][i]),
+                }
+                for i, label in enumerate(labels)
+            ]
+
+        organization_sums = group(self.organization_index, len(self.organizations))
+        activity_type_sums = group(self.activity_type_index, len(self.activity_types))
+
+        category_baseline = np.bincount(self.line_category_index, weights=self.line_amount, minlength=len(self.categories))
+        category_scenario = np.bincount(self.line_category_index, weights=scenario_lines, minlength=len(self.categories))
+
+        return {
+            'totals': {
+                'baseline_cost': _money(self.cost.sum()),
+                'scenario_cost': _money(scenario_cost.sum()),
+                'change': _money(delta.sum()),
+                'funding': _money(funding_total.sum()),
+                'baseline_gap': _money(baseline_gap.sum()),
+                'scenario_gap': _money(scenario_gap.sum()),
+                'sub_activities': int(len(self.cost)),
+            },
+            'by_organization': rows([int(org_id) or None for org_id in self.organizations], organization_sums, 'organization'),
+            'by_activity_type': rows([str(label) for label in self.activity_types], activity_type_sums, 'activity_type'),
+            'by_category': [
+                {
+                    'category': str(category),
+                    'factor': float(factors[i]),
+                    'baseline_cost': _money(category_baseline[i]),
+                    'scenario_cost': _money(category_scenario[i]),
+                }
+                for i, category in enumerate(self.categories)
+            ],
+            # Funding is fixed; a scenario only moves the unfunded share
+            'by_funding_source': [
+                {'source': field, 'amount': _money(self.funding[:, i].sum())}
+                for i, field in enumerate(FUNDING_FIELDS)
+            ] + [
+                {'source': 'unfunded', 'amount': _money(scenario_gap.sum()), 'baseline_amount': _money(baseline_gap.sum())}
+            ],
+        }
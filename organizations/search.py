@@ -0,0 +1,94 @@
+"""
+In-memory trigram search for typeahead over small reference catalogues.
+
+The index maps every trigram of an item's normalized text to the ids of the
+items containing it, so a substring query only verifies the few candidates
+that share all of its trigrams. Queries shorter than a trigram fall back to
+a word-prefix scan over a sorted word list.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+# Any run of characters that are not Unicode letters or digits
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """
+    Casefold and collapse punctuation/underscores to single spaces. Letters of
+    any script are kept; NFKC composes accents so they stay part of a word.
+    """
+    return _NON_WORD.sub(' ', unicodedata.normalize('NFKC', str(text or '')).casefold()).strip()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Immutable index over (id, name, extra text) entries.
+
+    Matches on the name rank above matches on the extra text; within a rank
+    shorter names come first.
+    """
+
+    def __init__(self, entries):
+        self.names = {}
+        self.texts = {}
+        self.postings = {}
+        words = set()
+        for item_id, name, extra in entries:
+            name = normalize(name)
+            text = f'{name} {normalize(extra)}'.strip()
+            self.names[item_id] = name
+            self.texts[item_id] = text
+            for trigram in _trigrams(text):
+                self.postings.setdefault(trigram, set()).add(item_id)
+            words.update((word, item_id) for word in text.split())
+        self.words = sorted(words)
+
+    def _candidates(self, query):
+        if len(query) < 3:
+            start = bisect_left(self.words, (query,))
+            candidates = set()
+            for word, item_id in self.words[start:]:
+                if not word.startswith(query):
+                    break
+                candidates.add(item_id)
+            return candidates
+
+        postings = sorted((self.postings.get(trigram, set()) for trigram in _trigrams(query)), key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return {item_id for item_id in candidates if query in self.texts[item_id]}
+
+    def _rank(self, item_id, query):
+        name = self.names[item_id]
+        if name == query:
+            rank = 0
+        elif name.startswith(query):
+            rank = 1
+        elif f' {query}' in f' {name}':
+            rank = 2
+        elif query in name:
+            rank = 3
+        else:
+            rank = 4
+        return (rank, len(name), name, item_id)
+
+    def search(self, query, limit=20, allowed=None):
+        """Ids of the best matches for query, at most limit"""
+        query = normalize(query)
+        if not query:
+            return []
+        candidates = self._candidates(query)
+        if allowed is not None:
+            candidates = {item_id for item_id in candidates if allowed(item_id)}
+        return [item_id for *_, item_id in sorted(self._rank(item_id, query) for item_id in candidates)][:limit]
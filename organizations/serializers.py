@@ -10,7 +10,7 @@ from .models import (
     Location, LandTransport, AirTransport, PerDiem, Accommodation,
     ParticipantCost, SessionCost, PrintingCost, SupervisorCost,
     ProcurementItem, Plan, PlanReview, SubActivity, Report,
-    PerformanceAchievement, ActivityAchievement, SubActivityBudgetUtilization
+    PerformanceAchievement, ActivityAchievement, SubActivityBudgetUtilization, BackgroundJob
 )
 from decimal import Decimal, InvalidOperation
 import json
@@ -272,6 +272,15 @@ class SubActivitySerializer(serializers.ModelSerializer):
         return data
 
 
+class SubActivityBulkItemSerializer(SubActivitySerializer):
+    """
+    Row serializer for the bulk create endpoint. main_activity is taken as a
+    plain id so the view can resolve all rows from a single prefetch instead
+    of one lookup per row.
+    """
+    main_activity = serializers.IntegerField()
+
+
 class MainActivitySerializer(serializers.ModelSerializer):
     organization_name = serializers.CharField(source='organization.name', read_only=True)
     sub_activities = SubActivitySerializer(many=True, read_only=True)
@@ -311,14 +320,18 @@ class MainActivitySerializer(serializers.ModelSerializer):
             return 0
 
 
+    def _default_organization(self):
+        """Organization of the authenticated user, used when none is given"""
+        user_org = self.context['request'].user.organization_users.first()
+        return user_org.organization if user_org else None
+
     def validate(self, data):
         """Ensure organization is set, then let model handle weight validation"""
         # Set organization from authenticated user
         if not data.get('organization'):
-            user = self.context['request'].user
-            user_org = user.organization_users.first()
-            if user_org:
-                data['organization'] = user_org.organization
+            organization = self._default_organization()
+            if organization:
+                data['organization'] = organization
 
         # Validate period selection
         selected_months = data.get('selected_months', [])
@@ -346,6 +359,21 @@ class MainActivitySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(e.messages)
 
 
+class MainActivityBulkItemSerializer(MainActivitySerializer):
+    """
+    Row serializer for the main activity bulk endpoint. initiative and
+    organization are taken as plain ids and the user's organization comes
+    from the context, so the view resolves all rows from single prefetches
+    instead of lookups per row.
+    """
+    initiative = serializers.IntegerField()
+    organization = serializers.IntegerField(required=False, allow_null=True)
+
+    def _default_organization(self):
+        organization = self.context.get('default_organization')
+        return organization.id if organization else None
+
+
 class ActivityBudgetSerializer(serializers.ModelSerializer):
     total_funding = serializers.SerializerMethodField()
     estimated_cost = serializers.SerializerMethodField()
@@ -802,10 +830,11 @@ class ReportSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'plan', 'organization', 'organization_name', 'planner', 'planner_name',
             'evaluator', 'evaluator_name', 'report_type', 'report_type_display', 'report_date',
-            'narrative_report', 'status', 'status_display', 'evaluator_feedback', 'evaluated_at',
+            'narrative_report', 'narrative_filename', 'status', 'status_display', 'evaluator_feedback', 'evaluated_at',
             'submitted_at', 'performance_achievements', 'activity_achievements', 'budget_utilizations',
             'created_at', 'updated_at'
         ]
+        read_only_fields = ['narrative_filename']
 
     def get_planner_name(self, obj):
         if obj.planner:
@@ -1041,4 +1070,14 @@ class AdminPlanSerializer(serializers.ModelSerializer):
             initiatives_count = len(obj_data.get('initiatives', []))
             print(f"[ADMIN PLAN SERIALIZER] Objective {idx}: '{obj_data.get('title')}' has {initiatives_count} initiatives")
 
-        return serialized_data
\ No newline at end of file
+        return serialized_data
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'id', 'kind', 'status', 'params', 'progress', 'total', 'result', 'error',
+            'started_at', 'finished_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
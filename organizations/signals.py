@@ -0,0 +1,89 @@
+"""
+Signal handlers for the organizations app, connected in OrganizationsConfig.ready().
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .cost_lines import cost_inputs_changed, queue_cost_lines
+from .costing import RATE_MODELS, invalidate_rate_tables
+from .models import Report, SubActivity
+from .storage import add_reference, drop_reference
+
+logger = logging.getLogger(__name__)
+
+
+def rate_table_changed(sender, **kwargs):
+    """Drop this process's rate snapshot once the edit is committed"""
+    transaction.on_commit(invalidate_rate_tables)
+
+
+for model in RATE_MODELS:
+    post_save.connect(rate_table_changed, sender=model, dispatch_uid=f'rate_table_saved_{model.__name__}')
+    post_delete.connect(rate_table_changed, sender=model, dispatch_uid=f'rate_table_deleted_{model.__name__}')
+
+
+def sub_activity_before_save(sender, instance, raw=False, **kwargs):
+    """Remember whether the save touches the tool details or the stored cost"""
+    if raw:
+        return
+    try:
+        instance._cost_inputs_changed = cost_inputs_changed(instance, kwargs.get('update_fields'))
+    except Exception:
+        logger.exception(f"Error comparing cost inputs of sub-activity {instance.pk}")
+        instance._cost_inputs_changed = True
+
+
+def sub_activity_saved(sender, instance, raw=False, **kwargs):
+    """
+    Keep the normalized cost lines in step with the tool details. Saves that
+    leave the details and the stored cost alone (funding, name, ...) keep
+    the lines priced at the old rates, so recosting still sees rate changes.
+    """
+    if raw or not getattr(instance, '_cost_inputs_changed', True):
+        return
+    try:
+        queue_cost_lines([instance])
+    except Exception:
+        # Cost lines are derived data; rebuild_cost_lines() rolls back its own savepoint
+        logger.exception(f"Error rebuilding cost lines of sub-activity {instance.pk}")
+
+
+pre_save.connect(sub_activity_before_save, sender=SubActivity, dispatch_uid='sub_activity_cost_inputs')
+post_save.connect(sub_activity_saved, sender=SubActivity, dispatch_uid='sub_activity_cost_lines')
+
+
+def report_narrative_before_save(sender, instance, raw=False, **kwargs):
+    """Remember the stored narrative so post_save can move its reference"""
+    if raw:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'narrative_report' not in update_fields:
+        instance._previous_narrative = instance.narrative_report.name
+        return
+    instance._previous_narrative = (
+        Report.objects.filter(pk=instance.pk).values_list('narrative_report', flat=True).first()
+        if instance.pk else None
+    )
+
+
+def report_narrative_saved(sender, instance, raw=False, **kwargs):
+    """Count references to content-addressed narrative blobs"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_narrative', None) or ''
+    current = instance.narrative_report.name or ''
+    if previous != current:
+        add_reference(current, instance.narrative_report.storage)
+        drop_reference(previous)
+    instance._previous_narrative = current
+
+
+def report_narrative_deleted(sender, instance, **kwargs):
+    drop_reference(instance.narrative_report.name)
+
+
+pre_save.connect(report_narrative_before_save, sender=Report, dispatch_uid='report_narrative_before_save')
+post_save.connect(report_narrative_saved, sender=Report, dispatch_uid='report_narrative_blob_refs')
+post_delete.connect(report_narrative_deleted, sender=Report, dispatch_uid='report_narrative_blob_release')
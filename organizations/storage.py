@@ -0,0 +1,109 @@
+"""
+Content-addressed file storage.
+
+Files are stored once per distinct content under <prefix>/<h[:2]>/<h><ext>,
+where h is the SHA-256 of the bytes, so re-uploading an identical file (a
+resubmission after rejection, the same narrative attached to two reports)
+reuses the stored blob. ContentBlob rows count the references to each blob;
+the gc_content_blobs command removes blobs nothing refers to.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+
+# Blob names of narrative reports, relative to MEDIA_ROOT
+NARRATIVE_BLOB_PREFIX = 'narrative_reports/blobs'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by the hash of their content"""
+
+    def __init__(self, prefix=NARRATIVE_BLOB_PREFIX, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix.strip('/')
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from content in _save(); equal names mean equal files
+        return name
+
+    def blob_name(self, sha256, extension=''):
+        return f'{self.prefix}/{sha256[:2]}/{sha256}{extension}'
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()[:10]
+        staging_dir = self.path(self.prefix)
+        os.makedirs(staging_dir, exist_ok=True)
+
+        # Hash while copying to a staging file next to the blobs, so the final move is a rename
+        digest = hashlib.sha256()
+        fd, staging_path = tempfile.mkstemp(dir=staging_dir, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as staging:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    staging.write(chunk)
+
+            name = self.blob_name(digest.hexdigest(), extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(staging_path)
+                # A reused blob counts as fresh for gc_content_blobs' grace period
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(staging_path, self.file_permissions_mode)
+                os.replace(staging_path, path)
+        except BaseException:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+            raise
+        return name
+
+
+def narrative_storage():
+    """Storage of Report.narrative_report (a callable so migrations do not pin the instance)"""
+    return ContentAddressedStorage()
+
+
+def _sha256_from_name(name):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return stem if len(stem) == 64 else ''
+
+
+def add_reference(name, storage=None):
+    """Count one more reference to the blob stored as name"""
+    from .models import ContentBlob
+
+    if not name:
+        return
+    blob, created = ContentBlob.objects.get_or_create(
+        name=name,
+        defaults={'sha256': _sha256_from_name(name), 'size': _size(name, storage), 'ref_count': 1}
+    )
+    if not created:
+        ContentBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+
+
+def drop_reference(name):
+    """Count one reference less; the blob itself is removed by gc_content_blobs"""
+    from .models import ContentBlob
+
+    if name:
+        ContentBlob.objects.filter(name=name, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1, updated_at=timezone.now()
+        )
+
+
+def _size(name, storage=None):
+    storage = storage or narrative_storage()
+    try:
+        return storage.size(name)
+    except OSError:
+        return 0
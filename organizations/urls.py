@@ -13,7 +13,10 @@ from .views import (
     ProcurementItemViewSet,login_view, logout_view, check_auth,
     update_profile, password_change, ReportViewSet,
     PerformanceAchievementViewSet, ActivityAchievementViewSet, SubActivityBudgetUtilizationViewSet,
-    report_statistics, reviewed_plans_summary, budget_by_activity_summary, executive_performance_summary)
+    BackgroundJobViewSet,
+    report_statistics, report_trend, reviewed_plans_summary, budget_by_activity_summary, executive_performance_summary,
+    costing_estimate, costing_rates, costing_routes, cost_line_summary, costing_scenario,
+    printing_quote)
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
 from django.http import JsonResponse
 router = DefaultRouter()
@@ -43,6 +46,7 @@ router.register(r'reports', ReportViewSet)
 router.register(r'performance-achievements', PerformanceAchievementViewSet)
 router.register(r'activity-achievements', ActivityAchievementViewSet)
 router.register(r'budget-utilizations', SubActivityBudgetUtilizationViewSet)
+router.register(r'jobs', BackgroundJobViewSet)
 
 
 # CSRF token endpoint
@@ -52,10 +56,18 @@ def csrf_token_view(request):
 urlpatterns = [
     # Report statistics endpoint (must come before router to avoid conflicts)
     path('reports/statistics/', report_statistics, name='report-statistics'),
+    path('reports/trend/', report_trend, name='report-trend'),
     # Optimized plan summary endpoints
     path('plans/reviewed-summary/', reviewed_plans_summary, name='reviewed-plans-summary'),
     path('plans/budget-by-activity/', budget_by_activity_summary, name='budget-by-activity'),
     path('plans/executive-performance/', executive_performance_summary, name='executive-performance'),
+    # Server-side costing
+    path('costing/estimate/', costing_estimate, name='costing-estimate'),
+    path('costing/rates/', costing_rates, name='costing-rates'),
+    path('costing/routes/', costing_routes, name='costing-routes'),
+    path('costing/lines-summary/', cost_line_summary, name='cost-line-summary'),
+    path('costing/scenarios/', costing_scenario, name='costing-scenario'),
+    path('costing/printing-quote/', printing_quote, name='printing-quote'),
     # Add custom budget update endpoint
     path('main-activities/<str:pk>/budget/', MainActivityViewSet.as_view({'post': 'update_budget'}), name='sub-activities-update'),
     # Auth endpoints
@@ -1,7 +1,7 @@
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
 from django.db import transaction
 from django.db.models import Sum, Q
@@ -21,7 +21,8 @@ from .models import (
     Plan, PlanReview,Location, LandTransport, AirTransport,
     PerDiem, Accommodation, ParticipantCost, SessionCost,
     PrintingCost, SupervisorCost, ProcurementItem, Report,
-    PerformanceAchievement, ActivityAchievement, SubActivityBudgetUtilization
+    PerformanceAchievement, ActivityAchievement, SubActivityBudgetUtilization, BackgroundJob,
+    NarrativeUpload, ReportingWindow
 )
 from .serializers import (
     OrganizationSerializer, OrganizationUserSerializer, UserSerializer,
@@ -33,12 +34,42 @@ from .serializers import (
     ParticipantCostSerializer, SessionCostSerializer, PrintingCostSerializer,
     SupervisorCostSerializer,ProcurementItemSerializer, ReportSerializer,
     PerformanceAchievementSerializer, ActivityAchievementSerializer, SubActivityBudgetUtilizationSerializer,
-    AdminPlanSerializer
+    AdminPlanSerializer, SubActivityBulkItemSerializer, MainActivityBulkItemSerializer, BackgroundJobSerializer
 )
+from .bulk_ops import bulk_create_with_pks, delete_main_activities
+from .cost_lines import deferred_cost_lines, queue_cost_lines
+from .weights import weight_budget
+from .report_aggregates import (
+    FUNDING_SOURCES, refresh_report_aggregate, refresh_utilization, report_aggregates, report_budget
+)
+from .reporting_windows import build_reporting_windows, get_reporting_window
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Upper bound on ids accepted by the batch transition endpoints
+BATCH_TRANSITION_MAX_IDS = 500
+
+
+def _parse_batch_ids(request):
+    """
+    Read the list of object ids for a batch transition from request.data['ids'].
+    Returns (ids, None) or (None, error response).
+    """
+    ids = request.data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return None, Response({'error': 'ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > BATCH_TRANSITION_MAX_IDS:
+        return None, Response(
+            {'error': f'At most {BATCH_TRANSITION_MAX_IDS} ids can be processed per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        ids = [int(obj_id) for obj_id in ids]
+    except (TypeError, ValueError):
+        return None, Response({'error': 'ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    return list(dict.fromkeys(ids)), None
+
 @ensure_csrf_cookie
 def login_view(request):
     if request.method == 'POST':
@@ -504,6 +535,13 @@ class StrategicInitiativeViewSet(viewsets.ModelViewSet):
     serializer_class = StrategicInitiativeSerializer
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Main activities can number in the hundreds; remove them set-based
+        # before the initiative's own cascade runs
+        delete_main_activities(instance.main_activities.values_list('id', flat=True))
+        instance.delete()
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
@@ -993,6 +1031,9 @@ class MainActivityViewSet(viewsets.ModelViewSet):
     serializer_class = MainActivitySerializer
     permission_classes = [IsAuthenticated]
 
+    # Upper bound on rows accepted by a single bulk request
+    BULK_MAX_ITEMS = 500
+
     @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         """
@@ -1000,44 +1041,179 @@ class MainActivityViewSet(viewsets.ModelViewSet):
         """
         try:
             instance = self.get_object()
-            instance_name = instance.name
-            
-            print(f"MainActivityViewSet: Starting delete for main activity {instance.id} ({instance_name})")
-            
-            # Get sub-activities count for logging
-            sub_activities = list(instance.sub_activities.all())
-            sub_activity_count = len(sub_activities)
-            print(f"Found {sub_activity_count} sub-activities to delete")
-            
-            # Clean up any ActivityBudget records that reference these sub-activities
-            if sub_activity_count > 0:
-                logger.info(f"Cleaning up budget references for {sub_activity_count} sub-activities")
-                for sub_activity in sub_activities:
-                    ActivityBudget.objects.filter(sub_activity_id=str(sub_activity.id)).delete()
-                
-            # Clean up legacy budget records linked to main activity
-            legacy_budgets = ActivityBudget.objects.filter(activity=instance)
-            legacy_count = legacy_budgets.count()
-            if legacy_count > 0:
-                logger.info(f"Deleting {legacy_count} legacy ActivityBudget records")
-                legacy_budgets.delete()
-                
-            # Delete the main activity (this will cascade to sub-activities)
-            instance.delete()
-            print(f"Main activity {instance.id} deleted successfully")
-            
+
+            # Remove budgets, utilizations, achievements and sub-activities set-based
+            deleted = delete_main_activities([instance.id])
+            logger.info(f"Deleted main activity {instance.id} ({instance.name}): {deleted}")
+
             return Response(
                 {'message': 'Main activity and all related data deleted successfully'}, 
                 status=status.HTTP_204_NO_CONTENT
             )
             
         except Exception as e:
-            print(f"Error deleting main activity {kwargs.get('pk')}: {str(e)}")
+            logger.exception(f"Error deleting main activity {kwargs.get('pk')}")
             return Response(
                 {'error': f'Failed to delete main activity: {str(e)}'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Create many main activities in one request.
+
+        Accepts either a list of main activity objects or {"main_activities": [...]}.
+        Sibling weights are checked for the whole batch against one
+        WeightBudget; if any row fails nothing is written. Returns one result
+        per input row, in input order.
+        """
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('main_activities')
+
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Expected a non-empty list of main activities'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {self.BULK_MAX_ITEMS} main activities can be created per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # The user's organization is resolved once for rows that do not name one
+            user_org = OrganizationUser.objects.filter(user=request.user).select_related('organization').first()
+            context = {**self.get_serializer_context(), 'default_organization': user_org.organization if user_org else None}
+
+            # Field-level validation for every row, without touching the database
+            results = []
+            valid_rows = []
+            for index, item in enumerate(items):
+                serializer = MainActivityBulkItemSerializer(data=item, context=context)
+                if serializer.is_valid():
+                    valid_rows.append((index, serializer.validated_data))
+                    results.append(None)
+                else:
+                    results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+
+            # One query each for all referenced initiatives and organizations
+            initiatives = StrategicInitiative.objects.select_related('organization').in_bulk(
+                {data['initiative'] for _, data in valid_rows}
+            )
+            organizations = Organization.objects.in_bulk(
+                {data['organization'] for _, data in valid_rows if data.get('organization')}
+            )
+
+            activities = []
+            for index, data in valid_rows:
+                data = dict(data)
+                initiative = initiatives.get(data.pop('initiative'))
+                organization_id = data.pop('organization', None)
+                if initiative is None:
+                    results[index] = {'index': index, 'status': 'error',
+                                      'errors': {'initiative': ['Initiative not found']}}
+                    continue
+                if organization_id and organization_id not in organizations:
+                    results[index] = {'index': index, 'status': 'error',
+                                      'errors': {'organization': ['Organization not found']}}
+                    continue
+                activities.append((index, MainActivity(
+                    initiative=initiative, organization=organizations.get(organization_id), **data
+                )))
+
+            with weight_budget() as budget:
+                # One sibling query for the whole batch; the initiatives are already loaded
+                weight_errors = budget.validate([activity for _, activity in activities])
+
+                pending = []
+                for (index, activity), weight_error in zip(activities, weight_errors):
+                    if weight_error:
+                        results[index] = {'index': index, 'status': 'error', 'errors': {'weight': [weight_error]}}
+                        continue
+                    try:
+                        # The weight check is skipped for rows the budget validated
+                        activity.clean()
+                    except ValidationError as e:
+                        results[index] = {'index': index, 'status': 'error', 'errors': e.message_dict if hasattr(e, 'error_dict') else e.messages}
+                        continue
+                    pending.append((index, activity))
+
+                if len(pending) != len(items):
+                    for index, _ in pending:
+                        results[index] = {'index': index, 'status': 'valid'}
+                    return Response({'created': 0, 'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+                for _, activity in pending:
+                    activity.save()
+
+            for index, activity in pending:
+                results[index] = {
+                    'index': index,
+                    'status': 'created',
+                    'id': activity.id,
+                    'data': self.get_serializer(activity).data
+                }
+
+            logger.info(f"User {request.user.username} bulk created {len(pending)} main activities")
+            return Response({'created': len(pending), 'results': results}, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            logger.exception("Error bulk creating main activities")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """
+        Delete many main activities and their related data in one transaction.
+
+        Body: {"ids": [...]} and/or {"initiative": id}. Only activities created
+        by the user's organizations can be bulk deleted.
+        """
+        ids = request.data.get('ids') or []
+        initiative_id = request.data.get('initiative')
+        if not isinstance(ids, list) or (not ids and not initiative_id):
+            return Response(
+                {'error': 'Provide a list of ids or an initiative'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            queryset = MainActivity.objects.all()
+            if not request.user.is_superuser:
+                user_organizations = OrganizationUser.objects.filter(user=request.user).values_list('organization_id', flat=True)
+                queryset = queryset.filter(organization_id__in=user_organizations)
+            if ids:
+                queryset = queryset.filter(id__in=ids)
+            if initiative_id:
+                queryset = queryset.filter(initiative_id=initiative_id)
+
+            with transaction.atomic():
+                deletable_ids = list(queryset.select_for_update().values_list('id', flat=True))
+                deleted = delete_main_activities(deletable_ids)
+
+            deletable = set(deletable_ids)
+            results = [
+                {'id': activity_id, 'status': 'deleted'} if int(activity_id) in deletable
+                else {'id': activity_id, 'status': 'error', 'error': 'Main activity not found or not deletable'}
+                for activity_id in ids
+            ]
+
+            logger.info(f"User {request.user.username} bulk deleted {len(deletable_ids)} main activities: {deleted}")
+            return Response({
+                'deleted': len(deletable_ids),
+                'counts': deleted,
+                'results': results
+            }, status=status.HTTP_200_OK)
+
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid main activity id'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.exception("Error bulk deleting main activities")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
@@ -1193,6 +1369,57 @@ class SubActivityViewSet(viewsets.ModelViewSet):
     serializer_class = SubActivitySerializer
     permission_classes = [IsAuthenticated]
 
+    # Upper bound on rows accepted by a single bulk request
+    BULK_MAX_ITEMS = 500
+
+    def _get_allowed_org_ids(self):
+        """
+        Organization ids whose sub-activities the current user may access,
+        or None when the user is not restricted
+        """
+        user = self.request.user
+
+        # Get user's organizations and role
+        user_organizations = OrganizationUser.objects.filter(user=user)
+
+        if not user_organizations.exists():
+            return None
+
+        user_roles = user_organizations.values_list('role', flat=True)
+        user_org_ids = list(user_organizations.values_list('organization', flat=True))
+
+        # Helper function to get all child organizations recursively
+        def get_child_organizations(parent_org_id):
+            child_ids = [parent_org_id]
+
+            def get_descendants(org_id):
+                children = Organization.objects.filter(parent_id=org_id).values_list('id', flat=True)
+                for child_id in children:
+                    if child_id not in child_ids:
+                        child_ids.append(child_id)
+                        get_descendants(child_id)
+
+            get_descendants(parent_org_id)
+            return child_ids
+
+        # ADMIN users can see sub-activities from their organization hierarchy
+        if 'ADMIN' in user_roles:
+            admin_org = user_organizations.first().organization
+            allowed_org_ids = get_child_organizations(admin_org.id)
+            logger.info(f"Admin {user.username} accessing sub-activities from organization hierarchy: {allowed_org_ids}")
+            return allowed_org_ids
+
+        # EVALUATOR users can see all sub-activities (no filtering)
+        if 'EVALUATOR' in user_roles:
+            return None
+
+        # PLANNER users can only see sub-activities from their own organizations
+        if 'PLANNER' in user_roles:
+            logger.info(f"Planner {user.username} accessing sub-activities from orgs: {user_org_ids}")
+            return user_org_ids
+
+        return None
+
     def get_queryset(self):
         queryset = SubActivity.objects.select_related(
             'main_activity',
@@ -1201,62 +1428,219 @@ class SubActivityViewSet(viewsets.ModelViewSet):
             'main_activity__organization'
         ).all()
 
-        user = self.request.user
-
-        # Get user's organizations and role
-        user_organizations = OrganizationUser.objects.filter(user=user)
-
-        if user_organizations.exists():
-            user_roles = user_organizations.values_list('role', flat=True)
-            user_org_ids = list(user_organizations.values_list('organization', flat=True))
+        allowed_org_ids = self._get_allowed_org_ids()
+        if allowed_org_ids is not None:
+            # Filter sub-activities by organization through main_activity -> initiative -> organization
+            queryset = queryset.filter(
+                Q(main_activity__initiative__organization__in=allowed_org_ids) |
+                Q(main_activity__organization__in=allowed_org_ids)
+            )
 
-            # Helper function to get all child organizations recursively
-            def get_child_organizations(parent_org_id):
-                child_ids = [parent_org_id]
+        main_activity = self.request.query_params.get('main_activity', None)
+        if main_activity is not None:
+            queryset = queryset.filter(main_activity=main_activity)
 
-                def get_descendants(org_id):
-                    children = Organization.objects.filter(parent_id=org_id).values_list('id', flat=True)
-                    for child_id in children:
-                        if child_id not in child_ids:
-                            child_ids.append(child_id)
-                            get_descendants(child_id)
+        return queryset
 
-                get_descendants(parent_org_id)
-                return child_ids
+    FUNDING_GAPS_DEFAULT_LIMIT = 100
+    FUNDING_GAPS_MAX_LIMIT = 1000
 
-            # ADMIN users can see sub-activities from their organization hierarchy
-            if 'ADMIN' in user_roles:
-                admin_org = user_organizations.first().organization
-                admin_org_id = admin_org.id
+    @action(detail=False, methods=['get'], url_path='funding-gaps')
+    def funding_gaps(self, request):
+        """
+        Rank funding gaps in SQL using the stored gap columns.
 
-                # Get all child organizations in the hierarchy
-                allowed_org_ids = get_child_organizations(admin_org_id)
+        Default: the sub-activities with the largest gap. With
+        group_by=organization, per-organization cost, funding and gap
+        totals ranked by gap percentage. Filters: organization,
+        activity_type, min_gap, min_gap_percent; limit (default 100).
+        """
+        from decimal import Decimal, InvalidOperation
+        from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+        from django.db.models.functions import Coalesce
 
-                # Filter sub-activities by organization through main_activity -> initiative -> organization
+        try:
+            try:
+                limit = min(int(request.query_params.get('limit', self.FUNDING_GAPS_DEFAULT_LIMIT)),
+                            self.FUNDING_GAPS_MAX_LIMIT)
+                min_gap = Decimal(request.query_params.get('min_gap', '0'))
+                min_gap_percent = request.query_params.get('min_gap_percent')
+                min_gap_percent = Decimal(min_gap_percent) if min_gap_percent else None
+            except (ValueError, InvalidOperation):
+                return Response({'error': 'limit, min_gap and min_gap_percent must be numbers'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            queryset = SubActivity.objects.all()
+            allowed_org_ids = self._get_allowed_org_ids()
+            if allowed_org_ids is not None:
                 queryset = queryset.filter(
                     Q(main_activity__initiative__organization__in=allowed_org_ids) |
                     Q(main_activity__organization__in=allowed_org_ids)
                 )
-                logger.info(f"Admin {user.username} accessing sub-activities from organization hierarchy: {allowed_org_ids}")
-
-            # EVALUATOR users can see all sub-activities (no filtering)
-            elif 'EVALUATOR' in user_roles:
-                # No filtering for evaluators
-                pass
+            queryset = queryset.annotate(
+                organization_id=Coalesce('main_activity__organization_id', 'main_activity__initiative__organization_id')
+            )
+            if request.query_params.get('organization'):
+                queryset = queryset.filter(organization_id=request.query_params['organization'])
+            if request.query_params.get('activity_type'):
+                queryset = queryset.filter(activity_type=request.query_params['activity_type'])
+
+            if request.query_params.get('group_by') == 'organization':
+                rows = queryset.values('organization_id').annotate(
+                    cost=Sum('effective_cost'),
+                    funding=Sum('funding_total'),
+                    gap=Sum('funding_gap_amount'),
+                ).filter(cost__gt=0, gap__gt=min_gap).annotate(
+                    gap_percent=ExpressionWrapper(
+                        F('gap') * 100 / F('cost'), output_field=DecimalField(max_digits=12, decimal_places=2)
+                    )
+                )
+                if min_gap_percent is not None:
+                    rows = rows.filter(gap_percent__gte=min_gap_percent)
+                rows = list(rows.order_by('-gap_percent', '-gap')[:limit])
+
+                names = dict(Organization.objects.filter(
+                    id__in=[row['organization_id'] for row in rows]
+                ).values_list('id', 'name'))
+                return Response({'results': [
+                    {
+                        'organization': row['organization_id'],
+                        'organization_name': names.get(row['organization_id']),
+                        'estimated_cost': row['cost'],
+                        'total_funding': row['funding'],
+                        'funding_gap': row['gap'],
+                        'gap_percent': round(row['gap_percent'], 2),
+                    }
+                    for row in rows
+                ]}, status=status.HTTP_200_OK)
 
-            # PLANNER users can only see sub-activities from their own organizations
-            elif 'PLANNER' in user_roles:
+            queryset = queryset.filter(funding_gap_amount__gt=min_gap)
+            if min_gap_percent is not None:
                 queryset = queryset.filter(
-                    Q(main_activity__initiative__organization__in=user_org_ids) |
-                    Q(main_activity__organization__in=user_org_ids)
+                    effective_cost__gt=0,
+                    funding_gap_amount__gte=F('effective_cost') * min_gap_percent / 100
                 )
-                logger.info(f"Planner {user.username} accessing sub-activities from orgs: {user_org_ids}")
+            rows = queryset.order_by('-funding_gap_amount', 'id').values(
+                'id', 'name', 'activity_type', 'main_activity_id', 'main_activity__name', 'organization_id',
+                'effective_cost', 'funding_total', 'funding_gap_amount'
+            )[:limit]
+
+            return Response({'results': [
+                {
+                    'id': row['id'],
+                    'name': row['name'],
+                    'activity_type': row['activity_type'],
+                    'main_activity': row['main_activity_id'],
+                    'main_activity_name': row['main_activity__name'],
+                    'organization': row['organization_id'],
+                    'estimated_cost': row['effective_cost'],
+                    'total_funding': row['funding_total'],
+                    'funding_gap': row['funding_gap_amount'],
+                    'gap_percent': round(row['funding_gap_amount'] * 100 / row['effective_cost'], 2) if row['effective_cost'] else None,
+                }
+                for row in rows
+            ]}, status=status.HTTP_200_OK)
 
-        main_activity = self.request.query_params.get('main_activity', None)
-        if main_activity is not None:
-            queryset = queryset.filter(main_activity=main_activity)
+        except Exception as e:
+            logger.exception("Error ranking funding gaps")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        return queryset
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Create many sub-activities in one request.
+
+        Accepts either a list of sub-activity objects or {"sub_activities": [...]}.
+        All rows are validated first; if any row fails nothing is written.
+        Returns one result per input row, in input order.
+        """
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('sub_activities')
+
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Expected a non-empty list of sub-activities'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {self.BULK_MAX_ITEMS} sub-activities can be created per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # Field-level validation for every row, without touching the database
+            results = []
+            valid_rows = []
+            for index, item in enumerate(items):
+                serializer = SubActivityBulkItemSerializer(data=item)
+                if serializer.is_valid():
+                    valid_rows.append((index, serializer.validated_data))
+                    results.append(None)
+                else:
+                    results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+
+            # One query for all referenced main activities and their organizations
+            main_activity_ids = {data['main_activity'] for _, data in valid_rows}
+            main_activities = MainActivity.objects.select_related(
+                'initiative', 'initiative__organization', 'organization'
+            ).in_bulk(main_activity_ids)
+
+            allowed_org_ids = self._get_allowed_org_ids()
+            if allowed_org_ids is not None:
+                allowed_org_ids = set(allowed_org_ids)
+
+            pending = []
+            for index, data in valid_rows:
+                data = dict(data)
+                main_activity = main_activities.get(data.pop('main_activity'))
+                if main_activity is None:
+                    results[index] = {'index': index, 'status': 'error',
+                                      'errors': {'main_activity': ['Main activity not found']}}
+                    continue
+
+                if allowed_org_ids is not None:
+                    activity_org_ids = {main_activity.organization_id, main_activity.initiative.organization_id}
+                    if not activity_org_ids & allowed_org_ids:
+                        results[index] = {'index': index, 'status': 'error',
+                                          'errors': {'main_activity': ['You do not have permission to add sub-activities to this main activity']}}
+                        continue
+
+                sub_activity = SubActivity(main_activity=main_activity, **data)
+                try:
+                    sub_activity.clean()
+                except ValidationError as e:
+                    results[index] = {'index': index, 'status': 'error', 'errors': e.message_dict if hasattr(e, 'error_dict') else e.messages}
+                    continue
+                # bulk_create() does not call save()
+                sub_activity.refresh_funding_columns()
+                pending.append((index, sub_activity))
+
+            if len(pending) != len(items):
+                for index, _ in pending:
+                    results[index] = {'index': index, 'status': 'valid'}
+                return Response({'created': 0, 'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+            with transaction.atomic(), deferred_cost_lines():
+                created = bulk_create_with_pks(SubActivity, [sub_activity for _, sub_activity in pending])
+                # bulk_create() skips post_save on backends that return ids
+                queue_cost_lines(created)
+
+            for index, sub_activity in pending:
+                results[index] = {
+                    'index': index,
+                    'status': 'created',
+                    'id': sub_activity.id,
+                    'data': SubActivitySerializer(sub_activity).data
+                }
+
+            logger.info(f"User {request.user.username} bulk created {len(pending)} sub-activities")
+            return Response({'created': len(pending), 'results': results}, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            logger.exception("Error bulk creating sub-activities")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @action(detail=True, methods=['post'])
     def add_budget(self, request, pk=None):
@@ -1291,8 +1675,10 @@ class SubActivityViewSet(viewsets.ModelViewSet):
             
             print(f"SubActivityViewSet: Starting delete for sub-activity {instance.id} ({instance_name})")
             
+            report_ids = set(instance.budget_utilizations.values_list('report_id', flat=True))
             # Use the model's custom delete method which handles cascades
             instance.delete()
+            refresh_utilization(report_ids)
             
             print(f"SubActivityViewSet: Successfully deleted sub-activity {instance_name}")
             
@@ -1400,6 +1786,36 @@ class ActivityCostingAssumptionViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    RESOLVE_MAX_SPECS = 1000
+
+    @action(detail=False, methods=['post'])
+    def resolve(self, request):
+        """
+        Bulk assumption lookup.
+
+        Body: {"specs": [{"activity_type", "location", "cost_type"}, ...]};
+        location is an assumption location (e.g. "Adama") or a Location id.
+        Returns one amount per spec, null where no assumption is defined.
+        """
+        from .costing import resolve_assumptions
+
+        try:
+            specs = request.data.get('specs')
+            if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+                return Response({'error': 'specs must be a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(specs) > self.RESOLVE_MAX_SPECS:
+                return Response(
+                    {'error': f'At most {self.RESOLVE_MAX_SPECS} specs can be resolved per request'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            amounts = resolve_assumptions(specs)
+            return Response({'amounts': amounts}, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.exception("Error resolving costing assumptions")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 
 class PlanViewSet(viewsets.ModelViewSet):
     queryset = Plan.objects.all().select_related('organization').prefetch_related('selected_objectives')
@@ -1683,6 +2099,7 @@ class PlanViewSet(viewsets.ModelViewSet):
             # Update plan status
             plan.status = 'APPROVED'
             plan.save()
+            build_reporting_windows([plan.id])
 
             logger.info(f"Plan {pk} approved successfully by {request.user.username}")
             return Response({'message': 'Plan approved successfully'}, status=status.HTTP_200_OK)
@@ -1738,117 +2155,435 @@ class PlanViewSet(viewsets.ModelViewSet):
             logger.exception(f"Error rejecting plan {pk}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def _get_child_organizations(self, parent_org_id, all_orgs):
-        """
-        Recursively get all child organizations of a parent organization
-        """
-        child_ids = [parent_org_id]
-
-        def get_descendants(org_id):
-            children = [org.id for org in all_orgs if org.parent_id == org_id]
-            for child_id in children:
-                child_ids.append(child_id)
-                get_descendants(child_id)
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        """Approve many submitted plans. Body: {"ids": [...], "feedback": ""}"""
+        return self._bulk_review(request, 'APPROVED')
 
-        get_descendants(parent_org_id)
-        return child_ids
+    @action(detail=False, methods=['post'], url_path='bulk-reject')
+    def bulk_reject(self, request):
+        """Reject many submitted plans. Body: {"ids": [...], "feedback": ""}"""
+        return self._bulk_review(request, 'REJECTED')
 
-    def _get_admin_filtered_orgs(self, request):
+    def _bulk_review(self, request, new_status):
         """
-        Get the list of organization IDs that the admin can access based on hierarchy
-        Returns (admin_org_id, admin_org_type, allowed_org_ids)
+        Apply an evaluator decision to many plans: one query to load and lock
+        the candidates, one UPDATE for the status and one INSERT for the reviews
         """
-        user_organizations = OrganizationUser.objects.filter(
-            user=request.user,
-            role='ADMIN'
-        ).select_related('organization').first()
-
-        if not user_organizations:
-            return None, None, []
-
-        admin_org = user_organizations.organization
-        admin_org_id = admin_org.id
-        admin_org_type = admin_org.type
-
-        # If Minister, return all organizations
-        if admin_org_type == 'MINISTER':
-            return admin_org_id, admin_org_type, None
-
-        # For other organization types, get all descendants
-        all_orgs = list(Organization.objects.all())
-        allowed_org_ids = self._get_child_organizations(admin_org_id, all_orgs)
-
-        return admin_org_id, admin_org_type, allowed_org_ids
+        ids, error_response = _parse_batch_ids(request)
+        if error_response:
+            return error_response
 
-    @action(detail=False, methods=['get'])
-    def pending_reviews(self, request):
-        """Get plans pending review"""
+        verb = 'approve' if new_status == 'APPROVED' else 'reject'
         try:
-            # Check if user is an evaluator
             user_organizations = OrganizationUser.objects.filter(user=request.user)
             user_roles = user_organizations.values_list('role', flat=True)
 
-            if 'EVALUATOR' in user_roles:
-                # Evaluators can see all submitted plans for review
-                plans = Plan.objects.filter(status='SUBMITTED').select_related(
-                    'organization', 'strategic_objective'
-                ).prefetch_related('reviews', 'selected_objectives')
-                logger.info(f"Evaluator {request.user.username} accessing {plans.count()} pending plans")
-            elif 'ADMIN' in user_roles:
-                # Admins see plans based on their organization hierarchy
-                admin_org_id, admin_org_type, allowed_org_ids = self._get_admin_filtered_orgs(request)
+            if 'EVALUATOR' not in user_roles and 'ADMIN' not in user_roles:
+                return Response({'error': f'Only evaluators can {verb} plans'}, status=status.HTTP_403_FORBIDDEN)
 
-                plans_query = Plan.objects.filter(status='SUBMITTED').select_related(
-                    'organization', 'strategic_objective'
-                ).prefetch_related('reviews', 'selected_objectives')
+            evaluator_org_user = user_organizations.filter(role__in=['EVALUATOR', 'ADMIN']).first()
+            if not evaluator_org_user:
+                return Response({'error': 'Evaluator organization record not found'}, status=status.HTTP_400_BAD_REQUEST)
 
-                # Filter by organization hierarchy
-                if admin_org_type != 'MINISTER' and allowed_org_ids:
-                    plans_query = plans_query.filter(organization__in=allowed_org_ids)
+            feedback = request.data.get('feedback', '')
+            results = {}
 
-                plans = plans_query
-                logger.info(f"Admin {request.user.username} accessing {plans.count()} pending plans")
-            else:
-                # For planners and others, use the normal filtered queryset
-                plans = self.get_queryset().filter(status='SUBMITTED')
-                logger.info(f"User {request.user.username} accessing {plans.count()} filtered pending plans")
+            with transaction.atomic():
+                candidates = {
+                    row['id']: row for row in self.get_queryset().prefetch_related(None).filter(
+                        id__in=ids
+                    ).select_for_update().values('id', 'status', 'organization_id', 'fiscal_year')
+                }
+
+                # Plan.clean allows one SUBMITTED/APPROVED plan per organization and fiscal year
+                conflicts = set()
+                if new_status == 'APPROVED' and candidates:
+                    counts = {}
+                    for org_id, fiscal_year in Plan.objects.filter(
+                        organization_id__in={row['organization_id'] for row in candidates.values()},
+                        fiscal_year__in={row['fiscal_year'] for row in candidates.values()},
+                        status__in=['SUBMITTED', 'APPROVED']
+                    ).values_list('organization_id', 'fiscal_year'):
+                        counts[(org_id, fiscal_year)] = counts.get((org_id, fiscal_year), 0) + 1
+                    conflicts = {key for key, count in counts.items() if count > 1}
+
+                valid_ids = []
+                for plan_id in ids:
+                    row = candidates.get(plan_id)
+                    if row is None:
+                        results[plan_id] = {'id': plan_id, 'status': 'error', 'error': 'Plan not found'}
+                    elif row['status'] != 'SUBMITTED':
+                        results[plan_id] = {'id': plan_id, 'status': 'error', 'error': f'Only submitted plans can be {verb}d'}
+                    elif (row['organization_id'], row['fiscal_year']) in conflicts:
+                        results[plan_id] = {'id': plan_id, 'status': 'error',
+                                            'error': f"A plan for this organization and fiscal year {row['fiscal_year']} has already been submitted or approved"}
+                    else:
+                        valid_ids.append(plan_id)
+
+                now = timezone.now()
+                if valid_ids:
+                    Plan.objects.filter(id__in=valid_ids).update(status=new_status, updated_at=now)
+                    PlanReview.objects.bulk_create([
+                        PlanReview(plan_id=plan_id, status=new_status, feedback=feedback,
+                                   evaluator=evaluator_org_user, reviewed_at=now)
+                        for plan_id in valid_ids
+                    ])
+                    if new_status == 'APPROVED':
+                        build_reporting_windows(valid_ids)
+                for plan_id in valid_ids:
+                    results[plan_id] = {'id': plan_id, 'status': new_status}
+
+            logger.info(f"User {request.user.username} bulk {verb}d {len(valid_ids)} of {len(ids)} plans")
+            return Response({
+                'updated': len(valid_ids),
+                'results': [results[plan_id] for plan_id in ids]
+            }, status=status.HTTP_200_OK)
 
-            serializer = self.get_serializer(plans, many=True)
-            return Response(serializer.data)
         except Exception as e:
-            logger.exception("Error fetching pending reviews")
+            logger.exception(f"Error bulk {verb}ing plans")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=False, methods=['get'], url_path='admin-analytics')
-    def admin_analytics(self, request):
+    @action(detail=False, methods=['post'], url_path='roll-forward')
+    def roll_forward(self, request):
         """
-        Get comprehensive analytics data for admin dashboard
-        Filters data based on admin's organization hierarchy
-        Uses caching for 2 minutes to improve performance
-        """
-        try:
-            from django.core.cache import cache
+        Start a background job that carries plans over into a new fiscal year.
 
-            user_organizations = OrganizationUser.objects.filter(user=request.user)
-            user_roles = user_organizations.values_list('role', flat=True)
+        Body: source_fiscal_year (required), target_fiscal_year, plan_ids,
+        and statuses (default ["APPROVED"]). Admins are limited to their
+        organization hierarchy. Poll /jobs/{id}/ for the result.
+        """
+        from .jobs import start_job
+        from .plan_rollover import next_fiscal_year, roll_forward_plans, select_source_plans, year_offset
 
-            if 'ADMIN' not in user_roles:
+        try:
+            admin_org_id, admin_org_type, allowed_org_ids = self._get_admin_filtered_orgs(request)
+            if admin_org_id is None:
                 return Response(
-                    {'error': 'Only admins can access this endpoint'},
+                    {'error': 'Only admins can roll plans forward'},
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-            # Get admin's organization filtering
-            admin_org_id, admin_org_type, allowed_org_ids = self._get_admin_filtered_orgs(request)
+            source_fiscal_year = request.data.get('source_fiscal_year')
+            if not source_fiscal_year:
+                return Response({'error': 'source_fiscal_year is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Create cache key based on admin org filtering
-            cache_key = f'admin_analytics_{admin_org_type}_{admin_org_id}'
+            if request.data.get('uplift_percent') not in (None, '', 0, '0'):
+                # Sub-activities are shared by every year's plans; uplifting them would change approved plans
+                return Response({'error': 'uplift_percent is not supported: sub-activity costs are not year-scoped'},
+                                status=status.HTTP_400_BAD_REQUEST)
 
-            # Try to get cached data
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                logger.info(f"Returning cached analytics for {cache_key}")
-                return Response(cached_data)
+            target_fiscal_year = request.data.get('target_fiscal_year') or None
+            try:
+                year_offset(source_fiscal_year, target_fiscal_year or next_fiscal_year(source_fiscal_year))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            params = {
+                'source_fiscal_year': str(source_fiscal_year),
+                'target_fiscal_year': target_fiscal_year,
+                'plan_ids': request.data.get('plan_ids') or None,
+                'statuses': request.data.get('statuses') or ['APPROVED'],
+                'organization_ids': allowed_org_ids,
+            }
+
+            def run(job):
+                source_plans = select_source_plans(
+                    params['source_fiscal_year'],
+                    organization_ids=params['organization_ids'],
+                    plan_ids=params['plan_ids'],
+                    statuses=params['statuses']
+                )
+                return roll_forward_plans(
+                    source_plans,
+                    target_fiscal_year=params['target_fiscal_year'],
+                    progress=job.set_progress
+                )
+
+            job = start_job('plan_roll_forward', run, user=request.user, params=params)
+            logger.info(f"User {request.user.username} started plan roll forward job {job.id}")
+            return Response(BackgroundJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        except Exception as e:
+            logger.exception("Error starting plan roll forward")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='recost')
+    def recost(self, request):
+        """
+        Start a background job that re-prices tool-costed sub-activities
+        against the current rate tables.
+
+        Body: since (required ISO datetime; sub-activities using rates saved
+        after it are updated) and dry_run. Admins are limited to
+        their organization hierarchy. The job result reports the changes per
+        plan; poll /jobs/{id}/.
+        """
+        from django.utils.dateparse import parse_datetime
+        from .jobs import start_job
+        from .recosting import recost_sub_activities
+
+        try:
+            if request.user.is_superuser:
+                allowed_org_ids = None
+            else:
+                admin_org_id, admin_org_type, allowed_org_ids = self._get_admin_filtered_orgs(request)
+                if admin_org_id is None:
+                    return Response(
+                        {'error': 'Only admins can re-cost sub-activities'},
+                        status=status.HTTP_403_FORBIDDEN
+                    )
+
+            if not request.data.get('since'):
+                return Response({'error': 'since is required'}, status=status.HTTP_400_BAD_REQUEST)
+            since = parse_datetime(str(request.data['since']))
+            if since is None:
+                return Response({'error': 'since must be an ISO datetime'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+            params = {
+                'since': since.isoformat(),
+                'dry_run': str(request.data.get('dry_run', False)).lower() in ('1', 'true', 'yes'),
+                'organization_ids': allowed_org_ids,
+            }
+
+            def run(job):
+                return recost_sub_activities(
+                    since=since,
+                    organization_ids=params['organization_ids'],
+                    dry_run=params['dry_run'],
+                    progress=job.set_progress
+                )
+
+            job = start_job('sub_activity_recost', run, user=request.user, params=params)
+            logger.info(f"User {request.user.username} started sub-activity re-costing job {job.id}")
+            return Response(BackgroundJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        except Exception as e:
+            logger.exception("Error starting sub-activity re-costing")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='consolidated-export')
+    def consolidated_export(self, request):
+        """
+        Start a background job that writes a workbook of all approved plans,
+        one sheet per organization plus a summary. Sheets of organizations
+        whose data has not changed since the previous export are reused.
+        Admins get their organization hierarchy. Poll /jobs/{id}/; the result
+        carries a download_url.
+        """
+        from .consolidated_export import build_consolidated_export
+        from .jobs import start_job
+
+        try:
+            if request.user.is_superuser:
+                allowed_org_ids = None
+            else:
+                admin_org_id, admin_org_type, allowed_org_ids = self._get_admin_filtered_orgs(request)
+                if admin_org_id is None:
+                    return Response(
+                        {'error': 'Only admins can export consolidated plans'},
+                        status=status.HTTP_403_FORBIDDEN
+                    )
+
+            params = {'organization_ids': allowed_org_ids}
+
+            def run(job):
+                result = build_consolidated_export(
+                    organization_ids=params['organization_ids'],
+                    progress=job.set_progress,
+                    label=f'job{job.id}'
+                )
+                result['download_url'] = f'/api/plans/consolidated-export/download/?job={job.id}'
+                return result
+
+            job = start_job('consolidated_export', run, user=request.user, params=params)
+            logger.info(f"User {request.user.username} started consolidated export job {job.id}")
+            return Response(BackgroundJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        except Exception as e:
+            logger.exception("Error starting consolidated export")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], url_path='consolidated-export/download')
+    def consolidated_export_download(self, request):
+        """Download the workbook of a completed consolidated export job (?job=<id>)"""
+        import os
+        from django.conf import settings
+        from .consolidated_export import EXPORT_DIR
+        from .file_delivery import send_file
+
+        try:
+            jobs = BackgroundJob.objects.filter(kind='consolidated_export', status='COMPLETED')
+            if not request.user.is_superuser:
+                jobs = jobs.filter(created_by=request.user)
+            job_id = request.query_params.get('job', '')
+            job = jobs.filter(pk=job_id).first() if job_id.isdigit() else None
+            if job is None or not (job.result or {}).get('file'):
+                return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            export_dir = os.path.realpath(os.path.join(settings.MEDIA_ROOT, EXPORT_DIR))
+            path = os.path.realpath(os.path.join(settings.MEDIA_ROOT, job.result['file']))
+            if os.path.dirname(path) != export_dir or not os.path.exists(path):
+                # Older workbooks are pruned after later runs
+                return Response({'error': 'Export file is no longer available'}, status=status.HTTP_410_GONE)
+
+            return send_file(request, path)
+
+        except Exception as e:
+            logger.exception("Error downloading consolidated export")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _get_child_organizations(self, parent_org_id, all_orgs):
+        """
+        Recursively get all child organizations of a parent organization
+        """
+        child_ids = [parent_org_id]
+
+        def get_descendants(org_id):
+            children = [org.id for org in all_orgs if org.parent_id == org_id]
+            for child_id in children:
+                child_ids.append(child_id)
+                get_descendants(child_id)
+
+        get_descendants(parent_org_id)
+        return child_ids
+
+    def _get_admin_filtered_orgs(self, request):
+        """
+        Get the list of organization IDs that the admin can access based on hierarchy
+        Returns (admin_org_id, admin_org_type, allowed_org_ids)
+        """
+        user_organizations = OrganizationUser.objects.filter(
+            user=request.user,
+            role='ADMIN'
+        ).select_related('organization').first()
+
+        if not user_organizations:
+            return None, None, []
+
+        admin_org = user_organizations.organization
+        admin_org_id = admin_org.id
+        admin_org_type = admin_org.type
+
+        # If Minister, return all organizations
+        if admin_org_type == 'MINISTER':
+            return admin_org_id, admin_org_type, None
+
+        # For other organization types, get all descendants
+        all_orgs = list(Organization.objects.all())
+        allowed_org_ids = self._get_child_organizations(admin_org_id, all_orgs)
+
+        return admin_org_id, admin_org_type, allowed_org_ids
+
+    @action(detail=False, methods=['get'])
+    def pending_reviews(self, request):
+        """Get plans pending review"""
+        try:
+            plans = self._pending_plans(request).select_related(
+                'organization', 'strategic_objective'
+            ).prefetch_related('reviews', 'selected_objectives')
+            serializer = self.get_serializer(plans, many=True)
+            return Response(serializer.data)
+        except Exception as e:
+            logger.exception("Error fetching pending reviews")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], url_path='work-queue')
+    def work_queue(self, request):
+        """
+        Submitted plans and reports awaiting review, oldest submission first,
+        with summary fields only. ?limit= (default 50, at most 200) and
+        ?cursor= (the next value of the previous page). The first page also
+        carries the number of waiting plans and reports. Open an item through
+        /plans/{id}/ or /reports/{id}/ for its full tree.
+        """
+        from .work_queue import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, summarize, work_queue_page
+
+        try:
+            limit = request.query_params.get('limit', str(DEFAULT_PAGE_SIZE))
+            if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+                return Response({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            cursor = request.query_params.get('cursor')
+
+            plans = self._pending_plans(request)
+            # Reports the user can open, as listed by the reports endpoint
+            reports = ReportViewSet(request=request, action='list', format_kwarg=None).get_queryset().filter(
+                status='SUBMITTED'
+            )
+
+            try:
+                items, next_cursor = work_queue_page(plans, reports, cursor=cursor, size=int(limit))
+            except InvalidCursor as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            response_data = {'results': [summarize(item) for item in items], 'next': next_cursor}
+            if not cursor:
+                response_data['counts'] = {'plans': plans.count(), 'reports': reports.count()}
+            return Response(response_data)
+
+        except Exception as e:
+            logger.exception("Error fetching review work queue")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _pending_plans(self, request):
+        """SUBMITTED plans the user may review"""
+        # Check if user is an evaluator
+        user_organizations = OrganizationUser.objects.filter(user=request.user)
+        user_roles = user_organizations.values_list('role', flat=True)
+
+        if 'EVALUATOR' in user_roles:
+            # Evaluators can see all submitted plans for review
+            logger.info(f"Evaluator {request.user.username} accessing pending plans")
+            return Plan.objects.filter(status='SUBMITTED')
+
+        if 'ADMIN' in user_roles:
+            # Admins see plans based on their organization hierarchy
+            admin_org_id, admin_org_type, allowed_org_ids = self._get_admin_filtered_orgs(request)
+            plans = Plan.objects.filter(status='SUBMITTED')
+
+            # Filter by organization hierarchy
+            if admin_org_type != 'MINISTER' and allowed_org_ids:
+                plans = plans.filter(organization__in=allowed_org_ids)
+            logger.info(f"Admin {request.user.username} accessing pending plans")
+            return plans
+
+        # For planners and others, use the normal filtered queryset
+        logger.info(f"User {request.user.username} accessing filtered pending plans")
+        return self.get_queryset().filter(status='SUBMITTED')
+
+    @action(detail=False, methods=['get'], url_path='admin-analytics')
+    def admin_analytics(self, request):
+        """
+        Get comprehensive analytics data for admin dashboard
+        Filters data based on admin's organization hierarchy
+        Uses caching for 2 minutes to improve performance
+        """
+        try:
+            from django.core.cache import cache
+
+            user_organizations = OrganizationUser.objects.filter(user=request.user)
+            user_roles = user_organizations.values_list('role', flat=True)
+
+            if 'ADMIN' not in user_roles:
+                return Response(
+                    {'error': 'Only admins can access this endpoint'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            # Get admin's organization filtering
+            admin_org_id, admin_org_type, allowed_org_ids = self._get_admin_filtered_orgs(request)
+
+            # Create cache key based on admin org filtering
+            cache_key = f'admin_analytics_{admin_org_type}_{admin_org_id}'
+
+            # Try to get cached data
+            cached_data = cache.get(cache_key)
+            if cached_data:
+                logger.info(f"Returning cached analytics for {cache_key}")
+                return Response(cached_data)
 
             # Base query for plans
             plans_query = Plan.objects.select_related('organization', 'strategic_objective')
@@ -1995,6 +2730,183 @@ class PlanViewSet(viewsets.ModelViewSet):
             logger.exception(f"Error in admin_detail for plan {pk}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Stream the plan as a spreadsheet: ?file_format=xlsx (default) or csv.
+        Rows go out as they are read, one per measure, activity and sub-activity.
+        """
+        from django.http import Http404, StreamingHttpResponse
+        from django.utils.text import slugify
+        from .exports import CONTENT_TYPES, EXPORT_FORMATS, PLAN_COLUMNS, plan_rows, stream_export
+
+        try:
+            file_format = request.query_params.get('file_format', 'xlsx').lower()
+            if file_format not in EXPORT_FORMATS:
+                return Response({'error': f'file_format must be one of {", ".join(EXPORT_FORMATS)}'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            plan = self.get_object()
+            response = StreamingHttpResponse(
+                stream_export(file_format, PLAN_COLUMNS, plan_rows(plan), sheet_name=f'Plan {plan.id}'),
+                content_type=CONTENT_TYPES[file_format]
+            )
+            filename = f'plan-{plan.id}-{slugify(plan.organization.name) or "organization"}.{file_format}'
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            # Ask proxies not to buffer the whole body before sending it on
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        except Http404:
+            raise
+        except Exception as e:
+            logger.exception(f"Error exporting plan {pk}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'])
+    def pdf(self, request, pk=None):
+        """
+        Download the PDF of an approved plan. PDFs are cached per plan
+        version; when the current version has not been rendered yet a render
+        job is started (or the user's running one returned) with 202, and the
+        client requests the PDF again once the job has completed.
+        """
+        from django.utils.text import slugify
+        from .file_delivery import send_file
+        from .jobs import start_job
+        from .plan_pdf import cached_pdf, render_plans
+
+        try:
+            plan = self.get_object()
+            if plan.status != 'APPROVED':
+                return Response({'error': 'Only approved plans can be downloaded as PDF'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            path = cached_pdf(plan)
+            if path:
+                filename = f'plan-{plan.id}-{slugify(plan.organization.name) or "organization"}.pdf'
+                return send_file(request, path, filename=filename, content_type='application/pdf')
+
+            # Only the user's own job can be polled through /jobs/
+            job = BackgroundJob.objects.filter(
+                kind='plan_pdf', status__in=['PENDING', 'RUNNING'], params__plan_ids=[plan.id],
+                created_by=request.user
+            ).first()
+            if job is None:
+                params = {'plan_ids': [plan.id]}
+                job = start_job(
+                    'plan_pdf',
+                    lambda job: render_plans(params['plan_ids'], progress=job.set_progress),
+                    user=request.user, params=params
+                )
+            return Response(BackgroundJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        except Http404:
+            raise
+        except Exception as e:
+            logger.exception(f"Error getting PDF of plan {pk}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='pdf-batch')
+    def pdf_batch(self, request):
+        """
+        Start a background job rendering the PDFs of all approved plans of an
+        organization and its sub-organizations ({"organization": id,
+        "force": false}). Plans whose current version is cached are skipped
+        unless force is set.
+        """
+        from .jobs import start_job
+        from .plan_pdf import render_plans
+
+        try:
+            organization_id = request.data.get('organization')
+            if organization_id is None or not str(organization_id).isdigit():
+                return Response({'error': 'organization is required'}, status=status.HTTP_400_BAD_REQUEST)
+            organization_id = int(organization_id)
+            if not Organization.objects.filter(id=organization_id).exists():
+                return Response({'error': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            if not request.user.is_superuser:
+                admin_org_id, admin_org_type, allowed_org_ids = self._get_admin_filtered_orgs(request)
+                if admin_org_id is None:
+                    return Response({'error': 'Only admins can render plan PDFs in batch'},
+                                    status=status.HTTP_403_FORBIDDEN)
+                if allowed_org_ids is not None and organization_id not in allowed_org_ids:
+                    return Response({'error': 'Organization is outside your hierarchy'},
+                                    status=status.HTTP_403_FORBIDDEN)
+
+            organization_ids = self._get_child_organizations(organization_id, list(Organization.objects.all()))
+            params = {
+                'organization': organization_id,
+                'plan_ids': list(Plan.objects.filter(
+                    organization_id__in=organization_ids, status='APPROVED'
+                ).order_by('id').values_list('id', flat=True)),
+                'force': bool(request.data.get('force', False)),
+            }
+
+            job = start_job(
+                'plan_pdf',
+                lambda job: render_plans(params['plan_ids'], force=params['force'], progress=job.set_progress),
+                user=request.user, params=params
+            )
+            logger.info(
+                f"User {request.user.username} started PDF job {job.id} for {len(params['plan_ids'])} plans "
+                f"of organization {organization_id}"
+            )
+            return Response(BackgroundJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        except Exception as e:
+            logger.exception("Error starting plan PDF batch")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'], url_path='reporting-windows')
+    def reporting_windows(self, request, pk=None):
+        """
+        Reporting calendar of an approved plan: per report type the period it
+        covers, when reports can be created, whether that is today and the
+        existing report, if any.
+        """
+        try:
+            plan = self.get_object()
+            if plan.status != 'APPROVED':
+                return Response({'error': 'Only approved plans have a reporting calendar'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            windows = list(ReportingWindow.objects.filter(plan_id=plan.id))
+            if not windows:
+                # Approved before reporting windows were stored
+                build_reporting_windows([plan.id])
+                windows = list(ReportingWindow.objects.filter(plan_id=plan.id))
+
+            reports = {
+                row['report_type']: row
+                for row in Report.objects.filter(plan_id=plan.id).values('id', 'report_type', 'status')
+            }
+            today = timezone.localdate()
+            return Response({
+                'plan': plan.id,
+                'today': today,
+                'windows': [
+                    {
+                        'report_type': window.report_type,
+                        'label': window.get_report_type_display(),
+                        'period_start': window.period_start,
+                        'period_end': window.period_end,
+                        'opens_on': window.opens_on,
+                        'closes_on': window.closes_on,
+                        'is_open': window.is_open(today),
+                        'report': reports.get(window.report_type),
+                    }
+                    for window in windows
+                ]
+            })
+
+        except Http404:
+            raise
+        except Exception as e:
+            logger.exception(f"Error getting reporting windows of plan {pk}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class PlanReviewViewSet(viewsets.ModelViewSet):
     queryset = PlanReview.objects.all().select_related('plan', 'evaluator')
     serializer_class = PlanReviewSerializer
@@ -2008,6 +2920,22 @@ class PlanReviewViewSet(viewsets.ModelViewSet):
         return queryset
 
 
+class BackgroundJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = BackgroundJob.objects.all()
+    serializer_class = BackgroundJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Users only see the jobs they started
+        queryset = super().get_queryset()
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(created_by=self.request.user)
+        kind = self.request.query_params.get('kind', None)
+        if kind is not None:
+            queryset = queryset.filter(kind=kind)
+        return queryset
+
+
 
 # Costing Model ViewSets
 class LocationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -2067,6 +2995,44 @@ class ProcurementItemViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(category=category)
         return queryset
 
+    SEARCH_DEFAULT_LIMIT = 20
+    SEARCH_MAX_LIMIT = 100
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Typeahead over item names and categories.
+
+        ?q= matches word prefixes and substrings (case-insensitive); optional
+        ?category= restricts the results and ?limit= caps them (default 20,
+        max 100). Results are ranked exact, prefix, word prefix, substring.
+        """
+        from .costing import get_rate_tables
+
+        try:
+            query = request.query_params.get('q', '')
+            try:
+                limit = min(int(request.query_params.get('limit', self.SEARCH_DEFAULT_LIMIT)), self.SEARCH_MAX_LIMIT)
+            except ValueError:
+                return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+            tables = get_rate_tables()
+            category = request.query_params.get('category')
+            allowed = None
+            if category:
+                allowed = lambda item_id: tables.procurement_items[item_id].category == category
+
+            ids = tables.procurement_index().search(query, limit=max(limit, 0), allowed=allowed)
+            items = [tables.procurement_items[item_id] for item_id in ids]
+            return Response({
+                'query': query,
+                'results': ProcurementItemSerializer(items, many=True).data
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.exception("Error searching procurement items")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 
 class ReportViewSet(viewsets.ModelViewSet):
     queryset = Report.objects.all().select_related('plan', 'organization', 'planner').prefetch_related('performance_achievements', 'activity_achievements', 'budget_utilizations')
@@ -2172,36 +3138,26 @@ class ReportViewSet(viewsets.ModelViewSet):
             if plan.status != 'APPROVED':
                 return Response({'error': 'Can only create reports for approved plans'}, status=status.HTTP_400_BAD_REQUEST)
 
-            from datetime import date
-            from dateutil.relativedelta import relativedelta
-
-            current_date = date.today()
-            plan_start = plan.from_date
-            report_period_end = None
+            current_date = timezone.localdate()
+            window = get_reporting_window(plan, report_type)
+            if window is None:
+                return Response({'error': f'Unknown report type {report_type}'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if report_type == 'Q1':
-                report_period_end = plan_start + relativedelta(months=3)
-            elif report_type == 'Q2':
-                report_period_end = plan_start + relativedelta(months=6)
-            elif report_type == '6M':
-                report_period_end = plan_start + relativedelta(months=6)
-            elif report_type == 'Q3':
-                report_period_end = plan_start + relativedelta(months=9)
-            elif report_type == '9M':
-                report_period_end = plan_start + relativedelta(months=9)
-            elif report_type == 'Q4':
-                report_period_end = plan_start + relativedelta(months=12)
-            elif report_type == 'YEARLY':
-                report_period_end = plan.to_date
-
-            logger.info(f"Report type: {report_type}, Period end: {report_period_end}, Current date: {current_date}")
+            if current_date < window.opens_on:
+                error_msg = f'You are not allowed to report now. The reporting period for {report_type} has not ended yet. Please wait until {window.opens_on.strftime("%B %d, %Y")}.'
+                logger.warning(f"Report creation blocked: {error_msg}")
+                return Response({
+                    'error': error_msg,
+                    'report_period_end': window.opens_on.strftime("%Y-%m-%d"),
+                    'current_date': current_date.strftime("%Y-%m-%d")
+                }, status=status.HTTP_400_BAD_REQUEST)
 
-            if report_period_end and current_date < report_period_end:
-                error_msg = f'You are not allowed to report now. The reporting period for {report_type} has not ended yet. Please wait until {report_period_end.strftime("%B %d, %Y")}.'
+            if not window.is_open(current_date):
+                error_msg = f'The reporting window for {report_type} closed on {window.closes_on.strftime("%B %d, %Y")}.'
                 logger.warning(f"Report creation blocked: {error_msg}")
                 return Response({
                     'error': error_msg,
-                    'report_period_end': report_period_end.strftime("%Y-%m-%d"),
+                    'closes_on': window.closes_on.strftime("%Y-%m-%d"),
                     'current_date': current_date.strftime("%Y-%m-%d")
                 }, status=status.HTTP_400_BAD_REQUEST)
 
@@ -2257,52 +3213,189 @@ class ReportViewSet(viewsets.ModelViewSet):
             if 'EVALUATOR' not in user_roles and 'ADMIN' not in user_roles:
                 return Response({'error': 'Only evaluators can approve reports'}, status=status.HTTP_403_FORBIDDEN)
 
-            if report.status != 'SUBMITTED':
-                return Response({'error': 'Can only approve submitted reports'}, status=status.HTTP_400_BAD_REQUEST)
+            if report.status != 'SUBMITTED':
+                return Response({'error': 'Can only approve submitted reports'}, status=status.HTTP_400_BAD_REQUEST)
+
+            report.status = 'APPROVED'
+            report.evaluator = user
+            report.evaluated_at = timezone.now()
+            report.evaluator_feedback = request.data.get('feedback', '')
+            report.save()
+
+            return Response({'message': 'Report approved successfully'}, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.exception("Error approving report")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'])
+    def download_narrative(self, request, pk=None):
+        """Download narrative report file (Range and conditional requests supported)"""
+        from django.http import Http404
+        import os
+        from .file_delivery import send_file
+
+        try:
+            report = self.get_object()
+
+            if not report.narrative_report:
+                raise Http404("Narrative report not found")
+
+            file_path = report.narrative_report.path
+
+            if not os.path.exists(file_path):
+                raise Http404("File not found")
+
+            return send_file(request, file_path, filename=report.narrative_filename or None)
+
+        except Http404:
+            raise
+        except Exception as e:
+            logger.exception("Error downloading narrative report")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _upload_error(self, error):
+        data = {'error': str(error)}
+        if error.received is not None:
+            data['received'] = error.received
+        return Response(data, status=error.status)
+
+    def _get_narrative_upload(self, request, report, upload_id):
+        uploads = NarrativeUpload.objects.filter(report=report)
+        if not request.user.is_superuser:
+            uploads = uploads.filter(created_by=request.user)
+        return uploads.filter(pk=upload_id).first()
+
+    @action(detail=True, methods=['post'], url_path='narrative-uploads')
+    def start_narrative_upload(self, request, pk=None):
+        """
+        Start a chunked narrative upload. Body: filename, size (bytes) and
+        optionally sha256 of the whole file. Send parts with
+        PUT narrative-uploads/{id}/?offset=N (raw body, optional
+        X-Content-SHA256 header), resume from GET narrative-uploads/{id}/
+        and finish with POST narrative-uploads/{id}/complete/.
+        """
+        from .chunked_uploads import UploadError, describe, start_upload
+
+        try:
+            report = self.get_object()
+            upload = start_upload(
+                report, request.user,
+                filename=request.data.get('filename'),
+                size=request.data.get('size'),
+                sha256=request.data.get('sha256', '')
+            )
+            logger.info(f"User {request.user.username} started narrative upload {upload.id} for report {report.id}")
+            return Response(describe(upload), status=status.HTTP_201_CREATED)
+
+        except UploadError as e:
+            return self._upload_error(e)
+        except Http404:
+            raise
+        except Exception as e:
+            logger.exception(f"Error starting narrative upload for report {pk}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get', 'put', 'delete'],
+            url_path=r'narrative-uploads/(?P<upload_id>[0-9a-f-]{36})')
+    def narrative_upload(self, request, pk=None, upload_id=None):
+        """GET: upload state with the offset to resume from. PUT: one part. DELETE: abort."""
+        from .chunked_uploads import UploadError, abort_upload, describe, write_part
+
+        try:
+            report = self.get_object()
+            upload = self._get_narrative_upload(request, report, upload_id)
+            if upload is None:
+                return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
 
-            report.status = 'APPROVED'
-            report.evaluator = user
-            report.evaluated_at = timezone.now()
-            report.evaluator_feedback = request.data.get('feedback', '')
-            report.save()
+            if request.method == 'GET':
+                return Response(describe(upload))
+            if request.method == 'DELETE':
+                return Response(describe(abort_upload(upload.id)))
 
-            return Response({'message': 'Report approved successfully'}, status=status.HTTP_200_OK)
+            try:
+                offset = int(request.query_params.get('offset', ''))
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                return Response({'error': 'offset must be a number of bytes'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # The body is copied from the request stream; request.data is never parsed
+            upload = write_part(
+                upload.id, offset, request.stream, length,
+                part_sha256=request.headers.get('X-Content-SHA256', '')
+            )
+            return Response(describe(upload))
 
+        except UploadError as e:
+            return self._upload_error(e)
+        except Http404:
+            raise
         except Exception as e:
-            logger.exception("Error approving report")
+            logger.exception(f"Error handling narrative upload {upload_id}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=True, methods=['get'])
-    def download_narrative(self, request, pk=None):
-        """Download narrative report file"""
-        from django.http import FileResponse, Http404
-        import os
+    @action(detail=True, methods=['post'],
+            url_path=r'narrative-uploads/(?P<upload_id>[0-9a-f-]{36})/complete')
+    def complete_narrative_upload(self, request, pk=None, upload_id=None):
+        """Verify the uploaded file and attach it as the report's narrative"""
+        from .chunked_uploads import UploadError, complete_upload, describe
 
         try:
             report = self.get_object()
+            upload = self._get_narrative_upload(request, report, upload_id)
+            if upload is None:
+                return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
 
-            if not report.narrative_report:
-                raise Http404("Narrative report not found")
+            upload = complete_upload(upload.id)
+            report.refresh_from_db(fields=['narrative_report', 'updated_at'])
+            logger.info(f"Narrative upload {upload.id} attached to report {report.id}")
+            return Response({
+                **describe(upload),
+                'narrative_report': ReportSerializer(report, context={'request': request}).data['narrative_report'],
+            })
 
-            file_path = report.narrative_report.path
+        except UploadError as e:
+            return self._upload_error(e)
+        except Http404:
+            raise
+        except Exception as e:
+            logger.exception(f"Error completing narrative upload {upload_id}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            if not os.path.exists(file_path):
-                raise Http404("File not found")
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Stream the M&E report as a spreadsheet: ?file_format=xlsx (default) or csv.
+        Covers the measures and activities planned in the report period.
+        """
+        from django.http import Http404, StreamingHttpResponse
+        from django.utils.text import slugify
+        from .exports import CONTENT_TYPES, EXPORT_FORMATS, REPORT_COLUMNS, report_rows, stream_export
 
-            response = FileResponse(
-                open(file_path, 'rb'),
-                content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            )
+        try:
+            file_format = request.query_params.get('file_format', 'xlsx').lower()
+            if file_format not in EXPORT_FORMATS:
+                return Response({'error': f'file_format must be one of {", ".join(EXPORT_FORMATS)}'},
+                                status=status.HTTP_400_BAD_REQUEST)
 
-            filename = os.path.basename(file_path)
+            report = self.get_object()
+            response = StreamingHttpResponse(
+                stream_export(
+                    file_format, REPORT_COLUMNS, report_rows(report, self._get_target_for_period),
+                    sheet_name=f'{report.report_type} Report'
+                ),
+                content_type=CONTENT_TYPES[file_format]
+            )
+            organization = slugify(report.organization.name) or 'organization'
+            filename = f'report-{report.id}-{report.report_type.lower()}-{organization}.{file_format}'
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
+            response['X-Accel-Buffering'] = 'no'
             return response
 
         except Http404:
             raise
         except Exception as e:
-            logger.exception("Error downloading narrative report")
+            logger.exception(f"Error exporting report {pk}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @action(detail=True, methods=['post'])
@@ -2360,6 +3453,86 @@ class ReportViewSet(viewsets.ModelViewSet):
             logger.exception(f"Error resubmitting report {pk}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'], url_path='bulk-submit')
+    def bulk_submit(self, request):
+        """Submit many draft or rejected reports. Body: {"ids": [...]}"""
+        return self._bulk_transition(request, 'SUBMITTED')
+
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        """Approve many submitted reports. Body: {"ids": [...], "feedback": ""}"""
+        return self._bulk_transition(request, 'APPROVED')
+
+    @action(detail=False, methods=['post'], url_path='bulk-reject')
+    def bulk_reject(self, request):
+        """Reject many submitted reports. Body: {"ids": [...], "feedback": "..."}"""
+        return self._bulk_transition(request, 'REJECTED')
+
+    def _bulk_transition(self, request, new_status):
+        """
+        Apply a status transition to many reports: one query to load and lock
+        the candidates and one UPDATE for status, evaluator and timestamps
+        """
+        ids, error_response = _parse_batch_ids(request)
+        if error_response:
+            return error_response
+
+        try:
+            feedback = request.data.get('feedback', '')
+
+            if new_status in ('APPROVED', 'REJECTED'):
+                user_roles = OrganizationUser.objects.filter(user=request.user).values_list('role', flat=True)
+                verb = 'approve' if new_status == 'APPROVED' else 'reject'
+                if 'EVALUATOR' not in user_roles and 'ADMIN' not in user_roles:
+                    return Response({'error': f'Only evaluators can {verb} reports'}, status=status.HTTP_403_FORBIDDEN)
+                if new_status == 'REJECTED' and not feedback:
+                    return Response({'error': 'Feedback is required when rejecting a report'}, status=status.HTTP_400_BAD_REQUEST)
+
+            results = {}
+            with transaction.atomic():
+                candidates = dict(
+                    self.get_queryset().prefetch_related(None).filter(
+                        id__in=ids
+                    ).select_for_update().values_list('id', 'status')
+                )
+
+                valid_ids = []
+                for report_id in ids:
+                    current = candidates.get(report_id)
+                    if current is None:
+                        error = 'Report not found'
+                    elif new_status == 'SUBMITTED' and current == 'SUBMITTED':
+                        error = 'Report already submitted'
+                    elif new_status == 'SUBMITTED' and current == 'APPROVED':
+                        error = 'Report already approved'
+                    elif new_status != 'SUBMITTED' and current != 'SUBMITTED':
+                        error = f"Can only {'approve' if new_status == 'APPROVED' else 'reject'} submitted reports"
+                    else:
+                        valid_ids.append(report_id)
+                        continue
+                    results[report_id] = {'id': report_id, 'status': 'error', 'error': error}
+
+                now = timezone.now()
+                if new_status == 'SUBMITTED':
+                    update = {'status': new_status, 'submitted_at': now, 'evaluated_at': None}
+                else:
+                    update = {'status': new_status, 'evaluator': request.user,
+                              'evaluated_at': now, 'evaluator_feedback': feedback}
+                if valid_ids:
+                    Report.objects.filter(id__in=valid_ids).update(updated_at=now, **update)
+                for report_id in valid_ids:
+                    results[report_id] = {'id': report_id, 'status': new_status}
+
+            logger.info(f"User {request.user.username} moved {len(valid_ids)} of {len(ids)} reports to {new_status}")
+            return Response({
+                'updated': len(valid_ids),
+                'results': [results[report_id] for report_id in ids]
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.exception(f"Error moving reports to {new_status}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=True, methods=['get'])
     def plan_data(self, request, pk=None):
         try:
@@ -2874,6 +4047,28 @@ class PerformanceAchievementViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(report_id=report_id)
         return queryset
 
+    def _refresh_aggregates(self, report_ids):
+        """Keep the performance part of the touched reports' aggregates current"""
+        target_for_period = ReportViewSet()._get_target_for_period
+        for report in Report.objects.filter(id__in=report_ids):
+            refresh_report_aggregate(report, target_for_period, parts=('performance',))
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            achievement = serializer.save()
+            self._refresh_aggregates({achievement.report_id})
+
+    def perform_update(self, serializer):
+        previous_report_id = serializer.instance.report_id
+        with transaction.atomic():
+            achievement = serializer.save()
+            self._refresh_aggregates({previous_report_id, achievement.report_id})
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            self._refresh_aggregates({instance.report_id})
+
     @action(detail=False, methods=['post'])
     def bulk_create_or_update(self, request):
         try:
@@ -2894,6 +4089,7 @@ class PerformanceAchievementViewSet(viewsets.ModelViewSet):
 
             created_or_updated = []
             valid_measure_ids = []
+            period_targets = {}
 
             # Validate each measure is planned for this report period
             for achievement_data in achievements:
@@ -2908,6 +4104,7 @@ class PerformanceAchievementViewSet(viewsets.ModelViewSet):
                     # Only include if measure is planned for this period
                     if target and target > 0:
                         valid_measure_ids.append(performance_measure_id)
+                        period_targets[performance_measure_id] = target
                     else:
                         logger.warning(f"Skipping measure {performance_measure_id} - not planned for {report.report_type}")
                 except PerformanceMeasure.DoesNotExist:
@@ -2931,10 +4128,13 @@ class PerformanceAchievementViewSet(viewsets.ModelViewSet):
                         defaults={
                             'achievement': achievement_data.get('achievement', 0),
                             'justification': achievement_data.get('justification', ''),
+                            'period_target': period_targets[performance_measure_id],
                         }
                     )
                     created_or_updated.append(obj)
 
+                refresh_report_aggregate(report, report_viewset._get_target_for_period, parts=('performance',))
+
             serializer = self.get_serializer(created_or_updated, many=True)
             return Response({
                 'message': f'Successfully saved {len(created_or_updated)} performance achievements',
@@ -2978,6 +4178,7 @@ class ActivityAchievementViewSet(viewsets.ModelViewSet):
 
             created_or_updated = []
             valid_activity_ids = []
+            period_targets = {}
 
             # Validate each activity is planned for this report period
             for achievement_data in achievements:
@@ -2992,6 +4193,7 @@ class ActivityAchievementViewSet(viewsets.ModelViewSet):
                     # Only include if activity is planned for this period
                     if target and target > 0:
                         valid_activity_ids.append(main_activity_id)
+                        period_targets[main_activity_id] = target
                     else:
                         logger.warning(f"Skipping activity {main_activity_id} - not planned for {report.report_type}")
                 except MainActivity.DoesNotExist:
@@ -3015,6 +4217,7 @@ class ActivityAchievementViewSet(viewsets.ModelViewSet):
                         defaults={
                             'achievement': achievement_data.get('achievement', 0),
                             'justification': achievement_data.get('justification', ''),
+                            'period_target': period_targets[main_activity_id],
                         }
                     )
                     created_or_updated.append(obj)
@@ -3042,6 +4245,22 @@ class SubActivityBudgetUtilizationViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(report_id=report_id)
         return queryset
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            utilization = serializer.save()
+            refresh_utilization({utilization.report_id})
+
+    def perform_update(self, serializer):
+        previous_report_id = serializer.instance.report_id
+        with transaction.atomic():
+            utilization = serializer.save()
+            refresh_utilization({previous_report_id, utilization.report_id})
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            refresh_utilization({instance.report_id})
+
     @action(detail=False, methods=['post'])
     def bulk_create_or_update(self, request):
         try:
@@ -3087,6 +4306,8 @@ class SubActivityBudgetUtilizationViewSet(viewsets.ModelViewSet):
                     )
                     created_or_updated.append(obj)
 
+                refresh_report_aggregate(report, ReportViewSet()._get_target_for_period, parts=('utilization',))
+
             serializer = self.get_serializer(created_or_updated, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -3173,77 +4394,52 @@ def report_statistics(request):
         submitted_count = len(set(orgs_with_reports))
         not_submitted_count = total_orgs - submitted_count
 
+        # Achievement and utilization figures come from the per-report aggregates
+        target_for_period = ReportViewSet()._get_target_for_period
+        organizations = list(Organization.objects.filter(id__in=orgs_with_approved_plans))
+        reports = list(Report.objects.filter(
+            organization__in=organizations,
+            status__in=['SUBMITTED', 'APPROVED']
+        ).select_related('organization', 'plan').order_by('organization__name', '-report_date'))
+        aggregates = report_aggregates(reports, target_for_period)
+
+        def achievement_color(percentage):
+            if percentage >= 95:
+                return '#00A300'  # Dark Green
+            if percentage >= 80:
+                return '#93C572'  # Light Green
+            if percentage >= 65:
+                return '#FFFF00'  # Dark Yellow
+            if percentage >= 55:
+                return '#FFBF00'  # Light Yellow
+            return '#F2250A'  # Red
+
         # Get strategic objective achievements grouped by organization (apply filtering)
-        objective_achievements_by_org = []
-        organizations = Organization.objects.filter(id__in=orgs_with_approved_plans)
+        objective_sums = {}
+        for report in reports:
+            org_sums = objective_sums.setdefault(report.organization_id, {})
+            for objective_id, (percent_sum, count) in aggregates[report.id].objective_achievements.items():
+                entry = org_sums.setdefault(int(objective_id), [0.0, 0])
+                entry[0] += percent_sum
+                entry[1] += count
 
+        objective_achievements_by_org = []
+        strategic_objectives = list(StrategicObjective.objects.all().only('id', 'title'))
         for org in organizations:
-            org_reports = Report.objects.filter(
-                organization=org,
-                status__in=['SUBMITTED', 'APPROVED']
-            )
-
-            if not org_reports.exists():
+            org_sums = objective_sums.get(org.id)
+            if not org_sums:
                 continue
 
-            strategic_objectives = StrategicObjective.objects.all()
             org_objectives = []
-
             for objective in strategic_objectives:
-                # Get all performance measures under this objective (through initiatives)
-                initiatives = objective.initiatives.all()
-                measure_ids = PerformanceMeasure.objects.filter(
-                    initiative__in=initiatives,
-                    organization=org
-                ).values_list('id', flat=True)
-
-                if not measure_ids:
-                    continue
-
-                # Get achievements for these measures from this org's reports
-                achievements = PerformanceAchievement.objects.filter(
-                    performance_measure_id__in=measure_ids,
-                    report__in=org_reports
-                ).select_related('performance_measure')
-
-                if not achievements.exists():
-                    continue
-
-                # Calculate achievement percentage for each measure
-                total_percentage = Decimal('0')
-                measure_count = 0
-
-                for achievement in achievements:
-                    measure = achievement.performance_measure
-                    report = achievement.report
-
-                    # Get the target for the specific report period, not annual
-                    target = ReportViewSet()._get_target_for_period(measure, report.report_type)
-
-                    if target and target > 0:
-                        achievement_percent = (Decimal(str(achievement.achievement)) / Decimal(str(target))) * 100
-                        total_percentage += achievement_percent
-                        measure_count += 1
-
-                if measure_count > 0:
-                    avg_percentage = float(total_percentage / measure_count)
-
-                    # Determine color based on percentage
-                    color = '#F2250A'  # Red (default)
-                    if avg_percentage >= 95:
-                        color = '#00A300'  # Dark Green
-                    elif avg_percentage >= 80:
-                        color = '#93C572'  # Light Green
-                    elif avg_percentage >= 65:
-                        color = '#FFFF00'  # Dark Yellow
-                    elif avg_percentage >= 55:
-                        color = '#FFBF00'  # Light Yellow
-
+                percent_sum, count = org_sums.get(objective.id, (0, 0))
+                if count > 0:
+                    avg_percentage = percent_sum / count
                     org_objectives.append({
                         'id': objective.id,
                         'title': objective.title,
                         'achievement_percentage': round(avg_percentage, 2),
-                        'color': color
+                        'color': achievement_color(avg_percentage)
                     })
 
             if org_objectives:
@@ -3256,95 +4452,15 @@ def report_statistics(request):
 
         # Get organization M&E reports (approved only, apply filtering)
         organization_reports = []
-        approved_reports_query = Report.objects.filter(status='APPROVED')
-        if allowed_org_ids is not None:
-            approved_reports_query = approved_reports_query.filter(organization__in=allowed_org_ids)
-
-        approved_reports = approved_reports_query.select_related('organization', 'plan').prefetch_related(
-            'performance_achievements__performance_measure',
-            'activity_achievements__main_activity',
-            'budget_utilizations__sub_activity'
-        ).order_by('organization__name', '-report_date')
-
-        for report in approved_reports:
-            # Calculate overall achievement percentage
-            achievements = report.performance_achievements.all()
-            total_percentage = Decimal('0')
-            measure_count = 0
-
-            for achievement in achievements:
-                measure = achievement.performance_measure
-
-                # Get the target for the specific report period, not annual
-                target = ReportViewSet()._get_target_for_period(measure, report.report_type)
-
-                if target and target > 0:
-                    achievement_percent = (Decimal(str(achievement.achievement)) / Decimal(str(target))) * 100
-                    total_percentage += achievement_percent
-                    measure_count += 1
-
-            avg_achievement = float(total_percentage / measure_count) if measure_count > 0 else 0
-
-            # Calculate budget utilization and total budget
-            budget_utils = report.budget_utilizations.all()
-            total_govt_utilized = sum(float(bu.government_treasury_utilized or 0) for bu in budget_utils)
-            total_sdg_utilized = sum(float(bu.sdg_funding_utilized or 0) for bu in budget_utils)
-            total_partners_utilized = sum(float(bu.partners_funding_utilized or 0) for bu in budget_utils)
-            total_other_utilized = sum(float(bu.other_funding_utilized or 0) for bu in budget_utils)
-
-            # Calculate total budget from sub-activities
-            total_govt_budget = Decimal('0')
-            total_sdg_budget = Decimal('0')
-            total_partners_budget = Decimal('0')
-            total_other_budget = Decimal('0')
-
-            if report.plan:
-                try:
-                    # Get all sub-activities for the plan through the selected objectives
-                    # Include activities from both default initiatives (organization=NULL)
-                    # and custom initiatives from this organization
-                    # ONLY include activities that have valid targets for this report period
-                    selected_obj_ids = list(report.plan.selected_objectives.values_list('id', flat=True))
-
-                    if selected_obj_ids:
-                        initiatives = StrategicInitiative.objects.filter(
-                            strategic_objective_id__in=selected_obj_ids
-                        ).filter(
-                            Q(organization=report.organization) |
-                            Q(organization__isnull=True)
-                        )
-
-                        activities = MainActivity.objects.filter(
-                            initiative__in=initiatives
-                        ).filter(
-                            Q(organization=report.organization) |
-                            Q(organization__isnull=True)
-                        )
-
-                        # Filter activities by those that have valid targets for this report period
-                        valid_activity_ids = []
-                        for activity in activities:
-                            target = ReportViewSet()._get_target_for_period(activity, report.report_type)
-                            if target and target > 0:
-                                valid_activity_ids.append(activity.id)
-
-                        # Get sub-activities only for activities with valid targets
-                        sub_activities = SubActivity.objects.filter(
-                            main_activity_id__in=valid_activity_ids
-                        )
-
-                        for sub_activity in sub_activities:
-                            total_govt_budget += Decimal(str(sub_activity.government_treasury or 0))
-                            total_sdg_budget += Decimal(str(sub_activity.sdg_funding or 0))
-                            total_partners_budget += Decimal(str(sub_activity.partners_funding or 0))
-                            total_other_budget += Decimal(str(sub_activity.other_funding or 0))
-                except Exception as sub_error:
-                    # Log the error but don't fail the entire request
-                    logger.warning(f"Error calculating budget for report {report.id}: {str(sub_error)}")
-
-            total_budget = float(total_govt_budget + total_sdg_budget + total_partners_budget + total_other_budget)
-            total_utilized = total_govt_utilized + total_sdg_utilized + total_partners_utilized + total_other_utilized
-            total_remaining = total_budget - total_utilized
+        for report in reports:
+            if report.status != 'APPROVED':
+                continue
+            aggregate = aggregates[report.id]
+            utilized = {source: float(getattr(aggregate, f'{source}_utilized')) for source in FUNDING_SOURCES}
+            planned = report_budget(report, target_for_period)
+            budget = {source: float(planned[f'{source}_budget']) for source in FUNDING_SOURCES}
+            total_budget = sum(budget.values())
+            total_utilized = sum(utilized.values())
 
             organization_reports.append({
                 'report_id': report.id,
@@ -3353,52 +4469,35 @@ def report_statistics(request):
                 'report_type': report.report_type,
                 'report_date': report.report_date.isoformat(),
                 'status': report.status,
-                'overall_achievement': round(avg_achievement, 2),
+                'overall_achievement': round(aggregate.overall_achievement, 2),
                 'budget_utilization': {
-                    'government_treasury_utilized': round(total_govt_utilized, 2),
-                    'sdg_funding_utilized': round(total_sdg_utilized, 2),
-                    'partners_funding_utilized': round(total_partners_utilized, 2),
-                    'other_funding_utilized': round(total_other_utilized, 2),
-                    'government_treasury_budget': round(float(total_govt_budget), 2),
-                    'sdg_funding_budget': round(float(total_sdg_budget), 2),
-                    'partners_funding_budget': round(float(total_partners_budget), 2),
-                    'other_funding_budget': round(float(total_other_budget), 2),
+                    **{f'{source}_utilized': round(value, 2) for source, value in utilized.items()},
+                    **{f'{source}_budget': round(value, 2) for source, value in budget.items()},
                     'total_budget': round(total_budget, 2),
                     'total_utilized': round(total_utilized, 2),
-                    'total_remaining': round(total_remaining, 2),
+                    'total_remaining': round(total_budget - total_utilized, 2),
                     'total': round(total_utilized, 2)
                 }
             })
 
         # Get budget utilization aggregated by organization and source
-        budget_utilization_by_org = []
-        for org in organizations:
-            org_reports = Report.objects.filter(
-                organization=org,
-                status='APPROVED'
-            )
-
-            if not org_reports.exists():
+        utilized_by_org = {}
+        for report in reports:
+            if report.status != 'APPROVED':
                 continue
+            totals = utilized_by_org.setdefault(report.organization_id, dict.fromkeys(FUNDING_SOURCES, 0.0))
+            for source in FUNDING_SOURCES:
+                totals[source] += float(getattr(aggregates[report.id], f'{source}_utilized'))
 
-            budget_utils = SubActivityBudgetUtilization.objects.filter(
-                report__in=org_reports
-            )
-
-            total_govt = sum(float(bu.government_treasury_utilized or 0) for bu in budget_utils)
-            total_sdg = sum(float(bu.sdg_funding_utilized or 0) for bu in budget_utils)
-            total_partners = sum(float(bu.partners_funding_utilized or 0) for bu in budget_utils)
-            total_other = sum(float(bu.other_funding_utilized or 0) for bu in budget_utils)
-
-            if total_govt + total_sdg + total_partners + total_other > 0:
+        budget_utilization_by_org = []
+        for org in organizations:
+            totals = utilized_by_org.get(org.id)
+            if totals and sum(totals.values()) > 0:
                 budget_utilization_by_org.append({
                     'organization_id': org.id,
                     'organization_name': org.name,
-                    'government_treasury': round(total_govt, 2),
-                    'sdg_funding': round(total_sdg, 2),
-                    'partners_funding': round(total_partners, 2),
-                    'other_funding': round(total_other, 2),
-                    'total': round(total_govt + total_sdg + total_partners + total_other, 2)
+                    **{source: round(value, 2) for source, value in totals.items()},
+                    'total': round(sum(totals.values()), 2)
                 })
 
         return Response({
@@ -3424,6 +4523,68 @@ def report_statistics(request):
         return Response({'error': str(e), 'details': error_details}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def report_trend(request):
+    """
+    Achievement trend of an organization across its submitted and approved
+    reports: ?organization=<id> (default: the user's organization),
+    ?fiscal_year=<year> (default: every fiscal year reported on) and
+    ?level=objective (default) or measure. Returns the reports in period
+    order with their budget utilization and one series per objective, or
+    per measure and activity, with achievement, target and achievement %.
+    """
+    try:
+        from .report_trends import TREND_LEVELS, organization_trend
+
+        level = request.query_params.get('level', 'objective')
+        if level not in TREND_LEVELS:
+            return Response({'error': f'level must be one of {", ".join(TREND_LEVELS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        user_organizations = OrganizationUser.objects.filter(user=request.user).select_related('organization')
+        organization_id = request.query_params.get('organization')
+        if organization_id is None:
+            first = user_organizations.first()
+            if first is None:
+                return Response({'error': 'organization is required'}, status=status.HTTP_400_BAD_REQUEST)
+            organization_id = first.organization_id
+        elif not str(organization_id).isdigit():
+            return Response({'error': 'organization must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+        organization_id = int(organization_id)
+
+        # Same visibility as report_statistics: evaluators and the minister's admins see all,
+        # other admins their hierarchy, everyone else their own organizations
+        if not request.user.is_superuser:
+            roles = {uo.role for uo in user_organizations}
+            own_ids = {uo.organization_id for uo in user_organizations}
+            allowed = organization_id in own_ids or 'EVALUATOR' in roles
+            if not allowed and 'ADMIN' in roles:
+                admin_org = user_organizations.filter(role='ADMIN').first().organization
+                allowed = admin_org.type == 'MINISTER' or organization_id in PlanViewSet()._get_child_organizations(
+                    admin_org.id, list(Organization.objects.all())
+                )
+            if not allowed:
+                return Response({'error': 'You cannot view reports of this organization'},
+                                status=status.HTTP_403_FORBIDDEN)
+
+        fiscal_year = request.query_params.get('fiscal_year')
+        if fiscal_year:
+            fiscal_years = [fiscal_year]
+        else:
+            fiscal_years = sorted(set(Report.objects.filter(organization_id=organization_id).values_list(
+                'plan__fiscal_year', flat=True
+            )))
+
+        return Response(
+            organization_trend(organization_id, fiscal_years, level, ReportViewSet()._get_target_for_period)
+        )
+
+    except Exception as e:
+        logger.exception("Error getting report trend")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def reviewed_plans_summary(request):
@@ -3681,4 +4842,353 @@ def executive_performance_summary(request):
 
     except Exception as e:
         logger.exception("Error fetching executive performance")
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Upper bound on specs accepted by one costing estimate request
+COSTING_ESTIMATE_MAX_ITEMS = 200
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def costing_estimate(request):
+    """
+    Price costing specs on the server.
+
+    Accepts a single spec or {"items": [spec, ...]} and returns the itemized
+    estimate (or {"items": [...]}, one result per spec). See
+    organizations.costing for the spec format.
+    """
+    from .costing import CostingError, estimate, get_rate_tables
+
+    try:
+        data = request.data
+        batch = isinstance(data, dict) and 'items' in data
+        specs = data.get('items') if batch else [data]
+
+        if not isinstance(specs, list) or not specs:
+            return Response({'error': 'items must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(specs) > COSTING_ESTIMATE_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {COSTING_ESTIMATE_MAX_ITEMS} specs can be estimated per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tables = get_rate_tables()
+        results = []
+        for index, spec in enumerate(specs):
+            try:
+                results.append(estimate(spec, tables))
+            except CostingError as e:
+                if not batch:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                results.append({'index': index, 'error': str(e)})
+
+        if not batch:
+            return Response(results[0], status=status.HTTP_200_OK)
+        return Response({'items': results}, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.exception("Error estimating costs")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def costing_rates(request):
+    """
+    Every costing rate table in one versioned bundle.
+
+    The bundle is built once per rate-table version and kept in memory. The
+    version is sent as the ETag, so clients revalidating with If-None-Match
+    get a 304 until an admin edits a rate.
+    """
+    from django.utils.http import parse_etags
+    from .costing import get_rate_tables
+
+    try:
+        tables = get_rate_tables()
+        etag = f'"{tables.version}"'
+        client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+
+        if etag in client_etags or '*' in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(tables.bundle(), status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    except Exception as e:
+        logger.exception("Error building costing rates bundle")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+COSTING_ROUTES_MAX_PAIRS = 500
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def costing_routes(request):
+    """
+    Batch route price lookup.
+
+    ?pairs=1-5-ROUND,1-7,... returns one entry per leg (origin, destination,
+    trip type, matching transport id and price, or nulls when no route is
+    defined). Pass ?mode=air for air routes; trip types are ignored there.
+    """
+    from .costing import CostingError, get_rate_tables, lookup_routes, parse_route_pairs
+
+    try:
+        mode = request.query_params.get('mode', 'land')
+        if mode not in ('land', 'air'):
+            return Response({'error': 'mode must be "land" or "air"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            pairs = parse_route_pairs(request.query_params.get('pairs'))
+        except CostingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not pairs:
+            return Response({'error': 'pairs is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(pairs) > COSTING_ROUTES_MAX_PAIRS:
+            return Response(
+                {'error': f'At most {COSTING_ROUTES_MAX_PAIRS} pairs can be looked up per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tables = get_rate_tables()
+        return Response({
+            'version': tables.version,
+            'mode': mode,
+            'routes': lookup_routes(pairs, air=mode == 'air', tables=tables)
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.exception("Error looking up transport routes")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Grouping keys accepted by cost_line_summary
+COST_LINE_GROUP_FIELDS = {
+    'category': 'category',
+    'cost_type': 'cost_type',
+    'location': 'location_id',
+    'activity_type': 'sub_activity__activity_type',
+    'rate_model': 'rate_model',
+    'organization': 'organization',
+}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cost_line_summary(request):
+    """
+    Aggregate tool-costed spend from the normalized cost lines.
+
+    Filters: category, cost_type, location, organization. group_by is a
+    comma-separated list of category, cost_type, location, activity_type and
+    rate_model, organization (default category). Example: air travel to one
+    location is ?category=AIR_TRANSPORT&location=12, printing spend per
+    organization ?category=PRINTING&group_by=organization,cost_type.
+    """
+    from django.db.models import Count, Q, Sum
+    from django.db.models.functions import Coalesce
+    from .models import SubActivityCostLine
+
+    try:
+        group_by = [key.strip() for key in request.query_params.get('group_by', 'category').split(',') if key.strip()]
+        unknown = [key for key in group_by if key not in COST_LINE_GROUP_FIELDS]
+        if unknown or not group_by:
+            return Response(
+                {'error': f"group_by must be a list of {', '.join(COST_LINE_GROUP_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        lines = SubActivityCostLine.objects.all()
+        for param in ('category', 'cost_type'):
+            value = request.query_params.get(param)
+            if value:
+                lines = lines.filter(**{param: value})
+        if request.query_params.get('location'):
+            lines = lines.filter(location_id=request.query_params['location'])
+        if request.query_params.get('organization'):
+            organization_id = request.query_params['organization']
+            lines = lines.filter(
+                Q(sub_activity__main_activity__organization_id=organization_id) |
+                Q(sub_activity__main_activity__initiative__organization_id=organization_id)
+            )
+
+        if 'organization' in group_by:
+            lines = lines.annotate(organization=Coalesce(
+                'sub_activity__main_activity__organization_id',
+                'sub_activity__main_activity__initiative__organization_id'
+            ))
+
+        fields = [COST_LINE_GROUP_FIELDS[key] for key in group_by]
+        rows = lines.values(*fields).annotate(
+            amount=Sum('amount'),
+            quantity=Sum('quantity'),
+            sub_activities=Count('sub_activity_id', distinct=True)
+        ).order_by('-amount')
+
+        results = []
+        for row in rows:
+            item = {key: row[COST_LINE_GROUP_FIELDS[key]] for key in group_by}
+            item.update(amount=row['amount'], quantity=row['quantity'], sub_activities=row['sub_activities'])
+            results.append(item)
+
+        return Response({'group_by': group_by, 'results': results}, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.exception("Error summarizing cost lines")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _scenario_organization_ids(user):
+    """
+    Organizations whose budgets the user may model; None means all.
+
+    Superusers, evaluators and minister-level admins see the whole ministry,
+    other admins their subtree and planners their own organizations.
+    """
+    from .scenarios import organization_subtree
+
+    if user.is_superuser:
+        return None
+    memberships = list(OrganizationUser.objects.filter(user=user).select_related('organization'))
+    if any(m.role == 'EVALUATOR' or (m.role == 'ADMIN' and m.organization.type == 'MINISTER') for m in memberships):
+        return None
+
+    allowed = set()
+    for membership in memberships:
+        if membership.role == 'ADMIN':
+            allowed.update(organization_subtree(membership.organization_id))
+        else:
+            allowed.add(membership.organization_id)
+    return allowed
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def costing_scenario(request):
+    """
+    Evaluate a what-if budget scenario.
+
+    Body: {"changes": {"PER_DIEM": 15, "AIR_TRANSPORT": 20}} with percentage
+    changes per cost-line category, and an optional scope: "plan" (its
+    organization), "organization" (with its subtree) or neither for every
+    organization the user can see. Returns baseline and scenario totals by
+    organization, activity type, cost category and funding source.
+    """
+    import time
+    from .models import SubActivityCostLine
+    from .scenarios import ScenarioError, ScenarioInputs, organization_subtree
+
+    try:
+        changes = request.data.get('changes') or {}
+        if not isinstance(changes, dict):
+            return Response({'error': 'changes must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+        categories = {choice[0] for choice in SubActivityCostLine.CATEGORY_CHOICES}
+        unknown = sorted(set(changes) - categories)
+        if unknown:
+            return Response(
+                {'error': f"Unknown cost categories: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        allowed = _scenario_organization_ids(request.user)
+        organization_ids = allowed
+        if request.data.get('plan'):
+            if not str(request.data['plan']).isdigit():
+                return Response({'error': 'plan must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+            plan = Plan.objects.filter(pk=int(request.data['plan'])).values('organization_id').first()
+            if plan is None:
+                return Response({'error': 'Plan not found'}, status=status.HTTP_404_NOT_FOUND)
+            organization_ids = {plan['organization_id']}
+        elif request.data.get('organization'):
+            if not str(request.data['organization']).isdigit():
+                return Response({'error': 'organization must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+            organization_ids = set(organization_subtree(int(request.data['organization'])))
+
+        if allowed is not None and not organization_ids <= allowed:
+            return Response(
+                {'error': 'You do not have permission to model this scope'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if organization_ids is not None:
+            organization_ids = list(organization_ids)
+
+        started = time.monotonic()
+        try:
+            result = ScenarioInputs(organization_ids).evaluate(changes)
+        except ScenarioError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        names = dict(Organization.objects.filter(
+            id__in=[row['organization'] for row in result['by_organization'] if row['organization']]
+        ).values_list('id', 'name'))
+        for row in result['by_organization']:
+            row['organization_name'] = names.get(row['organization'])
+
+        result['changes'] = changes
+        result['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+        return Response(result, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.exception("Error evaluating budget scenario")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+PRINTING_QUOTE_MAX_DOCUMENTS = 500
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def printing_quote(request):
+    """
+    Quote many printing jobs at once.
+
+    Body: {"documents": [{"document_type": "MANUAL", "pages": 40,
+    "copies": 200, "description": "..."}], "other_costs": 0}. Prices come
+    from the cached PrintingCost table. Returns one line per document, totals
+    per document type and the grand total.
+    """
+    from decimal import Decimal
+    from .costing import CostingError, estimate
+
+    try:
+        documents = request.data.get('documents')
+        if not isinstance(documents, list) or not documents:
+            return Response({'error': 'documents must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(documents) > PRINTING_QUOTE_MAX_DOCUMENTS:
+            return Response(
+                {'error': f'At most {PRINTING_QUOTE_MAX_DOCUMENTS} documents can be quoted per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(document, dict) for document in documents):
+            return Response({'error': 'Each document must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = estimate({
+                'activity_type': 'Printing',
+                'documents': documents,
+                'other_costs': request.data.get('other_costs')
+            })
+        except CostingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        by_document_type = {}
+        for line in result['lines']:
+            if line['category'] == 'PRINTING':
+                by_document_type[line['cost_type']] = by_document_type.get(line['cost_type'], Decimal('0')) + line['amount']
+
+        return Response({
+            'lines': result['lines'],
+            'by_document_type': by_document_type,
+            'total': result['total'],
+            'warnings': result['warnings']
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.exception("Error quoting printing costs")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,259 @@
+"""
+Sibling weight budgets for initiatives, performance measures and main activities.
+
+Each of these models caps the total weight of the rows sharing a parent:
+
+    StrategicInitiative  -> strategic_objective  (must equal the objective's effective weight)
+    PerformanceMeasure   -> initiative           (at most 35%)
+    MainActivity         -> initiative           (at most 65% of the initiative weight)
+
+Checking rows one at a time costs an aggregate query plus a parent fetch per
+row. A WeightBudget loads the sibling weights and parents for every parent in
+a batch with one query each and keeps running totals in memory, so bulk
+endpoints and importers can validate N rows with a constant number of queries:
+
+    with weight_budget() as budget:
+        errors = budget.validate(activities)
+        if not any(errors):
+            for activity in activities:
+                activity.save()     # clean() skips the weight check of validated rows
+
+Outside a weight_budget() block model.clean() uses a throwaway budget, which
+behaves exactly like the old per-row aggregate. Deleting rows inside a block
+is not tracked; open a new block after deletes.
+"""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+_local = threading.local()
+
+# model_name -> name of the FK to the parent whose weight budget is shared
+PARENT_FIELDS = {
+    'strategicinitiative': 'strategic_objective',
+    'performancemeasure': 'initiative',
+    'mainactivity': 'initiative',
+}
+
+# Performance measures may use at most this much of an initiative's weight
+MEASURE_WEIGHT_LIMIT = Decimal('35')
+
+# Main activities may use at most this share of the initiative weight
+ACTIVITY_WEIGHT_SHARE = 0.65
+
+
+class WeightBudget:
+    """
+    Running per-parent weight totals shared by every row validated through it
+    """
+
+    def __init__(self):
+        # (model_name, parent_id) -> {row key: Decimal weight}
+        self._members = {}
+        # (model_name, parent_id) -> parent instance
+        self._parents = {}
+        # id(obj) -> obj for rows already checked by validate()
+        self._validated = {}
+
+    @classmethod
+    def active(cls):
+        """Return the budget of the enclosing weight_budget() block, if any"""
+        stack = getattr(_local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @classmethod
+    def for_row(cls):
+        """Budget to use from model.clean(): the active one or a throwaway"""
+        return cls.active() or cls()
+
+    def load(self, objs):
+        """
+        Load sibling weights and parents for all rows in objs.
+
+        Runs two queries per model type regardless of the number of rows or
+        parents; parents that are already loaded are skipped.
+        """
+        by_model = {}
+        cached_parents = {}
+        for obj in objs:
+            parent_id = self._parent_id(obj)
+            if parent_id is None:
+                continue
+            model_name = obj._meta.model_name
+            if (model_name, parent_id) not in self._members:
+                by_model.setdefault(model_name, (type(obj), set()))[1].add(parent_id)
+                field = obj._meta.get_field(PARENT_FIELDS[model_name])
+                if field.is_cached(obj):
+                    cached_parents[(model_name, parent_id)] = field.get_cached_value(obj)
+
+        for model_name, (model, parent_ids) in by_model.items():
+            field_name = PARENT_FIELDS[model_name]
+            parent_model = model._meta.get_field(field_name).related_model
+
+            missing = [pid for pid in parent_ids if (model_name, pid) not in cached_parents]
+            parents = parent_model._default_manager.in_bulk(missing) if missing else {}
+            for parent_id in parent_ids:
+                self._members[(model_name, parent_id)] = {}
+                self._parents[(model_name, parent_id)] = (
+                    cached_parents.get((model_name, parent_id)) or parents.get(parent_id)
+                )
+
+            siblings = model._default_manager.filter(
+                **{f'{field_name}_id__in': parent_ids}
+            ).values_list('pk', f'{field_name}_id', 'weight')
+            for pk, parent_id, weight in siblings:
+                self._members[(model_name, parent_id)][pk] = weight or Decimal('0')
+
+        # Hand the loaded parents to the rows so clean() does not lazy-load them
+        for obj in objs:
+            parent_id = self._parent_id(obj)
+            if parent_id is None:
+                continue
+            field = obj._meta.get_field(PARENT_FIELDS[obj._meta.model_name])
+            parent = self._parents.get((obj._meta.model_name, parent_id))
+            if parent is not None and not field.is_cached(obj):
+                field.set_cached_value(obj, parent)
+
+    def validate(self, objs):
+        """
+        Validate a batch of new or changed sibling rows against the final totals.
+
+        Returns a list aligned with objs holding an error message or None.
+        The batch's weights are recorded in the running totals either way, and
+        later check() calls for these rows (e.g. from clean() on save) are
+        no-ops.
+        """
+        objs = list(objs)
+        self.load(objs)
+
+        groups = {}
+        for obj in objs:
+            self._record(obj)
+            self._validated[id(obj)] = obj
+            group = self._group(obj)
+            if group is not None:
+                groups.setdefault(group, obj)
+
+        group_errors = {}
+        for group, obj in groups.items():
+            try:
+                self._check_total(obj, self._total(group))
+            except ValidationError as e:
+                group_errors[group] = ' '.join(e.messages)
+
+        return [group_errors.get(self._group(obj)) for obj in objs]
+
+    def check(self, obj):
+        """
+        Validate one row against the running totals and record its weight.
+
+        Raises ValidationError with the same messages the models used before.
+        """
+        group = self._group(obj)
+        if group is None or self._validated.get(id(obj)) is obj:
+            return
+        if group not in self._members:
+            self.load([obj])
+
+        key = self._key(obj, group)
+        others = self._total(group, exclude=key)
+        weight = self._weight(obj)
+        self._check_total(obj, others + weight, others=others)
+        self._members[group][key] = weight
+
+    # Internal helpers
+
+    def _parent_id(self, obj):
+        field_name = PARENT_FIELDS.get(obj._meta.model_name)
+        if field_name is None:
+            return None
+        return getattr(obj, f'{field_name}_id')
+
+    def _group(self, obj):
+        parent_id = self._parent_id(obj)
+        if parent_id is None:
+            return None
+        return (obj._meta.model_name, parent_id)
+
+    def _key(self, obj, group):
+        members = self._members[group]
+        new_key = ('new', id(obj))
+        if obj.pk is not None and new_key in members:
+            # The row was recorded before it was saved; re-key it by pk
+            members[obj.pk] = members.pop(new_key)
+        return obj.pk if obj.pk is not None else new_key
+
+    def _record(self, obj):
+        group = self._group(obj)
+        if group is not None:
+            self._members[group][self._key(obj, group)] = self._weight(obj)
+
+    def _weight(self, obj):
+        return Decimal(str(obj.weight)) if obj.weight is not None else Decimal('0')
+
+    def _total(self, group, exclude=None):
+        return sum(
+            (weight for key, weight in self._members[group].items() if key != exclude),
+            Decimal('0')
+        )
+
+    def _check_total(self, obj, total, others=None):
+        model_name = obj._meta.model_name
+        parent = self._parents.get(self._group(obj))
+
+        if model_name == 'mainactivity':
+            initiative_weight = float(parent.weight) if parent else 100.0
+            max_allowed_weight = round(initiative_weight * ACTIVITY_WEIGHT_SHARE, 2)
+            current_weight = float(obj.weight)
+            total_weight_after = float(total)
+            if total_weight_after > max_allowed_weight:
+                other_weight = float(others if others is not None else total - self._weight(obj))
+                raise ValidationError([
+                    f'Total weight of activities ({total_weight_after:.2f}%) cannot exceed {max_allowed_weight}% '
+                    f'(65% of initiative weight {initiative_weight}%). '
+                    f'Current other activities: {other_weight:.2f}%, '
+                    f'Your activity: {current_weight:.2f}%'
+                ])
+
+        elif model_name == 'performancemeasure':
+            if total > MEASURE_WEIGHT_LIMIT:
+                raise ValidationError(f'Total weight of performance measures ({total}%) cannot exceed 35%')
+
+        elif model_name == 'strategicinitiative' and parent is not None:
+            effective_weight = parent.get_effective_weight()
+            if total > effective_weight:
+                raise ValidationError(
+                    f"Total initiative weight ({total}) exceeds parent objective's effective weight "
+                    f"({effective_weight})"
+                )
+            if abs(total - effective_weight) > 0.01:
+                raise ValidationError(
+                    f"Total initiative weight ({total}) must equal parent objective's effective weight "
+                    f"({effective_weight}) exactly"
+                )
+
+
+@contextmanager
+def weight_budget():
+    """
+    Open a transaction whose weight checks share one WeightBudget.
+
+    Nested blocks reuse the outer budget.
+    """
+    current = WeightBudget.active()
+    if current is not None:
+        yield current
+        return
+
+    budget = WeightBudget()
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    with transaction.atomic():
+        _local.stack.append(budget)
+        try:
+            yield budget
+        finally:
+            _local.stack.pop()
@@ -0,0 +1,118 @@
+"""
+Evaluator work queue: submitted plans and reports in one list, oldest
+submission first, with summary fields only.
+
+Both tables are read through their (status, submitted_at) index with keyset
+(cursor) pagination: a cursor holds the (submitted_at, kind, id) of the
+last item of a page, and each table is asked for at most one page of rows
+after it. The two pages are merged, so a page costs two index range scans
+however long the queue is.
+"""
+import base64
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Order of the kinds among items submitted at the same moment
+KINDS = ('plan', 'report')
+
+# Stands in for a missing submitted_at, which sorts first
+_EARLIEST = datetime.min.replace(tzinfo=dt_timezone.utc)
+
+PLAN_FIELDS = ('id', 'organization_id', 'organization__name', 'fiscal_year', 'type', 'planner_name', 'submitted_at')
+REPORT_FIELDS = (
+    'id', 'plan_id', 'organization_id', 'organization__name', 'plan__fiscal_year', 'report_type',
+    'planner__username', 'submitted_at'
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(item):
+    position = [(item['submitted_at'] or _EARLIEST).isoformat(), item['kind'], item['id']]
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """(submitted_at, kind, id) of a cursor"""
+    try:
+        submitted_at, kind, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        submitted_at = parse_datetime(submitted_at)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+    if submitted_at is None or kind not in KINDS or not isinstance(item_id, int):
+        raise InvalidCursor('Invalid cursor')
+    return submitted_at, kind, item_id
+
+
+def _after(kind, position):
+    """Rows of kind that sort after position in (submitted_at, kind, id) order"""
+    submitted_at, cursor_kind, cursor_id = position
+    if submitted_at == _EARLIEST:
+        later, same = Q(submitted_at__isnull=False), Q(submitted_at__isnull=True)
+    else:
+        later, same = Q(submitted_at__gt=submitted_at), Q(submitted_at=submitted_at)
+    if KINDS.index(kind) > KINDS.index(cursor_kind):
+        return later | same
+    if kind == cursor_kind:
+        return later | (same & Q(id__gt=cursor_id))
+    return later
+
+
+def _page(queryset, kind, fields, position, size):
+    if position is not None:
+        queryset = queryset.filter(_after(kind, position))
+    return [
+        {'kind': kind, **row}
+        for row in queryset.prefetch_related(None).order_by('submitted_at', 'id').values(*fields)[:size]
+    ]
+
+
+def work_queue_page(plans, reports, cursor=None, size=DEFAULT_PAGE_SIZE):
+    """
+    One page of the merged queue of the given SUBMITTED plan and report
+    querysets. Returns (items, next cursor or None).
+    """
+    position = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether there is a next page
+    items = _page(plans, 'plan', PLAN_FIELDS, position, size + 1) + _page(
+        reports, 'report', REPORT_FIELDS, position, size + 1
+    )
+    items.sort(key=lambda item: (item['submitted_at'] or _EARLIEST, KINDS.index(item['kind']), item['id']))
+
+    has_more = len(items) > size
+    items = items[:size]
+    return items, encode_cursor(items[-1]) if has_more else None
+
+
+def summarize(item):
+    """Client-facing fields of a queue item"""
+    if item['kind'] == 'plan':
+        return {
+            'kind': 'plan',
+            'id': item['id'],
+            'organization_id': item['organization_id'],
+            'organization_name': item['organization__name'],
+            'fiscal_year': item['fiscal_year'],
+            'plan_type': item['type'],
+            'planner_name': item['planner_name'],
+            'submitted_at': item['submitted_at'],
+        }
+    return {
+        'kind': 'report',
+        'id': item['id'],
+        'plan_id': item['plan_id'],
+        'organization_id': item['organization_id'],
+        'organization_name': item['organization__name'],
+        'fiscal_year': item['plan__fiscal_year'],
+        'report_type': item['report_type'],
+        'planner_name': item['planner__username'],
+        'submitted_at': item['submitted_at'],
+    }
@@ -468,14 +468,20 @@ const SupervisionCostingTool: React.FC<SupervisionCostingToolProps> = ({
           description: data.description,
           numberOfDays: Number(data.numberOfDays),
           numberOfSupervisors: Number(data.numberOfSupervisors),
+          numberOfSupervisorsWithAdditionalCost: Number(data.numberOfSupervisorsWithAdditionalCost || 0),
           location: data.location,
           costMode,
+          accommodationType: data.accommodationType || 'FULL_BOARD',
           additionalLocations,
+          transportRequired: Boolean(data.transportRequired),
+          landTransportSupervisors: Number(data.landTransportSupervisors || 0),
+          airTransportSupervisors: Number(data.airTransportSupervisors || 0),
           landTransportRoutes,
           airTransportRoutes,
           additionalSupervisorCosts: data.additionalSupervisorCosts,
           otherCosts: Number(data.otherCosts || 0),
-          justification: data.justification
+          justification: data.justification,
+          totalBudget: totalBudget || 0
         }
       };
       
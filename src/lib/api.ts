@@ -316,6 +316,65 @@ export const initiativeFeeds = {
   }
 };
 
+// Server-side costing API
+export const costing = {
+  estimate: async (spec: any) => {
+    try {
+      const response = await api.post('/costing/estimate/', spec);
+      return response.data;
+    } catch (error) {
+      console.error('Failed to estimate costs:', error);
+      throw error;
+    }
+  },
+
+  // No cache-busting timestamp: the browser revalidates with If-None-Match
+  getRates: async () => {
+    try {
+      const response = await api.get('/costing/rates/');
+      return response.data;
+    } catch (error) {
+      console.error('Failed to fetch costing rates:', error);
+      throw error;
+    }
+  },
+
+  // pairs: [{origin, destination, tripType?}]
+  getRoutes: async (pairs: { origin: string | number; destination: string | number; tripType?: string }[], mode: 'land' | 'air' = 'land') => {
+    try {
+      const encoded = pairs
+        .map(pair => [pair.origin, pair.destination, pair.tripType].filter(Boolean).join('-'))
+        .join(',');
+      const response = await api.get('/costing/routes/', { params: { pairs: encoded, mode } });
+      return response.data;
+    } catch (error) {
+      console.error('Failed to look up transport routes:', error);
+      throw error;
+    }
+  },
+
+  // changes: percentage change per cost category, e.g. { PER_DIEM: 15, AIR_TRANSPORT: 20 }
+  runScenario: async (changes: Record<string, number>, scope: { plan?: string | number; organization?: string | number } = {}) => {
+    try {
+      const response = await api.post('/costing/scenarios/', { changes, ...scope });
+      return response.data;
+    } catch (error) {
+      console.error('Failed to evaluate budget scenario:', error);
+      throw error;
+    }
+  },
+
+  printingQuote: async (documents: { document_type: string; pages: number; copies: number; description?: string }[], otherCosts: number = 0) => {
+    try {
+      const response = await api.post('/costing/printing-quote/', { documents, other_costs: otherCosts });
+      return response.data;
+    } catch (error) {
+      console.error('Failed to quote printing costs:', error);
+      throw error;
+    }
+  }
+};
+
 // Locations API
 export const locations = {
   getAll: async () => {
@@ -567,6 +626,18 @@ export const procurementItems = {
       console.error(`Failed to fetch procurement items for category ${category}:`, error);
       return { data: [] };
     }
+  },
+
+  search: async (query: string, category?: string, limit: number = 20) => {
+    try {
+      const response = await api.get('/procurement-items/search/', {
+        params: { q: query, limit, ...(category ? { category } : {}) }
+      });
+      return response.data;
+    } catch (error) {
+      console.error(`Failed to search procurement items for "${query}":`, error);
+      return { query, results: [] };
+    }
   }
 };
 
@@ -1457,6 +1528,8 @@ export const subActivities = {
   getAll: () => api.get('/sub-activities/'),
   getById: (id: string) => api.get(`/sub-activities/${id}/`),
   create: (data: any) => api.post('/sub-activities/', data),
+  bulkCreate: (items: any[]) => api.post('/sub-activities/bulk/', { sub_activities: items }),
+  getFundingGaps: (params: Record<string, any> = {}) => api.get('/sub-activities/funding-gaps/', { params }),
   update: (id: string, data: any) => api.put(`/sub-activities/${id}/`, data),
   delete: async (id: string) => {
     try {
@@ -1477,6 +1550,33 @@ export const subActivities = {
 
 // Plans service
 export const plans = {
+  // Streamed by the server; use as a link href so the browser saves it as it arrives
+  getExportUrl(planId: string | number, fileFormat: 'xlsx' | 'csv' = 'xlsx') {
+    return `/api/plans/${planId}/export/?file_format=${fileFormat}`;
+  },
+
+  // Approved plans only; answers 202 with a job while the PDF is being rendered
+  getPdfUrl(planId: string | number) {
+    return `/api/plans/${planId}/pdf/`;
+  },
+
+  // Submitted plans and reports awaiting review, summary fields only; pass `next` back as cursor
+  async getWorkQueue(cursor?: string | null, limit = 50) {
+    const response = await api.get('/plans/work-queue/', { params: { limit, ...(cursor ? { cursor } : {}) } });
+    return response.data;
+  },
+
+  async getReportingWindows(planId: string | number) {
+    const response = await api.get(`/plans/${planId}/reporting-windows/`);
+    return response.data;
+  },
+
+  async renderPdfBatch(organizationId: string | number, force = false) {
+    await ensureCsrfToken();
+    const response = await api.post('/plans/pdf-batch/', { organization: organizationId, force });
+    return response.data;
+  },
+
   async getAll() {
     try {
       const timestamp = new Date().getTime();
@@ -1837,6 +1937,68 @@ export const plans = {
 
 // Reports service
 export const reports = {
+  getExportUrl(reportId: string | number, fileFormat: 'xlsx' | 'csv' = 'xlsx') {
+    return `/api/reports/${reportId}/export/?file_format=${fileFormat}`;
+  },
+
+  async getTrend(params: { organization?: string | number; fiscal_year?: string; level?: 'objective' | 'measure' } = {}) {
+    const response = await api.get('/reports/trend/', { params });
+    return response.data;
+  },
+
+  // Chunked, resumable narrative upload; a retry with the same file continues where the last attempt stopped
+  async uploadNarrative(reportId: string | number, file: File, onProgress?: (sent: number, total: number) => void) {
+    await ensureCsrfToken();
+    const key = `narrative-upload:${reportId}:${file.name}:${file.size}:${file.lastModified}`;
+    const base = `/reports/${reportId}/narrative-uploads`;
+
+    let upload: any = null;
+    const savedId = localStorage.getItem(key);
+    if (savedId) {
+      try {
+        const response = await api.get(`${base}/${savedId}/`);
+        if (response.data.status === 'UPLOADING') upload = response.data;
+      } catch (error) {
+        upload = null;
+      }
+    }
+    if (!upload) {
+      const response = await api.post(`${base}/`, { filename: file.name, size: file.size });
+      upload = response.data;
+      localStorage.setItem(key, upload.id);
+    }
+
+    let offset: number = upload.received;
+    let failures = 0;
+    while (offset < file.size) {
+      const part = file.slice(offset, offset + upload.part_size);
+      const headers: Record<string, string> = { 'Content-Type': 'application/octet-stream' };
+      // crypto.subtle is only available on secure origins; the part checksum is optional
+      if (window.crypto?.subtle) {
+        const digest = await window.crypto.subtle.digest('SHA-256', await part.arrayBuffer());
+        headers['X-Content-SHA256'] = Array.from(new Uint8Array(digest))
+          .map(byte => byte.toString(16).padStart(2, '0'))
+          .join('');
+      }
+      try {
+        const response = await api.put(`${base}/${upload.id}/?offset=${offset}`, part, { headers, timeout: 120000 });
+        offset = response.data.received;
+        failures = 0;
+      } catch (error: any) {
+        // The server answers with its offset when a part was dropped or already received
+        const received = error.response?.data?.received;
+        failures += 1;
+        if (typeof received !== 'number' || failures > 3) throw error;
+        offset = received;
+      }
+      onProgress?.(offset, file.size);
+    }
+
+    const response = await api.post(`${base}/${upload.id}/complete/`);
+    localStorage.removeItem(key);
+    return response.data;
+  },
+
   async getStatistics() {
     try {
       await ensureCsrfToken();
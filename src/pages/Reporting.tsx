@@ -2,7 +2,7 @@ import React, { useState, useMemo } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { FileText, Upload, AlertCircle, CheckCircle, ArrowLeft, Loader, Save, Eye } from 'lucide-react';
-import { api } from '../lib/api';
+import { api, plans, reports } from '../lib/api';
 import { REPORT_TYPES, Report, ReportPlanData, PerformanceAchievement, ActivityAchievement } from '../types/report';
 import { HorizontalMEReportTable } from '../components/HorizontalMEReportTable';
 import { BudgetUtilizationForm } from '../components/BudgetUtilizationForm';
@@ -57,6 +57,21 @@ const Reporting: React.FC = () => {
     retry: false
   });
 
+  // Which report types can be created today; computed by the server when the plan was approved
+  const { data: reportingWindows } = useQuery({
+    queryKey: ['reporting-windows', planId],
+    queryFn: async () => {
+      const response = await plans.getReportingWindows(planId!);
+      const windows: Record<string, any> = {};
+      (response.windows || []).forEach((reportWindow: any) => {
+        windows[reportWindow.report_type] = reportWindow;
+      });
+      return windows;
+    },
+    enabled: !!planId && !!approvedPlan,
+    retry: false
+  });
+
   const { data: planData, isLoading: isLoadingPlan, error: planDataError, refetch: refetchPlanData } = useQuery({
     queryKey: ['report-plan-data', reportId],
     queryFn: async () => {
@@ -327,12 +342,7 @@ const Reporting: React.FC = () => {
       // Upload narrative file if provided
       if (narrativeFile) {
         console.log('Uploading narrative file:', narrativeFile.name);
-        const formData = new FormData();
-        formData.append('narrative_report', narrativeFile);
-
-        const uploadResponse = await api.patch(`/reports/${reportId}/`, formData, {
-          headers: { 'Content-Type': 'multipart/form-data' }
-        });
+        const uploadResponse = await reports.uploadNarrative(reportId, narrativeFile);
         console.log('File upload response:', uploadResponse);
       }
 
@@ -369,12 +379,7 @@ const Reporting: React.FC = () => {
       try {
         if (narrativeFile) {
           console.log('Uploading narrative file:', narrativeFile.name);
-          const formData = new FormData();
-          formData.append('narrative_report', narrativeFile);
-
-          const uploadResponse = await api.patch(`/reports/${reportId}/`, formData, {
-            headers: { 'Content-Type': 'multipart/form-data' }
-          });
+          const uploadResponse = await reports.uploadNarrative(reportId, narrativeFile);
           console.log('File upload response:', uploadResponse);
         }
 
@@ -768,20 +773,30 @@ const Reporting: React.FC = () => {
           <p className="text-gray-600 mb-4">Choose the reporting period for this progress report</p>
 
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
-            {REPORT_TYPES.map((type) => (
-              <button
-                key={type.value}
-                onClick={() => setSelectedReportType(type.value)}
-                className={`p-4 border-2 rounded-lg text-left transition-colors ${
-                  selectedReportType === type.value
-                    ? 'border-green-600 bg-green-50'
-                    : 'border-gray-200 hover:border-green-300'
-                }`}
-              >
-                <FileText className="h-6 w-6 mb-2 text-green-600" />
-                <div className="font-medium">{type.label}</div>
-              </button>
-            ))}
+            {REPORT_TYPES.map((type) => {
+              const reportWindow = reportingWindows?.[type.value];
+              const closed = !!reportWindow && !reportWindow.is_open && !reportWindow.report;
+              return (
+                <button
+                  key={type.value}
+                  onClick={() => setSelectedReportType(type.value)}
+                  disabled={closed}
+                  className={`p-4 border-2 rounded-lg text-left transition-colors disabled:opacity-50 disabled:cursor-not-allowed ${
+                    selectedReportType === type.value
+                      ? 'border-green-600 bg-green-50'
+                      : 'border-gray-200 hover:border-green-300'
+                  }`}
+                >
+                  <FileText className="h-6 w-6 mb-2 text-green-600" />
+                  <div className="font-medium">{type.label}</div>
+                  {closed && (
+                    <div className="text-xs text-gray-500 mt-1">
+                      Open from {reportWindow.opens_on}{reportWindow.closes_on ? ` to ${reportWindow.closes_on}` : ''}
+                    </div>
+                  )}
+                </button>
+              );
+            })}
           </div>
 
           <div className="mt-6 flex justify-end">